@@ -1,23 +1,61 @@
-# app/__init__.py
-from flask import Flask
-from app.dashboards.ameaca_geral_terra_indigena import (
-    register_ameaca_terra_indigena,
-)
-from app.dashboards.ameaca_geral_area_de_protecao import register_ameaca_area_protecao
-from app.dashboards.ameaca_geral_ucs              import register_ameaca_ucs
-from app.dashboards.pressao_geral_area_de_protecao import (
-    register_pressao_area_protecao,
-)
-from app.dashboards.pressao_geral_terra_indigena import (
-    register_pressao_terras_indigenas,
-)
-from app.dashboards.pressao_geral_ucs import register_pressao_ucs
-def create_app():
-    server = Flask(__name__)
-    register_ameaca_terra_indigena(server)  # /ameaca_terras_indigenas/
-    register_ameaca_area_protecao(server) # /area_de_protecao/
-    register_ameaca_ucs(server)              # /ucs/
-    register_pressao_area_protecao(server)  # /pressao_area_de_protecao/
-    register_pressao_terras_indigenas(server)  # /pressao_terra_indigena/
-    register_pressao_ucs(server)   # /pressao_ucs/
-    return server
+# app/__init__.py
+import os
+
+from flask import Flask
+from app.dashboards.ameaca_geral_terra_indigena import (
+    register_ameaca_terra_indigena,
+)
+from app.dashboards.ameaca_geral_area_de_protecao import register_ameaca_area_protecao
+from app.dashboards.ameaca_geral_ucs              import register_ameaca_ucs
+from app.dashboards.pressao_geral_area_de_protecao import (
+    register_pressao_area_protecao,
+)
+from app.dashboards.pressao_geral_terra_indigena import (
+    register_pressao_terras_indigenas,
+)
+from app.dashboards.pressao_geral_ucs import register_pressao_ucs
+from app.data.export import export
+from app.data.registry import registry
+from app.data.snapshots import build_snapshots_command
+from app.data.tiles import tiles
+
+
+def create_app(lazy=None, warm_up=None):
+    """
+    Na subida, os artefatos que faltam no cache local são baixados em
+    paralelo (espelhos em corrida).
+
+    *lazy*    – carrega cada dataset na primeira requisição ao seu dashboard
+                (padrão: ``AP_LAZY``, ligado).  Com ``False`` carrega tudo aqui.
+    *warm_up* – nomes de datasets carregados já na subida, em segundo plano
+                (padrão: ``AP_WARM_UP``, separado por vírgulas; ``*`` = todos).
+
+    As fontes em cache são revalidadas em segundo plano já na subida e, com
+    ``AP_REFRESH_SECONDS`` > 0, periodicamente; os datasets alterados são
+    trocados a quente (``registry.start_refresher``).
+    """
+    if lazy is None:
+        lazy = os.environ.get("AP_LAZY", "1") != "0"
+    if warm_up is None:
+        warm_up = [n for n in os.environ.get("AP_WARM_UP", "").split(",") if n]
+
+    server = Flask(__name__)
+    server.cli.add_command(build_snapshots_command)  # flask build-snapshots
+    registry.init_app(server)  # /ap/_datasets
+    server.register_blueprint(tiles)  # /ap/_tiles
+    server.register_blueprint(export)  # /ap/_export
+    register_ameaca_terra_indigena(server)  # /ameaca_terras_indigenas/
+    register_ameaca_area_protecao(server) # /area_de_protecao/
+    register_ameaca_ucs(server)              # /ucs/
+    register_pressao_area_protecao(server)  # /pressao_area_de_protecao/
+    register_pressao_terras_indigenas(server)  # /pressao_terra_indigena/
+    register_pressao_ucs(server)   # /pressao_ucs/
+
+    # todos os artefatos ausentes do cache são baixados de uma vez
+    registry.prefetch()
+    if not lazy:
+        registry.warm_up(["*"], background=False)
+    elif warm_up:
+        registry.warm_up(warm_up)
+    registry.start_refresher()
+    return server
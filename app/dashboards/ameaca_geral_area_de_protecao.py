@@ -7,26 +7,71 @@ Servido pelo Flask em  /ap/ameaca_geral_area_de_protecao/
 
 from __future__ import annotations
 
-import io
-from typing import List, Optional
+from pathlib import Path
 
 import dash
 import dash_bootstrap_components as dbc
-import geopandas as gpd
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import unidecode
+import pyarrow.dataset as ds
 from dash import (
+    ClientsideFunction,
+    dash_table,
     dcc,
     html,
     Input,
     Output,
     State,
-    callback_context,
     no_update,
 )
 
+from app.dashboards.common import generate, options, register_map, register_ranking
+from app.data.export import EXPORT_FORMATS
+from app.data.filters import TOP_N
+from app.data.registry import registry
+from app.data.table import TABLE_COLUMNS, TABLE_PAGE_SIZE, table_rows
+
+ASSETS_DIR = Path(__file__).resolve().parents[2] / "assets"  # assets/ da raiz
+
+# ╭─ fontes (CDN 1º / GitHub 2º) ─────────────────────────────────────────────╮
+GEOJSON_URLS = [
+    "https://cdn.jsdelivr.net/gh/imazon-cgi/ap@main/"
+    "dataset/geojson/AMEACA_GERAL_Area_de_Protecao.geojson",
+    "https://raw.githubusercontent.com/imazon-cgi/ap/main/"
+    "dataset/geojson/AMEACA_GERAL_Area_de_Protecao.geojson",
+]
+PARQUET_URLS = [
+    "https://cdn.jsdelivr.net/gh/imazon-cgi/ap@main/"
+    "dataset/csv/AMEACA_GERAL_Area_de_Protecao.parquet",
+    "https://github.com/imazon-cgi/ap/raw/refs/heads/main/"
+    "dataset/csv/AMEACA_GERAL_Area_de_Protecao.parquet",
+]
+
+# ╭─ dados ──────────────────────────────────────────────────────────────────╮
+# só as colunas e linhas que o dashboard usa
+COLUMNS = [
+    "RANK", "NOME", "UF", "MODALIDADE", "USO",
+    "DESMATAM_1", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N",
+]
+FILTER = ds.field("MODALIDADE").isin(["UC Federal", "UC Estadual"])
+data = registry.register(
+    "AMEACA_GERAL_Area_de_Protecao", GEOJSON_URLS, PARQUET_URLS,
+    columns=COLUMNS, filter=FILTER,
+)
+
+# ╭─ opções de filtros ──────────────────────────────────────────────────────╮
+modalidade_options = [
+    {"label": "UC Federal", "value": "UC Federal"},
+    {"label": "UC Estadual", "value": "UC Estadual"},
+]
+uso_options = [
+    {"label": "Uso Sustentavel", "value": "Uso Sustentavel"},
+    {"label": "Protecao Integral", "value": "Protecao Integral"},
+]
+
+
+TABLE_HEADERS = ["Nome", "Focos de Calor", "Número de CAR", "Área de CAR", "Estradas Não Oficiais"]
+
 
 # ╭──────────────────────────────────────────────────────────────────────────╮
 # │ FUNÇÃO QUE REGISTRA O DASH NO FLASK                                      │
@@ -41,262 +86,290 @@ def register_ameaca_area_protecao(server) -> dash.Dash:
     app = dash.Dash(
         __name__,
         server=server,
+        assets_folder=str(ASSETS_DIR),
         url_base_pathname="/ap/ameaca_geral_area_de_protecao/",
         external_stylesheets=external_css,
         suppress_callback_exceptions=True,
         #title="Ameaça Geral – Área de Proteção",
     )
 
-    # ╭─ utilidades de carga ────────────────────────────────────────────────╮
-    def load_geojson(url: str):
-        try:
-            return gpd.read_file(url)
-        except Exception as exc:
-            print(f"Erro ao carregar {url}: {exc}")
-            return None
-
-    def load_parquet(url: str) -> pd.DataFrame:
-        return pd.read_parquet(url)
-
-    # ╭─ dados --------------------------------------------------------------╮
-    roi = load_geojson(
-        "https://raw.githubusercontent.com/imazon-cgi/ap/main/dataset/geojson/AMEACA_GERAL_Area_de_Protecao.geojson"
-    )
-    roi["NOME"] = (
-        roi["NOME"].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-    )
-    roi = roi.sort_values(by="RANK")
-
-    df = load_parquet(
-        "https://github.com/imazon-cgi/ap/raw/refs/heads/main/dataset/csv/AMEACA_GERAL_Area_de_Protecao.parquet"
-    )
-    df["NOME"] = (
-        df["NOME"].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-    )
-    df = df.sort_values(by="RANK")
-
-    list_states: List[str] = sorted(df["UF"].dropna().unique())
-    state_options = [{"label": s, "value": s} for s in list_states]
-
-    modalidade_options = [
-        {"label": "UC Federal", "value": "UC Federal"},
-        {"label": "UC Estadual", "value": "UC Estadual"},
-    ]
-    uso_options = [
-        {"label": "Uso Sustentavel", "value": "Uso Sustentavel"},
-        {"label": "Protecao Integral", "value": "Protecao Integral"},
-    ]
-
     # ╭─ layout (igual original) ────────────────────────────────────────────╮
-    app.layout = dbc.Container(
-        [
-            html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
-            dbc.Row(
-                [
-                    dbc.Col(
-                        dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        #html.H1(
-                                            #"Análise de Ameaça de Desmatamento - Amazônia Legal",
-                                            #className="text-center mb-4",
-                                        #),
-                                        dbc.Row(
-                                            [
-                                                dbc.Col(
-                                                    html.Label("Modalidade:", className="fw-bold"),
-                                                    width="auto",
-                                                    className="align-self-center",
-                                                ),
-                                                dbc.Col(
-                                                    dcc.Dropdown(
-                                                        id="modalidade-dropdown",
-                                                        options=modalidade_options,
-                                                        multi=True,
-                                                        placeholder="Selecione a modalidade",
+    def serve_layout():
+        # opções dependentes dos dados: vazias até a primeira carga
+        loaded = data.peek()
+        state_options = options(loaded[1] if loaded else None, "UF")
+
+        return dbc.Container(
+            [
+                html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            #html.H1(
+                                                #"Análise de Ameaça de Desmatamento - Amazônia Legal",
+                                                #className="text-center mb-4",
+                                            #),
+                                            dbc.Row(
+                                                [
+                                                    dbc.Col(
+                                                        html.Label("Modalidade:", className="fw-bold"),
+                                                        width="auto",
+                                                        className="align-self-center",
                                                     ),
-                                                    width=3,
-                                                ),
-                                                dbc.Col(
-                                                    html.Label("Uso:", className="fw-bold"),
-                                                    width="auto",
-                                                    className="align-self-center",
-                                                ),
-                                                dbc.Col(
-                                                    dcc.Dropdown(
-                                                        id="uso-dropdown",
-                                                        options=uso_options,
-                                                        multi=True,
-                                                        placeholder="Selecione o uso",
+                                                    dbc.Col(
+                                                        dcc.Dropdown(
+                                                            id="modalidade-dropdown",
+                                                            options=modalidade_options,
+                                                            multi=True,
+                                                            placeholder="Selecione a modalidade",
+                                                        ),
+                                                        width=3,
                                                     ),
-                                                    width=3,
-                                                ),
-                                                dbc.Col(
-                                                    html.Label("UF:", className="fw-bold"),
-                                                    width="auto",
-                                                    className="align-self-center",
-                                                ),
-                                                dbc.Col(
-                                                    dcc.Dropdown(
-                                                        id="state-dropdown",
-                                                        options=state_options,
-                                                        multi=True,
-                                                        placeholder="Selecione o(s) Estado(s)",
+                                                    dbc.Col(
+                                                        html.Label("Uso:", className="fw-bold"),
+                                                        width="auto",
+                                                        className="align-self-center",
                                                     ),
-                                                    width=3,
-                                                ),
-                                                dbc.Col(
-                                                    dbc.Button(
-                                                        [
-                                                            html.I(className="fa fa-filter mr-1"),
-                                                            "Remover Filtros",
-                                                        ],
-                                                        id="reset-button",
-                                                        color="primary",
-                                                        className="btn-sm custom-button",
+                                                    dbc.Col(
+                                                        dcc.Dropdown(
+                                                            id="uso-dropdown",
+                                                            options=uso_options,
+                                                            multi=True,
+                                                            placeholder="Selecione o uso",
+                                                        ),
+                                                        width=3,
+                                                    ),
+                                                    dbc.Col(
+                                                        html.Label("UF:", className="fw-bold"),
+                                                        width="auto",
+                                                        className="align-self-center",
+                                                    ),
+                                                    dbc.Col(
+                                                        dcc.Dropdown(
+                                                            id="state-dropdown",
+                                                            options=state_options,
+                                                            multi=True,
+                                                            placeholder="Selecione o(s) Estado(s)",
+                                                        ),
+                                                        width=3,
                                                     ),
-                                                    width="auto",
-                                                    className="d-flex justify-content-end",
+                                                    dbc.Col(
+                                                        dbc.Button(
+                                                            [
+                                                                html.I(className="fa fa-filter mr-1"),
+                                                                "Remover Filtros",
+                                                            ],
+                                                            id="reset-button",
+                                                            color="primary",
+                                                            className="btn-sm custom-button",
+                                                        ),
+                                                        width="auto",
+                                                        className="d-flex justify-content-end",
+                                                    ),
+                                                    dbc.Col(
+                                                        dbc.Button(
+                                                            [
+                                                                html.I(className="fa fa-download mr-1"),
+                                                                "Baixar CSV",
+                                                            ],
+                                                            id="open-modal-button",
+                                                            color="secondary",
+                                                            className="btn-sm custom-button",
+                                                        ),
+                                                        width="auto",
+                                                        className="d-flex justify-content-end",
+                                                    ),
+                                                ],
+                                                justify="end",
+                                                className="mb-3 align-items-center",
+                                            ),
+                                        ]
+                                    )
+                                ],
+                                className="mb-4 title-card",
+                            ),
+                            width=12,
+                        )
+                    ]
+                ),
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Card([dcc.Graph(id="bar-graph")], className="graph-block"),
+                            width=12,
+                            lg=6,
+                        ),
+                        dbc.Col(
+                            dbc.Card(
+                                [
+                                    dbc.RadioItems(
+                                        id="map-mode",
+                                        inline=True,
+                                        value="top",
+                                        options=[
+                                            {"label": f"Top {TOP_N} (polígonos)", "value": "top"},
+                                            {"label": "Todas (pontos)", "value": "points"},
+                                        ],
+                                        className="px-2 pt-2",
+                                    ),
+                                    dcc.Graph(id="map-graph"),
+                                ],
+                                className="graph-block",
+                            ),
+                            width=12,
+                            lg=6,
+                        ),
+                    ],
+                    className="mb-4",
+                ),
+                dcc.Store(id="selected-states", data=[]),
+                dcc.Store(id="map-version"),
+                dcc.Store(id="map-figure"),
+                dcc.Store(id="ranking-cursors"),
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Card([dcc.Graph(id="pie-uso-graph")], className="graph-block"),
+                            width=12,
+                            lg=6,
+                        ),
+                        dbc.Col(
+                            dbc.Card([dcc.Graph(id="pie-unid-graph")], className="graph-block"),
+                            width=12,
+                            lg=6,
+                        ),
+                    ],
+                    className="mb-4",
+                ),
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Card(
+                                [
+                                    dbc.CardHeader(f"Top {TOP_N} Áreas Protegidas Mais Afetadas"),
+                                    dbc.CardBody(
+                                        dbc.Tabs(
+                                            [
+                                                dbc.Tab(
+                                                    dbc.Table(id="top-10-table", bordered=False, hover=True, responsive=True, striped=True),
+                                                    label=f"Top {TOP_N}",
                                                 ),
-                                                dbc.Col(
-                                                    dbc.Button(
-                                                        [
-                                                            html.I(className="fa fa-download mr-1"),
-                                                            "Baixar CSV",
+                                                # Ranking completo, paginado no servidor
+                                                dbc.Tab(
+                                                    dash_table.DataTable(
+                                                        id="ranking-table",
+                                                        columns=[
+                                                            {"name": n, "id": c}
+                                                            for c, n in zip(TABLE_COLUMNS, TABLE_HEADERS)
                                                         ],
-                                                        id="open-modal-button",
-                                                        color="secondary",
-                                                        className="btn-sm custom-button",
+                                                        page_action="custom",
+                                                        page_current=0,
+                                                        page_size=TABLE_PAGE_SIZE,
+                                                        virtualization=True,
+                                                        fixed_rows={"headers": True},
+                                                        style_table={"height": "400px", "overflowY": "auto"},
+                                                        style_cell={"textAlign": "left"},
                                                     ),
-                                                    width="auto",
-                                                    className="d-flex justify-content-end",
+                                                    label="Ranking completo",
                                                 ),
+                                            ]
+                                        )
+                                    ),
+                                ],
+                                className="mb-4",
+                            )
+                        )
+                    ]
+                ),
+                # ------------------------ modais (sem alteração) -----------------
+                dbc.Modal(
+                    [
+                        dbc.ModalHeader(
+                            dbc.ModalTitle("Escolha Área de Proteção Ambiental da Amazônia Legal")
+                        ),
+                        dbc.ModalBody(
+                            [
+                                dcc.Dropdown(
+                                    options=state_options,
+                                    id="state-dropdown-modal",
+                                    placeholder="Selecione o Estado",
+                                    multi=True,
+                                )
+                            ]
+                        ),
+                        dbc.ModalFooter(
+                            [dbc.Button("Fechar", id="close-state-modal-button", color="danger")]
+                        ),
+                    ],
+                    id="state-modal",
+                    is_open=False,
+                ),
+                dbc.Modal(
+                    [
+                        dbc.ModalHeader(
+                            dbc.ModalTitle("Escolha as Área de Proteção Ambiental da Amazônia Legal")
+                        ),
+                        dbc.ModalBody(
+                            [
+                                dbc.Checklist(options=state_options, id="state-checklist", inline=True),
+                                html.Hr(),
+                                html.Label("Formato"),
+                                dbc.RadioItems(
+                                    options=[
+                                        {"label": "CSV", "value": "csv"},
+                                        {"label": "Parquet", "value": "parquet"},
+                                        {"label": "GeoParquet", "value": "geoparquet"},
+                                        {"label": "GeoJSON", "value": "geojson"},
+                                    ],
+                                    value="csv",
+                                    id="export-format",
+                                    inline=True,
+                                ),
+                                html.Hr(),
+                                html.Div(
+                                    [
+                                        html.Label("Configurações para gerar o CSV"),
+                                        dbc.RadioItems(
+                                            options=[
+                                                {"label": "Ponto", "value": "."},
+                                                {"label": "Vírgula", "value": ","},
                                             ],
-                                            justify="end",
-                                            className="mb-3 align-items-center",
+                                            value=".",
+                                            id="decimal-separator",
+                                            inline=True,
+                                            className="mb-2",
+                                        ),
+                                        dbc.Checkbox(
+                                            label="Sem acentuação", id="remove-accents", value=False
                                         ),
                                     ]
-                                )
-                            ],
-                            className="mb-4 title-card",
+                                ),
+                            ]
                         ),
-                        width=12,
-                    )
-                ]
-            ),
-            dcc.Download(id="download-dataframe-csv"),
-            dbc.Row(
-                [
-                    dbc.Col(
-                        dbc.Card([dcc.Graph(id="bar-graph")], className="graph-block"),
-                        width=12,
-                        lg=6,
-                    ),
-                    dbc.Col(
-                        dbc.Card([dcc.Graph(id="map-graph")], className="graph-block"),
-                        width=12,
-                        lg=6,
-                    ),
-                ],
-                className="mb-4",
-            ),
-            dcc.Store(id="selected-states", data=[]),
-            dbc.Row(
-                [
-                    dbc.Col(
-                        dbc.Card([dcc.Graph(id="pie-uso-graph")], className="graph-block"),
-                        width=12,
-                        lg=6,
-                    ),
-                    dbc.Col(
-                        dbc.Card([dcc.Graph(id="pie-unid-graph")], className="graph-block"),
-                        width=12,
-                        lg=6,
-                    ),
-                ],
-                className="mb-4",
-            ),
-            dbc.Row(
-                [
-                    dbc.Col(
-                        dbc.Card(
+                        dbc.ModalFooter(
                             [
-                                dbc.CardHeader("Top 10 Áreas Protegidas Mais Afetadas"),
-                                dbc.CardBody(
-                                    [dbc.Table(id="top-10-table", bordered=False, hover=True, responsive=True, striped=True)]
+                                html.A(
+                                    dbc.Button("Download", id="download-button", className="mr-2", color="success"),
+                                    id="download-link",
+                                    download="ameaca_area_protecao.csv",
                                 ),
-                            ],
-                            className="mb-4",
-                        )
-                    )
-                ]
-            ),
-            # ------------------------ modais (sem alteração) -----------------
-            dbc.Modal(
-                [
-                    dbc.ModalHeader(
-                        dbc.ModalTitle("Escolha Área de Proteção Ambiental da Amazônia Legal")
-                    ),
-                    dbc.ModalBody(
-                        [
-                            dcc.Dropdown(
-                                options=state_options,
-                                id="state-dropdown-modal",
-                                placeholder="Selecione o Estado",
-                                multi=True,
-                            )
-                        ]
-                    ),
-                    dbc.ModalFooter(
-                        [dbc.Button("Fechar", id="close-state-modal-button", color="danger")]
-                    ),
-                ],
-                id="state-modal",
-                is_open=False,
-            ),
-            dbc.Modal(
-                [
-                    dbc.ModalHeader(
-                        dbc.ModalTitle("Escolha as Área de Proteção Ambiental da Amazônia Legal")
-                    ),
-                    dbc.ModalBody(
-                        [
-                            dbc.Checklist(options=state_options, id="state-checklist", inline=True),
-                            html.Hr(),
-                            html.Div(
-                                [
-                                    html.Label("Configurações para gerar o CSV"),
-                                    dbc.RadioItems(
-                                        options=[
-                                            {"label": "Ponto", "value": "."},
-                                            {"label": "Vírgula", "value": ","},
-                                        ],
-                                        value=".",
-                                        id="decimal-separator",
-                                        inline=True,
-                                        className="mb-2",
-                                    ),
-                                    dbc.Checkbox(
-                                        label="Sem acentuação", id="remove-accents", value=False
-                                    ),
-                                ]
-                            ),
-                        ]
-                    ),
-                    dbc.ModalFooter(
-                        [
-                            dbc.Button("Download", id="download-button", className="mr-2", color="success"),
-                            dbc.Button("Fechar", id="close-modal-button", color="danger"),
-                        ]
-                    ),
-                ],
-                id="modal",
-                is_open=False,
-            ),
-        ],
-        fluid=True,
-    )
+                                dbc.Button("Fechar", id="close-modal-button", color="danger"),
+                            ]
+                        ),
+                    ],
+                    id="modal",
+                    is_open=False,
+                ),
+            ],
+            fluid=True,
+        )
+
+    app.layout = serve_layout
+    data.load_on_request(server, app.config.url_base_pathname)
 
     # ╭──────────────────────────────────────────────────────────────────────╮
     # │ CALLBACK PARA RESETAR FILTROS                                        │
@@ -306,181 +379,172 @@ def register_ameaca_area_protecao(server) -> dash.Dash:
             Output("modalidade-dropdown", "value"),
             Output("uso-dropdown", "value"),
             Output("state-dropdown", "value"),
-            Output("selected-states", "data"),
         ],
         Input("reset-button", "n_clicks"),
         prevent_initial_call=True,
     )
     def reset_filters(n_clicks):
         if n_clicks:
-            # Limpa todos os filtros e seleção de estados
-            return None, None, None, []
-        return no_update, no_update, no_update, no_update
-
-    # ╭─ callbacks principais ───────────────────────────────────────────────╮
-    @app.callback(
+            # Limpa todos os filtros (a seleção é limpa no navegador)
+            return None, None, None
+        return no_update, no_update, no_update
+
+    # ╭─ seleção (assets/selecao.js): sem ida ao servidor ───────────────────╮
+    # Clique na barra/mapa alterna o nome; reset limpa
+    app.clientside_callback(
+        ClientsideFunction("ap", "alternarSelecao"),
+        Output("selected-states", "data"),
         [
-            Output("bar-graph", "figure"),
-            Output("map-graph", "figure"),
-            Output("pie-uso-graph", "figure"),
-            Output("pie-unid-graph", "figure"),
-            Output("selected-states", "data"),
-            Output("top-10-table", "children"),
-        ],
-        [
-            Input("modalidade-dropdown", "value"),
-            Input("uso-dropdown", "value"),
-            Input("state-dropdown", "value"),
+            Input("reset-button", "n_clicks"),
             Input("bar-graph", "clickData"),
             Input("map-graph", "clickData"),
         ],
         [State("selected-states", "data")],
+        prevent_initial_call=True,
+    )
+    # Destaque imediato; as barras do servidor chegam quando o filtro muda
+    app.clientside_callback(
+        ClientsideFunction("ap", "destacarBarras"),
+        Output("bar-graph", "figure", allow_duplicate=True),
+        Input("selected-states", "data"),
+        State("bar-graph", "figure"),
+        prevent_initial_call=True,
     )
-    def update_graphs(
-        modalidade, uso, states, bar_click_data, map_click_data, selected_states
-    ):
-        # Clique em barra
-        if bar_click_data:
-            clicked_name = bar_click_data["points"][0]["y"]
-            if clicked_name in selected_states:
-                selected_states.remove(clicked_name)
-            else:
-                selected_states.append(clicked_name)
-
-        # Clique no mapa
-        if map_click_data:
-            clicked_name = map_click_data["points"][0]["location"]
-            if clicked_name in selected_states:
-                selected_states.remove(clicked_name)
-            else:
-                selected_states.append(clicked_name)
-
-        # Filtragem
-        filtered_df = df.copy()
 
+    # ╭─ callbacks principais ───────────────────────────────────────────────╮
+    # cada saída tem o seu callback, sobre o mesmo top-N filtrado
+    FILTER_INPUTS = [
+        Input("modalidade-dropdown", "value"),
+        Input("uso-dropdown", "value"),
+        Input("state-dropdown", "value"),
+        Input("selected-states", "data"),
+    ]
+
+    def _filters(modalidade, uso, states, selected_states) -> dict:
         if modalidade:
             modalidade = modalidade if isinstance(modalidade, list) else [modalidade]
-            filtered_df = filtered_df[filtered_df["MODALIDADE"].isin(modalidade)]
 
         if uso:
             uso = uso if isinstance(uso, list) else [uso]
-            filtered_df = filtered_df[filtered_df["USO"].isin(uso)]
-
-        if states:
-            filtered_df = filtered_df[filtered_df["UF"].isin(states)]
-
-        if selected_states:
-            filtered_df = filtered_df[filtered_df["NOME"].isin(selected_states)]
-
-        # Top-10 e tabela
-        top_10 = filtered_df.nlargest(10, "DESMATAM_1")
-
-        table_header = html.Thead(
-            html.Tr(
-                [
-                    html.Th("Nome"),
-                    html.Th("Focos de Calor"),
-                    html.Th("Número de CAR"),
-                    html.Th("Área de CAR"),
-                    html.Th("Estradas Não Oficiais"),
-                ]
+
+        return {
+            "MODALIDADE": modalidade or None,
+            "USO": uso or None,
+            "UF": states or None,
+            "NOME": selected_states or None,
+        }
+
+    # Gráfico de barras
+    @app.callback(Output("bar-graph", "figure"), *FILTER_INPUTS)
+    def update_bar(modalidade, uso, states, selected_states):
+        selected_states = selected_states or []
+
+        def build(top_10):
+            bar_colors = ["green" if n in selected_states else "DarkSeaGreen" for n in top_10["NOME"]]
+            bar_fig = go.Figure(
+                go.Bar(
+                    y=top_10["NOME"],
+                    x=top_10["DESMATAM_1"],
+                    orientation="h",
+                    marker_color=bar_colors,
+                    text=[f"{v:.2f} km²" for v in top_10["DESMATAM_1"]],
+                    textposition="auto",
+                )
             )
-        )
-        table_body = [
-            html.Tr(
-                [
-                    html.Td(row["NOME"]),
-                    html.Td(row["FOCOS DE C"]),
-                    html.Td(row["N DE CAR"]),
-                    html.Td(f"{row['CAR']:.2f} km²"),
-                    html.Td(f"{row['ESTRADAS N']:.2f} km"),
-                ]
+            bar_fig.update_yaxes(autorange="reversed")
+            bar_fig.update_layout(
+                xaxis_title="Área (km²)",
+                yaxis_title="Área de Proteção Ambiental",
+                bargap=0.1,
+                font=dict(size=10),
+                title=dict(
+                    text=f"Top {TOP_N} Área de Proteção Ambiental por Desmatamento",
+                    x=0.5,
+                    xanchor="center",
+                    yanchor="top",
+                ),
             )
-            for _, row in top_10.iterrows()
-        ]
-        table_component = dbc.Table(
-            [table_header, html.Tbody(table_body)],
-            bordered=False,
-            hover=True,
-            responsive=True,
-            striped=True,
-        )
+            return bar_fig
+
+        filters = _filters(modalidade, uso, states, selected_states)
+        return generate(data, "bar", data.snapshot(), filters, build)
+
+    # Mapa: geometrias pela URL versionada, no nível de detalhe do zoom
+    # (cada nível baixado uma vez, em TopoJSON); depois, Patch
+    register_map(
+        app,
+        data,
+        FILTER_INPUTS,
+        _filters,
+        graph="map-graph",
+        mode="map-mode",
+        figure="map-figure",
+        version="map-version",
+        title="Mapa de Ameaça de Desmatamento (km²)",
+        color=None,
+        maplibre=True,
+    )
 
-        # Gráfico de barras
-        bar_colors = ["green" if n in selected_states else "DarkSeaGreen" for n in top_10["NOME"]]
-        bar_fig = go.Figure(
-            go.Bar(
-                y=top_10["NOME"],
-                x=top_10["DESMATAM_1"],
-                orientation="h",
-                marker_color=bar_colors,
-                text=[f"{v:.2f} km²" for v in top_10["DESMATAM_1"]],
-                textposition="auto",
+    # Pizzas
+    pie_colors = px.colors.sequential.YlOrRd
+
+    @app.callback(Output("pie-uso-graph", "figure"), *FILTER_INPUTS)
+    def update_pie_uso(modalidade, uso, states, selected_states):
+        def build(top_10):
+            pie_uso_fig = px.pie(
+                top_10,
+                values="DESMATAM_1",
+                names="UF",
+                color="MODALIDADE",
+                title="Ameaça Desmatamento por Estado de Uso e Categoria",
+            )
+            pie_uso_fig.update_traces(textinfo="percent+label", marker=dict(colors=pie_colors))
+            return pie_uso_fig
+
+        filters = _filters(modalidade, uso, states, selected_states)
+        return generate(data, "pie-uso", data.snapshot(), filters, build)
+
+    @app.callback(Output("pie-unid-graph", "figure"), *FILTER_INPUTS)
+    def update_pie_unid(modalidade, uso, states, selected_states):
+        def build(top_10):
+            pie_unid_fig = px.pie(
+                top_10,
+                values="DESMATAM_1",
+                names="NOME",
+                color="UF",
+                title="Ameaça Desmatamento por Terra Indígena",
+            )
+            pie_unid_fig.update_traces(
+                textinfo="none",
+                hoverinfo="label+value+percent",
+                marker=dict(colors=pie_colors),
+            )
+            return pie_unid_fig
+
+        filters = _filters(modalidade, uso, states, selected_states)
+        return generate(data, "pie-unid", data.snapshot(), filters, build)
+
+    # Tabela
+    @app.callback(Output("top-10-table", "children"), *FILTER_INPUTS)
+    def update_table(modalidade, uso, states, selected_states):
+        def build(top_10):
+            table_header = html.Thead(html.Tr([html.Th(h) for h in TABLE_HEADERS]))
+            table_body = [html.Tr([html.Td(v) for v in row]) for row in table_rows(top_10)]
+            return dbc.Table(
+                [table_header, html.Tbody(table_body)],
+                bordered=False,
+                hover=True,
+                responsive=True,
+                striped=True,
             )
-        )
-        bar_fig.update_yaxes(autorange="reversed")
-        bar_fig.update_layout(
-            xaxis_title="Área (km²)",
-            yaxis_title="Área de Proteção Ambiental",
-            bargap=0.1,
-            font=dict(size=10),
-            title=dict(
-                text="Top 10 Área de Proteção Ambiental por Desmatamento",
-                x=0.5,
-                xanchor="center",
-                yanchor="top",
-            ),
-        )
 
-        # Mapa
-        map_fig = px.choropleth_map(
-            top_10,
-            geojson=roi,
-            #color="DESMATAM_1",
-            locations="NOME",
-            featureidkey="properties.NOME",
-            map_style="carto-positron",
-            center=dict(lat=-14, lon=-55),
-            color_continuous_scale="YlOrRd",
-            zoom=4,
-        )
-        map_fig.update_layout(
-            title=dict(
-                text="Mapa de Ameaça de Desmatamento (km²)",
-                x=0.5,
-                xanchor="center",
-                yanchor="top",
-                font=dict(size=14),
-            ),
-            margin=dict(r=0, t=50, l=0, b=0),
-            mapbox=dict(zoom=3, center=dict(lat=-14, lon=-55), style="open-street-map"),
-        )
+        filters = _filters(modalidade, uso, states, selected_states)
+        return generate(data, "table", data.snapshot(), filters, build)
 
-        # Pizzas
-        pie_colors = px.colors.sequential.YlOrRd
-        pie_uso_fig = px.pie(
-            top_10,
-            values="DESMATAM_1",
-            names="UF",
-            color="MODALIDADE",
-            title="Ameaça Desmatamento por Estado de Uso e Categoria",
-        )
-        pie_uso_fig.update_traces(textinfo="percent+label", marker=dict(colors=pie_colors))
-
-        pie_unid_fig = px.pie(
-            top_10,
-            values="DESMATAM_1",
-            names="NOME",
-            color="UF",
-            title="Ameaça Desmatamento por Terra Indígena",
-        )
-        pie_unid_fig.update_traces(
-            textinfo="none",
-            hoverinfo="label+value+percent",
-            marker=dict(colors=pie_colors),
-        )
-
-        return bar_fig, map_fig, pie_uso_fig, pie_unid_fig, selected_states, table_component
+    # Ranking completo, paginado no servidor pelo RANK (cursores no navegador)
+    register_ranking(
+        app, data, FILTER_INPUTS, _filters, table="ranking-table", cursors="ranking-cursors"
+    )
 
     # ---------- abrir/fechar modal de download -----------------------------
     @app.callback(
@@ -493,27 +557,21 @@ def register_ameaca_area_protecao(server) -> dash.Dash:
             return not is_open
         return is_open
 
-    # ---------- download CSV ----------------------------------------------
+    # ---------- download ---------------------------------------------------
+    # Em streaming pela rota de exportação (app.data.export), só com as UFs
+    # marcadas; o link e o nome do arquivo acompanham as opções do modal
     @app.callback(
-        Output("download-dataframe-csv", "data"),
-        Input("download-button", "n_clicks"),
-        State("decimal-separator", "value"),
-        State("remove-accents", "value"),
+        Output("download-link", "href"),
+        Output("download-link", "download"),
+        Input("state-checklist", "value"),
+        Input("decimal-separator", "value"),
+        Input("remove-accents", "value"),
+        Input("export-format", "value"),
     )
-    def download_csv(n_clicks, decimal_separator, remove_accents):
-        if not n_clicks:
-            return dash.no_update
-
-        export_df = df.copy()
-        if remove_accents:
-            export_df = export_df.applymap(
-                lambda x: unidecode.unidecode(x) if isinstance(x, str) else x
-            )
-
-        buff = io.StringIO()
-        export_df.to_csv(buff, index=False, sep=decimal_separator)
-        buff.seek(0)
-        return dcc.send_data_frame(export_df.to_csv, "ameaca_area_protecao.csv", sep=decimal_separator)
+    def download_link(states, decimal_separator, remove_accents, export_format):
+        extension = EXPORT_FORMATS[export_format][0]
+        return (data.export_url(states, decimal_separator, remove_accents, export_format),
+                f"ameaca_area_protecao.{extension}")
 
     # ----------------------------------------------------------------------
     return app
@@ -7,49 +7,22 @@ Rota Flask: /ap/ameaca_ucs/
 # ───────────────────────── imports ─────────────────────────
 from __future__ import annotations
 
-import io
-import os
-import tempfile
-import requests
+from pathlib import Path
 
 import dash
 import dash_bootstrap_components as dbc
-import geopandas as gpd
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import unidecode
-from dash import html, dcc, Input, Output, State
-
-# ───────────── helpers de download (dribla HTTP-429) ──────
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-def _tmp_from_url(url: str, suffix: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    f = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    f.write(r.content); f.close()
-    return f.name
-
-def load_geojson(url: str):
-    try:
-        return gpd.read_file(url)
-    except Exception:
-        try:
-            p = _tmp_from_url(url, ".geojson")
-            gdf = gpd.read_file(p); os.unlink(p); return gdf
-        except Exception:
-            return None
-
-def load_parquet(url: str) -> pd.DataFrame | None:
-    try:
-        return pd.read_parquet(url)
-    except Exception:
-        try:
-            buf = io.BytesIO(requests.get(url, headers=HEADERS, timeout=30).content)
-            return pd.read_parquet(buf)
-        except Exception:
-            return None
+import pyarrow.dataset as ds
+from dash import dash_table, html, dcc, ClientsideFunction, Input, Output, State
+
+from app.dashboards.common import generate, options, register_map, register_ranking
+from app.data.export import EXPORT_FORMATS
+from app.data.filters import TOP_N
+from app.data.registry import registry
+from app.data.table import TABLE_COLUMNS, TABLE_PAGE_SIZE, table_rows
+
+ASSETS_DIR = Path(__file__).resolve().parents[2] / "assets"  # assets/ da raiz
 
 # ───────────── URLs (CDN 1º / GitHub 2º) ──────────────────
 GEOJSON_URLS = [
@@ -66,38 +39,25 @@ PARQUET_URLS = [
 ]
 
 # ───────────── carrega datasets ────────────────────────────
-
-def load_df(url):
-    return pd.read_parquet(url)
-
-roi = load_geojson("https://raw.githubusercontent.com/imazon-cgi/ap/main/dataset/geojson/AMEACA_GERAL_UCs.geojson")
-roi['NOME'] = roi['NOME'].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-roi = roi.sort_values(by='RANK')
-
-df = load_df('https://github.com/imazon-cgi/ap/raw/refs/heads/main/dataset/csv/AMEACA_GERAL_UCs.parquet')
-df['NOME'] = df['NOME'].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-df = df.sort_values(by='RANK')
-
-
-
-# normaliza texto
-roi["NOME"] = roi["NOME"].str.upper().map(
-    lambda x: unidecode.unidecode(x) if isinstance(x, str) else x
-)
-roi = roi.sort_values("RANK")
-
-df["NOME"] = df["NOME"].str.upper().map(
-    lambda x: unidecode.unidecode(x) if isinstance(x, str) else x
+# só as colunas e linhas que o dashboard usa
+COLUMNS = [
+    "RANK", "NOME", "UF", "MODALIDADE", "USO", "CATEGORIA",
+    "DESMATAM_1", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N",
+]
+FILTER = ds.field("MODALIDADE").isin(["UC Federal", "UC Estadual"])
+data = registry.register(
+    "AMEACA_GERAL_UCs", GEOJSON_URLS, PARQUET_URLS,
+    columns=COLUMNS, filter=FILTER,
 )
-df = df.sort_values("RANK")
 
 # ───────────── opções de filtros ──────────────────────────
-STATE_OPTS = [{"label": s, "value": s} for s in sorted(df["UF"].dropna().unique())]
 MODAL_OPTS = [{"label": "UC Federal",  "value": "UC Federal"},
               {"label": "UC Estadual", "value": "UC Estadual"}]
 USO_OPTS   = [{"label": "Uso Sustentável",  "value": "Uso Sustentavel"},
               {"label": "Proteção Integral", "value": "Protecao Integral"}]
 
+CABECALHO = ["Nome", "Focos de Calor", "Nº CAR", "Área CAR", "Estradas Não Oficiais"]
+
 # ╭──────────────────────────────────────────────────────────╮
 # │ função pública – registra o dashboard                   │
 # ╰──────────────────────────────────────────────────────────╯
@@ -105,6 +65,7 @@ def register_ameaca_ucs(flask_server):
     dash_app = dash.Dash(
         __name__,
         server=flask_server,
+        assets_folder=str(ASSETS_DIR),
         url_base_pathname="/ap/ameaca_ucs/",
         external_stylesheets=[
             dbc.themes.BOOTSTRAP,
@@ -115,234 +76,286 @@ def register_ameaca_ucs(flask_server):
     )
 
     # ───────────── layout ────────────────────────────────
-    dash_app.layout = dbc.Container(
-        [
-            html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
+    def serve_layout():
+        # opções dependentes dos dados: vazias até a primeira carga
+        loaded = data.peek()
+        df = loaded[1] if loaded else None
+        state_opts = options(df, "UF")
+
+        return dbc.Container(
+            [
+                html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
+
+                # -------- cabeçalho / filtros --------
+                dbc.Row(
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody(
+                                [
+                                    #html.H1("Análise de Ameaça de Desmatamento - Amazônia Legal",
+                                    #        className="text-center mb-4"),
+                                    dbc.Row(
+                                        [
+                                            # modalidade
+                                            dbc.Col(html.Label("Modalidade:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="modalidade", options=MODAL_OPTS,
+                                                             value="UC Federal", clearable=False),
+                                                width=3,
+                                            ),
+                                            # uso
+                                            dbc.Col(html.Label("Uso:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="uso", options=USO_OPTS,
+                                                             value="Uso Sustentavel", clearable=False),
+                                                width=3,
+                                            ),
+                                            # UF
+                                            dbc.Col(html.Label("UF:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="uf", options=state_opts,
+                                                             multi=True, placeholder="Selecione o(s) Estado(s)"),
+                                                width=3,
+                                            ),
+                                            # botões
+                                            dbc.Col(
+                                                dbc.Button([html.I(className="fa fa-filter mr-1"), "Remover Filtros"],
+                                                           id="reset", color="primary", className="btn-sm"),
+                                                width="auto",
+                                            ),
+                                            dbc.Col(
+                                                dbc.Button([html.I(className="fa fa-download mr-1"), "Baixar CSV"],
+                                                           id="open-modal", color="secondary", className="btn-sm"),
+                                                width="auto",
+                                            ),
+                                        ],
+                                        justify="end",
+                                        className="mb-3 align-items-center",
+                                    ),
+                                ]
+                            ),
+                            className="mb-4",style={"border": "none"},
+                        )
+                    )
+                ),
+
+                # -------- gráficos --------
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Card(dcc.Graph(id="bar"),  className="graph-block"), width=12, lg=6),
+                        dbc.Col(dbc.Card([
+                            dbc.RadioItems(
+                                id="modo-mapa", inline=True, value="top",
+                                options=[{"label": f"Top {TOP_N} (polígonos)", "value": "top"},
+                                         {"label": "Todas (pontos)", "value": "pontos"}],
+                                className="px-2 pt-2",
+                            ),
+                            dcc.Graph(id="map"),
+                        ], className="graph-block"), width=12, lg=6),
+                    ],
+                    className="mb-4",style={"border": "none"},
+                ),
+                dcc.Store(id="selecionados", data=[]),
+                dcc.Store(id="mapa-versao"),
+                dcc.Store(id="mapa-figura"),
+                dcc.Store(id="ranking-cursores"),
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Card(dcc.Graph(id="pie-uso"), className="graph-block"), width=12, lg=6),
+                        dbc.Col(dbc.Card(dcc.Graph(id="pie-uc"),  className="graph-block"), width=12, lg=6),
+                    ],
+                    className="mb-4",style={"border": "none"},
+                ),
+
+                # -------- tabela --------
+                dbc.Row(
+                    dbc.Col(
+                        dbc.Card(
+                            [
+                                dbc.CardHeader(f"Top {TOP_N} Áreas Protegidas Mais Afetadas"),
+                                dbc.CardBody(dbc.Tabs([
+                                    dbc.Tab(dbc.Table(id="top10", bordered=False, hover=True,
+                                                      responsive=True, striped=True),
+                                            label=f"Top {TOP_N}"),
+                                    # ranking completo, paginado no servidor
+                                    dbc.Tab(dash_table.DataTable(
+                                        id="ranking",
+                                        columns=[{"name": n, "id": c}
+                                                 for c, n in zip(TABLE_COLUMNS, CABECALHO)],
+                                        page_action="custom", page_current=0,
+                                        page_size=TABLE_PAGE_SIZE,
+                                        virtualization=True, fixed_rows={"headers": True},
+                                        style_table={"height": "400px", "overflowY": "auto"},
+                                        style_cell={"textAlign": "left"},
+                                    ), label="Ranking completo"),
+                                ])),
+                            ],
+                        
+                            className="mb-4",style={"border": "none"},
+                        )
+                    )
+                ),
 
-            # -------- cabeçalho / filtros --------
-            dbc.Row(
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
+                # -------- modal de download --------
+                dbc.Modal(
+                    [
+                        dbc.ModalHeader(dbc.ModalTitle("Unidades de Conservação – baixar dados")),
+                        dbc.ModalBody(
                             [
-                                #html.H1("Análise de Ameaça de Desmatamento - Amazônia Legal",
-                                #        className="text-center mb-4"),
-                                dbc.Row(
-                                    [
-                                        # modalidade
-                                        dbc.Col(html.Label("Modalidade:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="modalidade", options=MODAL_OPTS,
-                                                         value="UC Federal", clearable=False),
-                                            width=3,
-                                        ),
-                                        # uso
-                                        dbc.Col(html.Label("Uso:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="uso", options=USO_OPTS,
-                                                         value="Uso Sustentavel", clearable=False),
-                                            width=3,
-                                        ),
-                                        # UF
-                                        dbc.Col(html.Label("UF:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="uf", options=STATE_OPTS,
-                                                         multi=True, placeholder="Selecione o(s) Estado(s)"),
-                                            width=3,
-                                        ),
-                                        # botões
-                                        dbc.Col(
-                                            dbc.Button([html.I(className="fa fa-filter mr-1"), "Remover Filtros"],
-                                                       id="reset", color="primary", className="btn-sm"),
-                                            width="auto",
-                                        ),
-                                        dbc.Col(
-                                            dbc.Button([html.I(className="fa fa-download mr-1"), "Baixar CSV"],
-                                                       id="open-modal", color="secondary", className="btn-sm"),
-                                            width="auto",
-                                        ),
-                                    ],
-                                    justify="end",
-                                    className="mb-3 align-items-center",
-                                ),
+                                dbc.Checklist(options=state_opts, id="uf-check", inline=True),
+                                html.Hr(),
+                                html.Label("Formato"),
+                                dbc.RadioItems(options=[{"label": "CSV", "value": "csv"},
+                                                        {"label": "Parquet", "value": "parquet"},
+                                                        {"label": "GeoParquet", "value": "geoparquet"},
+                                                        {"label": "GeoJSON", "value": "geojson"}],
+                                               value="csv", id="formato", inline=True),
+                                html.Hr(),
+                                html.Label("Configurações CSV"),
+                                dbc.RadioItems(options=[{"label": "Ponto", "value": "."},
+                                                        {"label": "Vírgula", "value": ","}],
+                                               value=".", id="sep", inline=True),
+                                dbc.Checkbox(id="no-acc", label="Sem acentuação", value=False),
                             ]
                         ),
-                        className="mb-4",style={"border": "none"},
-                    )
-                )
-            ),
-            dcc.Download(id="download-csv"),
-
-            # -------- gráficos --------
-            dbc.Row(
-                [
-                    dbc.Col(dbc.Card(dcc.Graph(id="bar"),  className="graph-block"), width=12, lg=6),
-                    dbc.Col(dbc.Card(dcc.Graph(id="map"),  className="graph-block"), width=12, lg=6),
-                ],
-                className="mb-4",style={"border": "none"},
-            ),
-            dcc.Store(id="selecionados", data=[]),
-            dbc.Row(
-                [
-                    dbc.Col(dbc.Card(dcc.Graph(id="pie-uso"), className="graph-block"), width=12, lg=6),
-                    dbc.Col(dbc.Card(dcc.Graph(id="pie-uc"),  className="graph-block"), width=12, lg=6),
-                ],
-                className="mb-4",style={"border": "none"},
-            ),
-
-            # -------- tabela --------
-            dbc.Row(
-                dbc.Col(
-                    dbc.Card(
-                        [
-                            dbc.CardHeader("Top 10 Áreas Protegidas Mais Afetadas"),
-                            dbc.CardBody(dbc.Table(id="top10", bordered=False, hover=True,
-                                                   responsive=True, striped=True)),
-                        ],
-                        
-                        className="mb-4",style={"border": "none"},
-                    )
-                )
-            ),
-
-            # -------- modal CSV --------
-            dbc.Modal(
-                [
-                    dbc.ModalHeader(dbc.ModalTitle("Unidades de Conservação – baixar CSV")),
-                    dbc.ModalBody(
-                        [
-                            dbc.Checklist(options=STATE_OPTS, id="uf-check", inline=True),
-                            html.Hr(),
-                            html.Label("Configurações CSV"),
-                            dbc.RadioItems(options=[{"label": "Ponto", "value": "."},
-                                                    {"label": "Vírgula", "value": ","}],
-                                           value=".", id="sep", inline=True),
-                            dbc.Checkbox(id="no-acc", label="Sem acentuação", value=False),
-                        ]
-                    ),
-                    dbc.ModalFooter(
-                        [
-                            dbc.Button("Download", id="dwn-btn", color="success"),
-                            dbc.Button("Fechar", id="close-modal", color="danger"),
-                        ]
-                    ),
-                ],
-                id="modal",
-                is_open=False,
-            ),
-        ],
-        fluid=True,
-    )
+                        dbc.ModalFooter(
+                            [
+                                html.A(dbc.Button("Download", id="dwn-btn", color="success"),
+                                       id="dwn-link", download="ameaca_ucs.csv"),
+                                dbc.Button("Fechar", id="close-modal", color="danger"),
+                            ]
+                        ),
+                    ],
+                    id="modal",
+                    is_open=False,
+                ),
+            ],
+            fluid=True,
+        )
 
-    # ───────────── callbacks principais ──────────────────
-    @dash_app.callback(
-        [
-            Output("bar", "figure"),
-            Output("map", "figure"),
-            Output("pie-uso", "figure"),
-            Output("pie-uc", "figure"),
-            Output("selecionados", "data"),
-            Output("top10", "children"),
-        ],
+    dash_app.layout = serve_layout
+    data.load_on_request(flask_server, dash_app.config.url_base_pathname)
+
+    # ───────────── seleção ───────────────────────────────
+    # assets/selecao.js: alterna o nome clicado (barra ou mapa) ou limpa no
+    # reset, sem ida ao servidor
+    dash_app.clientside_callback(
+        ClientsideFunction("ap", "alternarSelecao"),
+        Output("selecionados", "data"),
         [
-            Input("modalidade", "value"),
-            Input("uso", "value"),
-            Input("uf", "value"),
             Input("reset", "n_clicks"),
             Input("bar", "clickData"),
             Input("map", "clickData"),
         ],
         State("selecionados", "data"),
+        prevent_initial_call=True,
+    )
+    # destaque imediato; as barras do servidor chegam quando o filtro muda
+    dash_app.clientside_callback(
+        ClientsideFunction("ap", "destacarBarras"),
+        Output("bar", "figure", allow_duplicate=True),
+        Input("selecionados", "data"),
+        State("bar", "figure"),
+        prevent_initial_call=True,
     )
-    def atualizar(modalidade, uso, uf, reset, bar_click, map_click, sel):
-        selecionados = sel or []
-        if reset:
-            selecionados = []
-
-        for click in (bar_click, map_click):
-            if click:
-                nome = click["points"][0].get("y") or click["points"][0].get("location")
-                if nome:
-                    selecionados = (
-                        [n for n in selecionados if n != nome]
-                        if nome in selecionados else selecionados + [nome]
-                    )
 
-        dff = df[(df["MODALIDADE"] == modalidade) & (df["USO"] == uso)]
-        if uf:
-            dff = dff[dff["UF"].isin(uf)]
-        if selecionados:
-            dff = dff[dff["NOME"].isin(selecionados)]
-
-        top10 = dff.nlargest(10, "DESMATAM_1")
-
-        # tabela
-        thead = html.Thead(html.Tr([
-            html.Th("Nome"), html.Th("Focos de Calor"), html.Th("Nº CAR"),
-            html.Th("Área CAR"), html.Th("Estradas Não Oficiais")
-        ]))
-        tbody = html.Tbody([
-            html.Tr([
-                html.Td(r["NOME"]),
-                html.Td(r["FOCOS DE C"]),
-                html.Td(r["N DE CAR"]),
-                html.Td(f"{r['CAR']:.2f} km²"),
-                html.Td(f"{r['ESTRADAS N']:.2f} km"),
-            ]) for _, r in top10.iterrows()
-        ])
-        tabela = dbc.Table(
-    [thead, tbody],
-    bordered=False,    # desliga as bordas padrão
-    hover=True,
-    responsive=True,
-    striped=True,
-    style={"border": "none"}  # remove qualquer borda remanescente
-)
+    # ───────────── callbacks principais ──────────────────
+    # cada saída tem o seu callback, sobre o mesmo top-N filtrado
+    FILTROS = [
+        Input("modalidade", "value"),
+        Input("uso", "value"),
+        Input("uf", "value"),
+        Input("selecionados", "data"),
+    ]
+
+    def _filtros(modalidade, uso, uf, selecionados):
+        return {
+            "MODALIDADE": [modalidade],
+            "USO": [uso],
+            "UF": uf or None,
+            "NOME": selecionados or None,
+        }
+
+    # barras
+    @dash_app.callback(Output("bar", "figure"), *FILTROS)
+    def atualizar_barras(modalidade, uso, uf, sel):
+        selecionados = sel or []
 
-        # barras
-        bar = go.Figure(
-            go.Bar(
-                y=top10["NOME"], x=top10["DESMATAM_1"], orientation="h",
-                marker_color=["green" if n in selecionados else "DarkSeaGreen" for n in top10["NOME"]],
-                text=[f"{v:.2f} km²" for v in top10["DESMATAM_1"]],
-                textposition="auto",
+        def montar(top10):
+            bar = go.Figure(
+                go.Bar(
+                    y=top10["NOME"], x=top10["DESMATAM_1"], orientation="h",
+                    marker_color=["green" if n in selecionados else "DarkSeaGreen" for n in top10["NOME"]],
+                    text=[f"{v:.2f} km²" for v in top10["DESMATAM_1"]],
+                    textposition="auto",
+                )
             )
-        )
-        bar.update_yaxes(autorange="reversed")
-        bar.update_layout(
-            xaxis_title="Área (km²)", yaxis_title="Unidades de Conservação", bargap=0.1,
-            font=dict(size=10),
-            title=dict(text="Top 10 UCs por Desmatamento", x=0.5, xanchor="center"),
-        )
+            bar.update_yaxes(autorange="reversed")
+            bar.update_layout(
+                xaxis_title="Área (km²)", yaxis_title="Unidades de Conservação", bargap=0.1,
+                font=dict(size=10),
+                title=dict(text=f"Top {TOP_N} UCs por Desmatamento", x=0.5, xanchor="center"),
+            )
+            return bar
 
-        # mapa
-        mapa = px.choropleth_mapbox(
-            top10, geojson=roi, color="DESMATAM_1",
-            locations="NOME", featureidkey="properties.NOME",
-            mapbox_style="carto-positron",
-            center=dict(lat=-14, lon=-55),
-            color_continuous_scale="YlOrRd",
-            zoom=4,
-        )
-        mapa.update_layout(
-            title=dict(text="Mapa de Ameaça de Desmatamento (km²)",
-                       x=0.5, xanchor="center", font=dict(size=14)),
-            margin=dict(r=0, t=50, l=0, b=0),
-            mapbox=dict(style="open-street-map", zoom=3,
-                        center=dict(lat=-14, lon=-55)),
-        )
+        filtros = _filtros(modalidade, uso, uf, selecionados)
+        return generate(data, "bar", data.snapshot(), filtros, montar)
+
+    # mapa: geometrias pela URL versionada, no nível de detalhe do zoom
+    # (cada nível baixado uma vez, em TopoJSON); depois, Patch
+    register_map(
+        dash_app, data, FILTROS, _filtros,
+        graph="map", mode="modo-mapa", figure="mapa-figura", version="mapa-versao",
+        title="Mapa de Ameaça de Desmatamento (km²)", points_mode="pontos",
+    )
 
-        # pizzas
-        cores = px.colors.sequential.YlOrRd
-        pie_uso = px.pie(top10, values="DESMATAM_1", names="UF", color="CATEGORIA",
-                         title="Ameaça Desmatamento por  Estado de Uso e Categoria")
-        pie_uso.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+    # pizzas
+    cores = px.colors.sequential.YlOrRd
+
+    @dash_app.callback(Output("pie-uso", "figure"), *FILTROS)
+    def atualizar_pie_uso(modalidade, uso, uf, sel):
+        def montar(top10):
+            pie_uso = px.pie(top10, values="DESMATAM_1", names="UF", color="CATEGORIA",
+                             title="Ameaça Desmatamento por  Estado de Uso e Categoria")
+            pie_uso.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+            return pie_uso
+
+        filtros = _filtros(modalidade, uso, uf, sel)
+        return generate(data, "pie-uso", data.snapshot(), filtros, montar)
+
+    @dash_app.callback(Output("pie-uc", "figure"), *FILTROS)
+    def atualizar_pie_uc(modalidade, uso, uf, sel):
+        def montar(top10):
+            pie_uc = px.pie(top10, values="DESMATAM_1", names="NOME", color="USO",
+                            title="Ameaça Desmatamento por Unidade de Conservação")
+            pie_uc.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+            return pie_uc
+
+        filtros = _filtros(modalidade, uso, uf, sel)
+        return generate(data, "pie-uc", data.snapshot(), filtros, montar)
+
+    # tabela
+    @dash_app.callback(Output("top10", "children"), *FILTROS)
+    def atualizar_tabela(modalidade, uso, uf, sel):
+        def montar(top10):
+            thead = html.Thead(html.Tr([html.Th(t) for t in CABECALHO]))
+            tbody = html.Tbody([
+                html.Tr([html.Td(v) for v in linha]) for linha in table_rows(top10)
+            ])
+            return dbc.Table(
+                [thead, tbody],
+                bordered=False,    # desliga as bordas padrão
+                hover=True,
+                responsive=True,
+                striped=True,
+                style={"border": "none"}  # remove qualquer borda remanescente
+            )
 
-        pie_uc = px.pie(top10, values="DESMATAM_1", names="NOME", color="USO",
-                        title="Ameaça Desmatamento por Unidade de Conservação")
-        pie_uc.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+        filtros = _filtros(modalidade, uso, uf, sel)
+        return generate(data, "top10", data.snapshot(), filtros, montar)
 
-        return bar, mapa, pie_uso, pie_uc, selecionados, tabela
+    # ranking completo, paginado no servidor pelo RANK (cursores no navegador)
+    register_ranking(dash_app, data, FILTROS, _filtros, table="ranking", cursors="ranking-cursores")
 
     # ───────────── modal / download ──────────────────────
     @dash_app.callback(
@@ -353,21 +366,19 @@ def register_ameaca_ucs(flask_server):
     def toggle_modal(n_open, n_close, opened):
         return not opened if n_open or n_close else opened
 
+    # o arquivo sai em streaming da rota de exportação (app.data.export), só
+    # com as UFs marcadas; o link e o nome do arquivo acompanham o modal
     @dash_app.callback(
-        Output("download-csv", "data"),
-        Input("dwn-btn", "n_clicks"),
-        State("sep", "value"),
-        State("no-acc", "value"),
-        prevent_initial_call=True,
+        Output("dwn-link", "href"),
+        Output("dwn-link", "download"),
+        Input("uf-check", "value"),
+        Input("sep", "value"),
+        Input("no-acc", "value"),
+        Input("formato", "value"),
     )
-    def baixar_csv(n, sep, no_acc):
-        if not n:
-            return dash.no_update
-        out = df.copy()
-        if no_acc:
-            out = out.applymap(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-        return dcc.send_data_frame(out.to_csv, "ameaca_ucs.csv",
-                                   sep=sep, index=False)
+    def link_download(ufs, sep, no_acc, formato):
+        extensao = EXPORT_FORMATS[formato][0]
+        return data.export_url(ufs, sep, no_acc, formato), f"ameaca_ucs.{extensao}"
 
     return dash_app
 
@@ -0,0 +1,200 @@
+# app/dashboards/common.py
+"""
+Peças comuns dos dashboards
+---------------------------
+Os seis dashboards têm o mesmo esqueleto: saídas montadas sobre o top-N
+filtrado, mapa atualizado por Patch e ranking completo paginado.  O que não
+depende de textos nem de ids fica aqui; cada dashboard passa só os seus ids,
+colunas e a função que converte os valores dos filtros no dicionário do
+``FilterIndex``.
+
+* ``generate``: saída de um callback no ``ResultCache`` do dataset, montada
+  uma vez por versão e filtro;
+* ``register_map``: mapa com as geometrias pela URL versionada, no nível de
+  detalhe do zoom.  Versão, nível e modo desenhados ficam num ``dcc.Store``;
+  enquanto não mudam, os filtros só trocam os traços (``dash.Patch``);
+* ``register_ranking``: ranking completo paginado por chave
+  (``app.data.table.ranking_page``), com os cursores no navegador.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+import dash
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from dash import ClientsideFunction, Input, Output, State
+
+from app.data.filters import TOP_N
+from app.data.geometry import lod_level, map_zoom
+from app.data.memo import filter_key
+from app.data.registry import Dataset
+from app.data.table import ranking_page
+
+METRIC = "DESMATAM_1"  # ordena o top-N, colore o mapa e dimensiona os pontos
+MAP_CENTER = dict(lat=-14, lon=-55)
+
+
+def options(df: Optional[pd.DataFrame], col: str) -> list[dict]:
+    """Opções de dropdown com os valores de *col* (vazias até a primeira carga)."""
+    if df is None:
+        return []
+    return [{"label": v, "value": v} for v in sorted(df[col].dropna().unique())]
+
+
+def generate(data: Dataset, output, snap, filters: dict, build: Callable, *extra):
+    """Saída *output* do cache ou ``build(top)`` sobre o top-N filtrado."""
+    key = (snap.version, output, filter_key(filters), *extra)
+    return data.results.get_or_compute(
+        key, lambda: build(snap.df.iloc[snap.index.top(filters, METRIC, TOP_N)]),
+    )
+
+
+def points(areas: pd.DataFrame, lonlat: np.ndarray, maplibre: bool = False,
+           coloraxis: bool = True):
+    """Áreas em pontos (WebGL), com tamanho pela raiz do desmatamento; a cor
+    segue o ``coloraxis`` do choropleth ou, sem ele, tem escala própria."""
+    values = areas[METRIC].to_numpy(dtype=float)
+    top = np.nanmax(values, initial=0)
+    scale = np.sqrt(np.nan_to_num(values) / top) if top > 0 else np.zeros(len(values))
+    marker = dict(size=6 + 18 * scale, color=values, opacity=0.8)
+    if coloraxis:
+        marker["coloraxis"] = "coloraxis"
+    else:
+        marker.update(colorscale="YlOrRd", colorbar=dict(title="km²"))
+    trace = go.Scattermap if maplibre else go.Scattermapbox
+    return trace(
+        lon=lonlat[:, 0], lat=lonlat[:, 1], mode="markers",
+        customdata=areas["NOME"], text=areas["NOME"], marker=marker,
+        hovertemplate="%{text}<br>%{marker.color:.2f} km²<extra></extra>",
+        showlegend=False,
+    )
+
+
+# ╭─ mapa ───────────────────────────────────────────────────────────────────╮
+def register_map(app: dash.Dash, data: Dataset, inputs: list, to_filters: Callable[..., dict],
+                 *, graph: str, mode: str, figure: str, version: str, title: str,
+                 points_mode: str = "points", color: Optional[str] = METRIC,
+                 maplibre: bool = False) -> None:
+    """
+    Callbacks do mapa: *graph* é o ``dcc.Graph``, *mode* o seletor top-N /
+    pontos (*points_mode* é o valor do modo pontos), *figure* e *version* os
+    ``dcc.Store`` da figura e do que está desenhado.
+
+    *inputs* são os filtros do dashboard, convertidos por ``to_filters``.
+    *color* é a coluna do choropleth (``None``: sem escala de cor, e os
+    pontos com uma própria); *maplibre* usa os traços ``map`` no lugar dos
+    ``mapbox``.
+    """
+    subplot = "map" if maplibre else "mapbox"
+    choropleth = px.choropleth_map if maplibre else px.choropleth_mapbox
+
+    @app.callback(
+        Output(figure, "data"),
+        Output(version, "data"),
+        *inputs,
+        Input(mode, "value"),
+        Input(graph, "relayoutData"),
+        State(version, "data"),
+    )
+    def update_map(*args):
+        *values, map_mode, relayout, drawn = args
+        snap = data.snapshot()
+        drawn = drawn or {}
+        zoom = map_zoom(relayout)
+        level = lod_level(zoom) if zoom is not None else drawn.get("level", 0)
+        current = {"version": snap.version, "level": level, "mode": map_mode}
+        if dash.ctx.triggered_id == graph and current == drawn:
+            return dash.no_update, dash.no_update  # pan/zoom sem trocar de nível
+        filters = to_filters(*values)
+        in_points = map_mode == points_mode
+
+        # todas as áreas filtradas (tiles vetoriais), sob o top-N
+        layers = [] if in_points else [dict(
+            sourcetype="vector", source=data.tiles_url(snap.version, filters),
+            sourcelayer=data.name, type="fill", color="gray", opacity=0.25,
+            below="traces",
+        )]
+
+        def map_figure(top):
+            areas = top
+            if in_points:
+                # polígonos só dos selecionados; as demais áreas filtradas em pontos
+                rows = snap.index.rows({**filters, "NOME": None})
+                areas = snap.df.iloc[snap.index.rows(filters) if filters.get("NOME") else []]
+            fig = choropleth(
+                areas, geojson=data.geometry_url(snap.version, level),
+                color=color, locations="NOME", featureidkey="properties.NOME",
+                center=MAP_CENTER, color_continuous_scale="YlOrRd", zoom=4,
+                **{f"{subplot}_style": "carto-positron"},
+            )
+            fig.update_traces(meta=dict(topojson=data.topology_url(snap.version, level)))
+            # mapbox: fundo open-street-map, mais afastado; MapLibre: o do px
+            view = dict(layers=layers)
+            if not maplibre:
+                view.update(style="open-street-map", zoom=3, center=MAP_CENTER)
+            fig.update_layout(
+                title=dict(text=title, x=0.5, xanchor="center", yanchor="top",
+                           font=dict(size=14)),
+                margin=dict(r=0, t=50, l=0, b=0),
+                uirevision="map",  # zoom do usuário sobrevive às atualizações
+                **{subplot: view},
+            )
+            if in_points:
+                fig.add_trace(points(snap.df.iloc[rows], snap.points[rows],
+                                     maplibre, coloraxis=color is not None))
+            return fig
+
+        if drawn.get("version") == snap.version and drawn.get("mode") == map_mode:
+            def build(top):
+                patch = dash.Patch()
+                for i, trace in enumerate(map_figure(top).data):
+                    for prop, value in trace.to_plotly_json().items():
+                        patch["data"][i][prop] = value
+                patch["layout"][subplot]["layers"] = layers
+                return patch
+
+            patch = generate(data, ("map-patch", level, map_mode), snap, filters, build)
+            return patch, dash.no_update if current == drawn else current
+
+        return generate(data, ("map", level, map_mode), snap, filters, map_figure), current
+
+    # a figura passa pelo navegador, que decodifica o TopoJSON antes do plotly.js
+    app.clientside_callback(
+        ClientsideFunction("ap", "carregarGeometria"),
+        Output(graph, "figure"),
+        Input(figure, "data"),
+    )
+
+
+# ╭─ ranking ────────────────────────────────────────────────────────────────╮
+def register_ranking(app: dash.Dash, data: Dataset, inputs: list,
+                     to_filters: Callable[..., dict], *, table: str, cursors: str) -> None:
+    """Ranking completo na ``DataTable`` *table*: só a página pedida vai para
+    o navegador, buscada pelo RANK da última linha da página anterior
+    (cursores no ``dcc.Store`` *cursors*)."""
+
+    @app.callback(
+        Output(table, "data"),
+        Output(table, "page_count"),
+        Output(table, "page_current"),
+        Output(cursors, "data"),
+        *inputs,
+        Input(table, "page_current"),
+        State(cursors, "data"),
+    )
+    def update_ranking(*args):
+        *values, page, known = args
+        snap = data.snapshot()
+        filters = to_filters(*values)
+        known = known or {}
+        # filtro ou versão nova: primeira página, cursores descartados
+        if dash.ctx.triggered_id != table or known.get("version") != snap.version:
+            page, known = 0, {}
+        records, page, pages, keys = ranking_page(
+            snap.df, snap.index, filters, page or 0, known.get("keys", ()),
+        )
+        return records, pages, page, {"version": snap.version, "keys": keys}
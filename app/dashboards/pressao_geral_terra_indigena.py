@@ -7,49 +7,22 @@ Rota Flask: /ap/pressao_terras_indigenas/
 # ───────────────────────── imports ─────────────────────────
 from __future__ import annotations
 
-import io
-import os
-import tempfile
-import requests
+from pathlib import Path
 
 import dash
 import dash_bootstrap_components as dbc
-import geopandas as gpd
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import unidecode
-from dash import html, dcc, Input, Output, State
-
-# ───────────── helpers para baixar arquivos ───────────────
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-def _tmp_from_url(url: str, suffix: str) -> str:
-    r = requests.get(url, headers=HEADERS, timeout=30)
-    r.raise_for_status()
-    f = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    f.write(r.content); f.close()
-    return f.name
-
-def load_geojson(url: str):
-    try:
-        return gpd.read_file(url)
-    except Exception:
-        try:
-            p = _tmp_from_url(url, ".geojson")
-            gdf = gpd.read_file(p); os.unlink(p); return gdf
-        except Exception:
-            return None
-
-def load_parquet(url: str) -> pd.DataFrame | None:
-    try:
-        return pd.read_parquet(url)
-    except Exception:
-        try:
-            buf = io.BytesIO(requests.get(url, headers=HEADERS, timeout=30).content)
-            return pd.read_parquet(buf)
-        except Exception:
-            return None
+import pyarrow.dataset as ds
+from dash import dash_table, html, dcc, ClientsideFunction, Input, Output, State
+
+from app.dashboards.common import generate, options, register_map, register_ranking
+from app.data.export import EXPORT_FORMATS
+from app.data.filters import TOP_N
+from app.data.registry import registry
+from app.data.table import TABLE_COLUMNS, TABLE_PAGE_SIZE, table_rows
+
+ASSETS_DIR = Path(__file__).resolve().parents[2] / "assets"  # assets/ da raiz
 
 # ───────────── URLs (primeiro CDN, depois Raw) ─────────────
 GEOJSON_URLS = [
@@ -66,33 +39,21 @@ PARQUET_URLS = [
 ]
 
 # ───────────── carrega datasets ────────────────────────────
-def load_df(url):
-    return pd.read_parquet(url)
-
-# Carregamento dos dados
-roi = load_geojson("https://raw.githubusercontent.com/imazon-cgi/ap/main/dataset/geojson/PRESSAO_GERAL_Terra_indigena.geojson")
-roi['NOME'] = roi['NOME'].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-roi = roi.sort_values(by='RANK')
-
-df = load_df('https://github.com/imazon-cgi/ap/raw/refs/heads/main/dataset/csv/PRESSAO_GERAL_Terra_indigena.parquet')
-df['NOME'] = df['NOME'].str.upper().apply(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-df = df.sort_values(by='RANK')
-
-# normaliza texto
-roi["NOME"] = roi["NOME"].str.upper().map(
-    lambda x: unidecode.unidecode(x) if isinstance(x, str) else x
-)
-roi = roi.sort_values("RANK")
-
-df["NOME"] = df["NOME"].str.upper().map(
-    lambda x: unidecode.unidecode(x) if isinstance(x, str) else x
+# só as colunas e linhas que o dashboard usa
+COLUMNS = [
+    "RANK", "NOME", "UF", "MODALIDADE", "FASE",
+    "DESMATAM_1", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N",
+]
+FILTER = ds.field("MODALIDADE").isin(["Terra Indigena"])
+data = registry.register(
+    "PRESSAO_GERAL_Terra_indigena", GEOJSON_URLS, PARQUET_URLS,
+    columns=COLUMNS, filter=FILTER,
 )
-df = df.sort_values("RANK")
 
 # ───────────── filtros ─────────────────────────────────────
-STATE_OPTS = [{"label": s, "value": s} for s in sorted(df["UF"].dropna().unique())]
 MODAL_OPTS = [{"label": "Terra Indígena", "value": "Terra Indigena"}]
-FASE_OPTS  = [{"label": f, "value": f} for f in sorted(df["FASE"].dropna().unique())]
+
+CABECALHO = ["Nome", "Focos de Calor", "Nº CAR", "Área CAR", "Estradas Não Oficiais"]
 
 # ╭──────────────────────────────────────────────────────────╮
 # │ função pública – registra o dashboard                   │
@@ -101,6 +62,7 @@ def register_pressao_terras_indigenas(flask_server):
     dash_app = dash.Dash(
         __name__,
         server=flask_server,
+        assets_folder=str(ASSETS_DIR),
         url_base_pathname="/ap/pressao_terras_indigenas/",
         external_stylesheets=[
             dbc.themes.BOOTSTRAP,
@@ -111,239 +73,291 @@ def register_pressao_terras_indigenas(flask_server):
     )
 
     # ───────────── layout ────────────────────────────────
-    dash_app.layout = dbc.Container(
-        [
-            html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
+    def serve_layout():
+        # opções dependentes dos dados: vazias até a primeira carga
+        loaded = data.peek()
+        df = loaded[1] if loaded else None
+        state_opts = options(df, "UF")
+        fase_opts = options(df, "FASE")
+
+        return dbc.Container(
+            [
+                html.Meta(name="viewport", content="width=device-width, initial-scale=1"),
+
+                # ---------- filtros ----------
+                dbc.Row(
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody(
+                                [
+                                
+                                    dbc.Row(
+                                        [
+                                            # modalidade
+                                            dbc.Col(html.Label("Modalidade:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="modalidade", options=MODAL_OPTS,
+                                                             value="Terra Indigena", clearable=False),
+                                                width=3,
+                                            ),
+                                            # fase
+                                            dbc.Col(html.Label("Fase:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="fase", options=fase_opts,
+                                                             multi=True, placeholder="Selecione a(s) Fase(s)"),
+                                                width=3,
+                                            ),
+                                            # UF
+                                            dbc.Col(html.Label("UF:", className="fw-bold"), width="auto"),
+                                            dbc.Col(
+                                                dcc.Dropdown(id="uf", options=state_opts,
+                                                             multi=True, placeholder="Selecione o(s) Estado(s)"),
+                                                width=3,
+                                            ),
+                                            # botões
+                                            dbc.Col(dbc.Button([html.I(className="fa fa-filter mr-1"),
+                                                                "Remover Filtros"],
+                                                               id="reset", color="primary",
+                                                               className="btn-sm"), width="auto"),
+                                            dbc.Col(dbc.Button([html.I(className="fa fa-download mr-1"),
+                                                                "Baixar CSV"],
+                                                               id="open-modal", color="secondary",
+                                                               className="btn-sm"), width="auto"),
+                                        ],
+                                        justify="end",
+                                        className="mb-3 align-items-center",
+                                    ),
+                                ]
+                            ),
+                           className="mb-4",
+        style={"border": "none"}
+                        )
+                    )
+                ),
+
+                # ---------- gráficos ----------
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Card(dcc.Graph(id="bar"),  className="graph-block"), width=12, lg=6),
+                        dbc.Col(dbc.Card([
+                            dbc.RadioItems(
+                                id="modo-mapa", inline=True, value="top",
+                                options=[{"label": f"Top {TOP_N} (polígonos)", "value": "top"},
+                                         {"label": "Todas (pontos)", "value": "pontos"}],
+                                className="px-2 pt-2",
+                            ),
+                            dcc.Graph(id="map"),
+                        ], className="graph-block"), width=12, lg=6),
+                    ],
+                   className="mb-4",
+        style={"border": "none"}
+                ),
+                dcc.Store(id="selecionados", data=[]),
+                dcc.Store(id="mapa-versao"),
+                dcc.Store(id="mapa-figura"),
+                dcc.Store(id="ranking-cursores"),
+                dbc.Row(
+                    [
+                        dbc.Col(dbc.Card(dcc.Graph(id="pie-fase"),  className="graph-block"), width=12, lg=6),
+                        dbc.Col(dbc.Card(dcc.Graph(id="pie-ti"),    className="graph-block"), width=12, lg=6),
+                    ],
+                   className="mb-4",
+        style={"border": "none"}
+                ),
+
+                # ---------- tabela ----------
+                dbc.Row(
+                    dbc.Col(
+                        dbc.Card(
+                            [
+                                dbc.CardHeader(f"Top {TOP_N} Áreas Protegidas Mais Afetadas"),
+                                dbc.CardBody(dbc.Tabs([
+                                    dbc.Tab(dbc.Table(id="top10", bordered=False, hover=True,
+                                                      responsive=True, striped=True),
+                                            label=f"Top {TOP_N}"),
+                                    # ranking completo, paginado no servidor
+                                    dbc.Tab(dash_table.DataTable(
+                                        id="ranking",
+                                        columns=[{"name": n, "id": c}
+                                                 for c, n in zip(TABLE_COLUMNS, CABECALHO)],
+                                        page_action="custom", page_current=0,
+                                        page_size=TABLE_PAGE_SIZE,
+                                        virtualization=True, fixed_rows={"headers": True},
+                                        style_table={"height": "400px", "overflowY": "auto"},
+                                        style_cell={"textAlign": "left"},
+                                    ), label="Ranking completo"),
+                                ])),
+                            ],
+                           className="mb-4",
+        style={"border": "none"}
+                        )
+                    )
+                ),
 
-            # ---------- filtros ----------
-            dbc.Row(
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
+                # ---------- modal de download ----------
+                dbc.Modal(
+                    [
+                        dbc.ModalHeader(dbc.ModalTitle("Terras Indígenas – baixar dados")),
+                        dbc.ModalBody(
                             [
-                                
-                                dbc.Row(
-                                    [
-                                        # modalidade
-                                        dbc.Col(html.Label("Modalidade:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="modalidade", options=MODAL_OPTS,
-                                                         value="Terra Indigena", clearable=False),
-                                            width=3,
-                                        ),
-                                        # fase
-                                        dbc.Col(html.Label("Fase:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="fase", options=FASE_OPTS,
-                                                         multi=True, placeholder="Selecione a(s) Fase(s)"),
-                                            width=3,
-                                        ),
-                                        # UF
-                                        dbc.Col(html.Label("UF:", className="fw-bold"), width="auto"),
-                                        dbc.Col(
-                                            dcc.Dropdown(id="uf", options=STATE_OPTS,
-                                                         multi=True, placeholder="Selecione o(s) Estado(s)"),
-                                            width=3,
-                                        ),
-                                        # botões
-                                        dbc.Col(dbc.Button([html.I(className="fa fa-filter mr-1"),
-                                                            "Remover Filtros"],
-                                                           id="reset", color="primary",
-                                                           className="btn-sm"), width="auto"),
-                                        dbc.Col(dbc.Button([html.I(className="fa fa-download mr-1"),
-                                                            "Baixar CSV"],
-                                                           id="open-modal", color="secondary",
-                                                           className="btn-sm"), width="auto"),
-                                    ],
-                                    justify="end",
-                                    className="mb-3 align-items-center",
-                                ),
+                                dbc.Checklist(options=state_opts, id="uf-check", inline=True),
+                                html.Hr(),
+                                html.Label("Formato"),
+                                dbc.RadioItems(options=[{"label": "CSV", "value": "csv"},
+                                                        {"label": "Parquet", "value": "parquet"},
+                                                        {"label": "GeoParquet", "value": "geoparquet"},
+                                                        {"label": "GeoJSON", "value": "geojson"}],
+                                               value="csv", id="formato", inline=True),
+                                html.Hr(),
+                                html.Label("Configurações CSV"),
+                                dbc.RadioItems(options=[{"label": "Ponto", "value": "."},
+                                                        {"label": "Vírgula", "value": ","}],
+                                               value=".", id="sep", inline=True),
+                                dbc.Checkbox(id="no-acc", label="Sem acentuação", value=False),
                             ]
                         ),
-                       className="mb-4",
-    style={"border": "none"}
-                    )
-                )
-            ),
-            dcc.Download(id="download-csv"),
-
-            # ---------- gráficos ----------
-            dbc.Row(
-                [
-                    dbc.Col(dbc.Card(dcc.Graph(id="bar"),  className="graph-block"), width=12, lg=6),
-                    dbc.Col(dbc.Card(dcc.Graph(id="map"),  className="graph-block"), width=12, lg=6),
-                ],
-               className="mb-4",
-    style={"border": "none"}
-            ),
-            dcc.Store(id="selecionados", data=[]),
-            dbc.Row(
-                [
-                    dbc.Col(dbc.Card(dcc.Graph(id="pie-fase"),  className="graph-block"), width=12, lg=6),
-                    dbc.Col(dbc.Card(dcc.Graph(id="pie-ti"),    className="graph-block"), width=12, lg=6),
-                ],
-               className="mb-4",
-    style={"border": "none"}
-            ),
-
-            # ---------- tabela ----------
-            dbc.Row(
-                dbc.Col(
-                    dbc.Card(
-                        [
-                            dbc.CardHeader("Top 10 Áreas Protegidas Mais Afetadas"),
-                            dbc.CardBody(dbc.Table(id="top10", bordered=False, hover=True,
-                                                   responsive=True, striped=True)),
-                        ],
-                       className="mb-4",
-    style={"border": "none"}
-                    )
-                )
-            ),
-
-            # ---------- modal CSV ----------
-            dbc.Modal(
-                [
-                    dbc.ModalHeader(dbc.ModalTitle("Terras Indígenas – baixar CSV")),
-                    dbc.ModalBody(
-                        [
-                            dbc.Checklist(options=STATE_OPTS, id="uf-check", inline=True),
-                            html.Hr(),
-                            html.Label("Configurações CSV"),
-                            dbc.RadioItems(options=[{"label": "Ponto", "value": "."},
-                                                    {"label": "Vírgula", "value": ","}],
-                                           value=".", id="sep", inline=True),
-                            dbc.Checkbox(id="no-acc", label="Sem acentuação", value=False),
-                        ]
-                    ),
-                    dbc.ModalFooter(
-                        [
-                            dbc.Button("Download", id="dwn-btn", color="success"),
-                            dbc.Button("Fechar", id="close-modal", color="danger"),
-                        ]
-                    ),
-                ],
-                id="modal",
-                is_open=False,
-            ),
-        ],
-        fluid=True,
-    )
+                        dbc.ModalFooter(
+                            [
+                                html.A(dbc.Button("Download", id="dwn-btn", color="success"),
+                                       id="dwn-link", download="pressao_terras_indigenas.csv"),
+                                dbc.Button("Fechar", id="close-modal", color="danger"),
+                            ]
+                        ),
+                    ],
+                    id="modal",
+                    is_open=False,
+                ),
+            ],
+            fluid=True,
+        )
 
-    # ───────────── callbacks principais ──────────────────
-    @dash_app.callback(
-        [
-            Output("bar", "figure"),
-            Output("map", "figure"),
-            Output("pie-fase", "figure"),
-            Output("pie-ti", "figure"),
-            Output("selecionados", "data"),
-            Output("top10", "children"),
-        ],
+    dash_app.layout = serve_layout
+    data.load_on_request(flask_server, dash_app.config.url_base_pathname)
+
+    # ───────────── seleção ───────────────────────────────
+    # assets/selecao.js: alterna o nome clicado (barra ou mapa) ou limpa no
+    # reset, sem ida ao servidor
+    dash_app.clientside_callback(
+        ClientsideFunction("ap", "alternarSelecao"),
+        Output("selecionados", "data"),
         [
-            Input("modalidade", "value"),
-            Input("fase", "value"),
-            Input("uf", "value"),
             Input("reset", "n_clicks"),
             Input("bar", "clickData"),
             Input("map", "clickData"),
         ],
         State("selecionados", "data"),
+        prevent_initial_call=True,
+    )
+    # destaque imediato; as barras do servidor chegam quando o filtro muda
+    dash_app.clientside_callback(
+        ClientsideFunction("ap", "destacarBarras"),
+        Output("bar", "figure", allow_duplicate=True),
+        Input("selecionados", "data"),
+        State("bar", "figure"),
+        prevent_initial_call=True,
     )
-    def atualizar(modalidade, fase, uf, reset, bar_click, map_click, selecionados):
-        selecionados = selecionados or []
-        if reset:
-            selecionados = []
-
-        for click in (bar_click, map_click):
-            if click:
-                nome = click["points"][0].get("y") or click["points"][0].get("location")
-                if nome:
-                    selecionados = (
-                        [n for n in selecionados if n != nome]
-                        if nome in selecionados else selecionados + [nome]
-                    )
 
-        dff = df[df["MODALIDADE"] == modalidade]
+    # ───────────── callbacks principais ──────────────────
+    # cada saída tem o seu callback, sobre o mesmo top-N filtrado
+    FILTROS = [
+        Input("modalidade", "value"),
+        Input("fase", "value"),
+        Input("uf", "value"),
+        Input("selecionados", "data"),
+    ]
+
+    def _filtros(modalidade, fase, uf, selecionados):
         if fase:
             fase = fase if isinstance(fase, list) else [fase]
-            dff = dff[dff["FASE"].isin(fase)]
-        if uf:
-            dff = dff[dff["UF"].isin(uf)]
-        if selecionados:
-            dff = dff[dff["NOME"].isin(selecionados)]
-
-        top10 = dff.nlargest(10, "DESMATAM_1")
-
-        # tabela
-        thead = html.Thead(html.Tr([
-            html.Th("Nome"), html.Th("Focos de Calor"), html.Th("Nº CAR"),
-            html.Th("Área CAR"), html.Th("Estradas Não Oficiais")
-        ]))
-        tbody = html.Tbody([
-            html.Tr([
-                html.Td(r["NOME"]),
-                html.Td(r["FOCOS DE C"]),
-                html.Td(r["N DE CAR"]),
-                html.Td(f"{r['CAR']:.2f} km²"),
-                html.Td(f"{r['ESTRADAS N']:.2f} km"),
-            ]) for _, r in top10.iterrows()
-        ])
-        tabela = dbc.Table(
-    [thead, tbody],
-    bordered=False,
-    hover=True,
-    responsive=True,
-    striped=True,
-    style={"border": "none"}
-)
+        return {
+            "MODALIDADE": [modalidade],
+            "FASE": fase or None,
+            "UF": uf or None,
+            "NOME": selecionados or None,
+        }
+
+    # barras
+    @dash_app.callback(Output("bar", "figure"), *FILTROS)
+    def atualizar_barras(modalidade, fase, uf, selecionados):
+        selecionados = selecionados or []
 
-        # barras
-        bar = go.Figure(
-            go.Bar(
-                y=top10["NOME"], x=top10["DESMATAM_1"], orientation="h",
-                marker_color=["green" if n in selecionados else "DarkSeaGreen"
-                              for n in top10["NOME"]],
-                text=[f"{v:.2f} km²" for v in top10["DESMATAM_1"]],
-                textposition="auto",
+        def montar(top10):
+            bar = go.Figure(
+                go.Bar(
+                    y=top10["NOME"], x=top10["DESMATAM_1"], orientation="h",
+                    marker_color=["green" if n in selecionados else "DarkSeaGreen"
+                                  for n in top10["NOME"]],
+                    text=[f"{v:.2f} km²" for v in top10["DESMATAM_1"]],
+                    textposition="auto",
+                )
             )
-        )
-        bar.update_yaxes(autorange="reversed")
-        bar.update_layout(
-            xaxis_title="Área (km²)", yaxis_title="Unidades de Conservação", bargap=0.1,
-            font=dict(size=10),
-            title=dict(text="Top 10 UCs por Desmatamento",
-                       x=0.5, xanchor="center"),
-        )
+            bar.update_yaxes(autorange="reversed")
+            bar.update_layout(
+                xaxis_title="Área (km²)", yaxis_title="Unidades de Conservação", bargap=0.1,
+                font=dict(size=10),
+                title=dict(text=f"Top {TOP_N} UCs por Desmatamento",
+                           x=0.5, xanchor="center"),
+            )
+            return bar
 
-        # mapa
-        mapa = px.choropleth_mapbox(
-            top10, geojson=roi, color="DESMATAM_1",
-            locations="NOME", featureidkey="properties.NOME",
-            mapbox_style="carto-positron",
-            center=dict(lat=-14, lon=-55),
-            color_continuous_scale="YlOrRd",
-            zoom=4,
-        )
-        mapa.update_layout(
-            title=dict(text="Mapa de Pressão de Desmatamento (km²)",
-                       x=0.5, xanchor="center", font=dict(size=14)),
-            margin=dict(r=0, t=50, l=0, b=0),
-            mapbox=dict(style="open-street-map", zoom=3,
-                        center=dict(lat=-14, lon=-55)),
-        )
+        filtros = _filtros(modalidade, fase, uf, selecionados)
+        return generate(data, "bar", data.snapshot(), filtros, montar)
+
+    # mapa: geometrias pela URL versionada, no nível de detalhe do zoom
+    # (cada nível baixado uma vez, em TopoJSON); depois, Patch
+    register_map(
+        dash_app, data, FILTROS, _filtros,
+        graph="map", mode="modo-mapa", figure="mapa-figura", version="mapa-versao",
+        title="Mapa de Pressão de Desmatamento (km²)", points_mode="pontos",
+    )
 
-        # pizzas
-        cores = px.colors.sequential.YlOrRd
-        pie_fase = px.pie(top10, values="DESMATAM_1", names="UF", color="FASE",
-                          title="Pressão Desmatamento por Estado de Uso e Categoria")
-        pie_fase.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+    # pizzas
+    cores = px.colors.sequential.YlOrRd
+
+    @dash_app.callback(Output("pie-fase", "figure"), *FILTROS)
+    def atualizar_pie_fase(modalidade, fase, uf, selecionados):
+        def montar(top10):
+            pie_fase = px.pie(top10, values="DESMATAM_1", names="UF", color="FASE",
+                              title="Pressão Desmatamento por Estado de Uso e Categoria")
+            pie_fase.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+            return pie_fase
+
+        filtros = _filtros(modalidade, fase, uf, selecionados)
+        return generate(data, "pie-fase", data.snapshot(), filtros, montar)
+
+    @dash_app.callback(Output("pie-ti", "figure"), *FILTROS)
+    def atualizar_pie_ti(modalidade, fase, uf, selecionados):
+        def montar(top10):
+            pie_ti = px.pie(top10, values="DESMATAM_1", names="NOME", color="FASE",
+                            title="Pressão Desmatamento por Unidade de Conservação")
+            pie_ti.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+            return pie_ti
+
+        filtros = _filtros(modalidade, fase, uf, selecionados)
+        return generate(data, "pie-ti", data.snapshot(), filtros, montar)
+
+    # tabela
+    @dash_app.callback(Output("top10", "children"), *FILTROS)
+    def atualizar_tabela(modalidade, fase, uf, selecionados):
+        def montar(top10):
+            thead = html.Thead(html.Tr([html.Th(t) for t in CABECALHO]))
+            tbody = html.Tbody([
+                html.Tr([html.Td(v) for v in linha]) for linha in table_rows(top10)
+            ])
+            return dbc.Table(
+                [thead, tbody],
+                bordered=False,
+                hover=True,
+                responsive=True,
+                striped=True,
+                style={"border": "none"}
+            )
 
-        pie_ti = px.pie(top10, values="DESMATAM_1", names="NOME", color="FASE",
-                        title="Pressão Desmatamento por Unidade de Conservação")
-        pie_ti.update_traces(textinfo="percent+label", marker=dict(colors=cores))
+        filtros = _filtros(modalidade, fase, uf, selecionados)
+        return generate(data, "top10", data.snapshot(), filtros, montar)
 
-        return bar, mapa, pie_fase, pie_ti, selecionados, tabela
+    # ranking completo, paginado no servidor pelo RANK (cursores no navegador)
+    register_ranking(dash_app, data, FILTROS, _filtros, table="ranking", cursors="ranking-cursores")
 
     # ───────────── modal / download ──────────────────────
     @dash_app.callback(
@@ -354,20 +368,18 @@ def register_pressao_terras_indigenas(flask_server):
     def toggle_modal(n_open, n_close, opened):
         return not opened if n_open or n_close else opened
 
+    # o arquivo sai em streaming da rota de exportação (app.data.export), só
+    # com as UFs marcadas; o link e o nome do arquivo acompanham o modal
     @dash_app.callback(
-        Output("download-csv", "data"),
-        Input("dwn-btn", "n_clicks"),
-        State("sep", "value"),
-        State("no-acc", "value"),
-        prevent_initial_call=True,
+        Output("dwn-link", "href"),
+        Output("dwn-link", "download"),
+        Input("uf-check", "value"),
+        Input("sep", "value"),
+        Input("no-acc", "value"),
+        Input("formato", "value"),
     )
-    def baixar_csv(n, sep, no_acc):
-        if not n:
-            return dash.no_update
-        out = df.copy()
-        if no_acc:
-            out = out.applymap(lambda x: unidecode.unidecode(x) if isinstance(x, str) else x)
-        return dcc.send_data_frame(out.to_csv, "pressao_terras_indigenas.csv",
-                                   sep=sep, index=False)
+    def link_download(ufs, sep, no_acc, formato):
+        extensao = EXPORT_FORMATS[formato][0]
+        return data.export_url(ufs, sep, no_acc, formato), f"pressao_terras_indigenas.{extensao}"
 
     return dash_app
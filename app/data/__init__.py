@@ -0,0 +1,4 @@
+# app/data/__init__.py
+"""
+Camada de dados compartilhada pelos dashboards (fontes, cache local e carga).
+"""
@@ -0,0 +1,97 @@
+# app/data/cube.py
+"""
+Cubo de agregação
+-----------------
+Montado uma vez por versão de snapshot sobre as dimensões categóricas de
+filtro (MODALIDADE × USO/FASE × UF).  Cada célula guarda, para cada métrica,
+soma e contagem, além dos ids das N maiores linhas.  Totais, quebras por
+dimensão e top-N de qualquer combinação de filtros viram uma varredura das
+poucas células que casam – nenhum ``groupby`` por requisição.
+
+O top-N de uma combinação sai da união dos top-N das células (o top-N da
+união está sempre contido nela).  Seleção por NOME não é dimensão do cubo.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.data.filters import TOP_N
+
+CUBE_DIMENSIONS = ["MODALIDADE", "USO", "FASE", "UF"]
+CUBE_METRICS = ["DESMATAM_1", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N"]
+
+
+class AggregateCube:
+    def __init__(self, df: pd.DataFrame, dims: Iterable[str] = CUBE_DIMENSIONS,
+                 metrics: Iterable[str] = CUBE_METRICS, top_n: int = TOP_N):
+        self.dims = [d for d in dims if d in df.columns]
+        self.metrics = [m for m in metrics if m in df.columns]
+        self.top_n = top_n
+        self._values = {m: df[m].to_numpy(dtype=float) for m in self.metrics}
+
+        grouped = df.groupby(self.dims, observed=True, dropna=False, sort=True)
+        self.cells = grouped[self.metrics].agg(["sum", "count"])
+        self.cells[("linhas", "count")] = grouped.size()
+        # linhas agrupadas por célula (ngroup segue a ordem de self.cells)
+        gid = grouped.ngroup().to_numpy()
+        by_cell = np.argsort(gid, kind="stable")
+        bounds = np.searchsorted(gid[by_cell], np.arange(len(self.cells) + 1))
+        self._top: dict[str, list[np.ndarray]] = {m: [] for m in self.metrics}
+        for g in range(len(self.cells)):
+            rows = by_cell[bounds[g]:bounds[g + 1]]
+            for m in self.metrics:
+                order = np.argsort(-self._values[m][rows], kind="stable")
+                self._top[m].append(rows[order[:top_n]])
+
+    @property
+    def nbytes(self) -> int:
+        tops = sum(a.nbytes for per_metric in self._top.values() for a in per_metric)
+        return int(self.cells.memory_usage(deep=True).sum()) + tops
+
+    def _match(self, filters: Mapping[str, Optional[Iterable]]) -> np.ndarray:
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, values in filters.items():
+            if values is None:
+                continue
+            if dim not in self.dims:
+                raise KeyError(f"{dim} não é dimensão do cubo")
+            level = self.cells.index.get_level_values(dim)
+            mask &= np.asarray(level.isin(list(values)))
+        return mask
+
+    def totals(self, filters: Mapping[str, Optional[Iterable]]) -> dict:
+        """Soma e contagem de cada métrica na combinação de *filters*."""
+        cells = self.cells[self._match(filters)]
+        out = {
+            m: {"sum": float(cells[(m, "sum")].sum()),
+                "count": int(cells[(m, "count")].sum())}
+            for m in self.metrics
+        }
+        out["linhas"] = int(cells[("linhas", "count")].sum())
+        return out
+
+    def by(self, dim: str, filters: Mapping[str, Optional[Iterable]]) -> pd.DataFrame:
+        """Somas por valor de *dim* (ex.: resumo por UF), em ordem decrescente
+        da primeira métrica."""
+        cells = self.cells[self._match(filters)]
+        sums = cells.xs("sum", axis=1, level=1).copy()
+        sums["linhas"] = cells[("linhas", "count")]
+        out = sums.groupby(level=dim, observed=True, dropna=False).sum()
+        return out.sort_values(self.metrics[0], ascending=False)
+
+    def top(self, filters: Mapping[str, Optional[Iterable]], metric: str,
+            n: int = TOP_N) -> np.ndarray:
+        """Posições das *n* (≤ ``top_n``) maiores linhas de *metric*."""
+        if n > self.top_n:
+            raise ValueError(f"o cubo guarda só o top {self.top_n}")
+        tops = self._top[metric]
+        hits = [tops[i] for i in np.flatnonzero(self._match(filters))]
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        rows = np.sort(np.concatenate(hits))
+        order = np.argsort(-self._values[metric][rows], kind="stable")
+        return rows[order[:n]]
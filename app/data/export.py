@@ -0,0 +1,198 @@
+# app/data/export.py
+"""
+Exportação
+----------
+Blueprint com a tabela completa de cada dataset, num dos ``EXPORT_FORMATS``:
+
+    /ap/_export/<dataset>.csv?UF=PA&UF=AM&decimal=,&ascii=1
+    /ap/_export/<dataset>.parquet?UF=PA
+    /ap/_export/<dataset>.geoparquet?UF=PA     (GeoParquet, com a geometria)
+    /ap/_export/<dataset>.geojson?UF=PA
+
+A resposta é um stream: a tabela do snapshot carregado é lida em lotes de
+``EXPORT_BATCH_ROWS`` linhas (``snapshots.scan_table``, só as UFs pedidas –
+com a tabela particionada por UF, as outras partições nem são abertas) e
+cada lote é escrito e sai em seguida.  A memória de um download é a de um
+lote, e os primeiros bytes saem antes de a tabela ser lida inteira.
+
+``decimal=,`` usa vírgula decimal e ``;`` entre os campos (como as planilhas
+em português esperam); ``ascii=1`` tira os acentos dos textos
+(``app.data.text``, uma vez por valor distinto de cada lote).  As duas
+opções valem só para o CSV.
+
+Parquet, GeoParquet e GeoJSON saem direto dos lotes Arrow, sem passar por
+pandas: tipos (categóricas inclusive) preservados no Parquet; nos formatos
+geográficos, cada linha recebe o WKB original da sua área (primeira feição
+de mesmo NOME, ``pc.index_in``), com o CRS dos metadados ``geo`` do snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import shapely
+from flask import Blueprint, Response, abort, request, stream_with_context
+
+from app.data.registry import registry
+from app.data.snapshots import geometry_table, scan_table
+from app.data.text import strip_accents, strip_accents_frame
+
+EXPORT_BATCH_ROWS = 4096
+# formato → (extensão do arquivo, tipo MIME)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "geoparquet": ("geo.parquet", "application/vnd.apache.parquet"),
+    "geojson": ("geojson", "application/geo+json"),
+}
+GEOPARQUET_VERSION = "1.0.0"
+
+export = Blueprint("export", __name__, url_prefix="/ap/_export")
+
+
+# ╭─ lotes ──────────────────────────────────────────────────────────────────╮
+def _scanner(name: str) -> tuple[str, ds.Scanner]:
+    """Versão carregada de *name* e os lotes com as UFs da query string."""
+    if name not in registry:
+        abort(404)
+    version = registry[name].snapshot().version
+    ufs = request.args.getlist("UF") or None
+    return version, scan_table(name, version, {"UF": ufs}, EXPORT_BATCH_ROWS)
+
+
+def _with_geometry(batches: Iterator[pa.RecordBatch], schema: pa.Schema,
+                   geometry: pa.Table) -> Iterator[pa.RecordBatch]:
+    """Lotes com a coluna ``geometry`` (WKB, nula sem feição) da área de cada
+    linha, casada pelo NOME."""
+    names = geometry.column("NOME").combine_chunks()
+    wkb = geometry.column("geometry").combine_chunks()
+    for batch in batches:
+        rows = pc.index_in(batch.column("NOME").cast(pa.string()), value_set=names)
+        yield pa.RecordBatch.from_arrays([*batch.columns, wkb.take(rows)], schema=schema)
+
+
+def _geo_schema(schema: pa.Schema, geometry: pa.Table) -> pa.Schema:
+    """*schema* + ``geometry`` com os metadados GeoParquet do snapshot (sem a
+    ``bbox`` de todas as feições) no lugar dos metadados de pandas."""
+    geo = json.loads(geometry.schema.metadata[b"geo"])
+    geo["version"] = GEOPARQUET_VERSION
+    for column in geo["columns"].values():
+        column.pop("bbox", None)
+    return pa.schema([*schema, geometry.schema.field("geometry")],
+                     metadata={b"geo": json.dumps(geo).encode()})
+
+
+# ╭─ escritores ─────────────────────────────────────────────────────────────╮
+class _Chunks:
+    """Arquivo só de escrita que acumula os bytes até o próximo ``take``."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _csv(scanner: ds.Scanner) -> Iterator[str]:
+    decimal = "," if request.args.get("decimal") == "," else "."
+    sep = ";" if decimal == "," else ","
+    ascii_only = request.args.get("ascii") == "1"
+    header = pd.Series(scanner.projected_schema.names)
+    if ascii_only:
+        header = strip_accents(header)
+    yield pd.DataFrame(columns=header).to_csv(index=False, sep=sep)
+    for batch in scanner.to_batches():
+        if not batch.num_rows:
+            continue
+        df = batch.to_pandas()
+        if ascii_only:
+            df = strip_accents_frame(df)
+        yield df.to_csv(index=False, header=False, sep=sep, decimal=decimal)
+
+
+def _parquet(batches: Iterator[pa.RecordBatch], schema: pa.Schema) -> Iterator[bytes]:
+    """Um row group por lote; cada um sai assim que é escrito."""
+    sink = _Chunks()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            if batch.num_rows:
+                writer.write_batch(batch)
+                yield sink.take()
+    yield sink.take()  # rodapé
+
+
+def _geojson(batches: Iterator[pa.RecordBatch]) -> Iterator[str]:
+    yield '{"type": "FeatureCollection", "features": ['
+    sep = ""
+    for batch in batches:
+        shapes = shapely.to_geojson(shapely.from_wkb(batch.column("geometry").to_numpy(False)))
+        props = batch.drop_columns(["geometry"]).to_pylist()
+        for shape, prop in zip(shapes, props):
+            yield (f'{sep}{{"type": "Feature", "geometry": {shape or "null"}, '
+                   f'"properties": {json.dumps(prop, ensure_ascii=False)}}}')
+            sep = ","
+    yield "]}"
+
+
+# ╭─ rotas ──────────────────────────────────────────────────────────────────╮
+def _attachment(name: str, fmt: str, body: Iterator) -> Response:
+    extension, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{name}.{extension}"'
+    return response
+
+
+@export.get("/<name>.csv")
+def csv(name: str):
+    _, scanner = _scanner(name)
+    return _attachment(name, "csv", _csv(scanner))
+
+
+@export.get("/<name>.parquet")
+def parquet(name: str):
+    _, scanner = _scanner(name)
+    return _attachment(name, "parquet", _parquet(scanner.to_batches(), scanner.projected_schema))
+
+
+@export.get("/<name>.geoparquet")
+def geoparquet(name: str):
+    version, scanner = _scanner(name)
+    geometry = geometry_table(name, version)
+    if geometry is None:
+        abort(404)
+    schema = _geo_schema(scanner.projected_schema, geometry)
+    batches = _with_geometry(scanner.to_batches(), schema, geometry)
+    return _attachment(name, "geoparquet", _parquet(batches, schema))
+
+
+@export.get("/<name>.geojson")
+def geojson(name: str):
+    version, scanner = _scanner(name)
+    geometry = geometry_table(name, version)
+    if geometry is None:
+        abort(404)
+    schema = _geo_schema(scanner.projected_schema, geometry)
+    return _attachment(name, "geojson", _geojson(_with_geometry(scanner.to_batches(), schema, geometry)))
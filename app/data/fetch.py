@@ -0,0 +1,81 @@
+# app/data/fetch.py
+"""
+Download concorrente – sessão HTTP compartilhada e corrida entre espelhos
+-------------------------------------------------------------------------
+Uma única ``requests.Session`` (pool de conexões + retry com backoff) é usada
+por todos os downloads.  ``race`` dispara a mesma busca em todos os espelhos
+de um artefato; a primeira resposta válida vence e as demais são canceladas.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Executor, as_completed
+from typing import Callable, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+TIMEOUT = (5, 30)  # (conexão, leitura)
+POOL_SIZE = 24
+RETRIES = 3
+BACKOFF = 0.5
+
+T = TypeVar("T")
+
+
+class Cancelled(Exception):
+    """O download perdeu a corrida e foi interrompido."""
+
+
+class DownloadError(Exception):
+    """Nenhum espelho devolveu uma resposta válida."""
+
+
+def make_session(
+    pool_size: int = POOL_SIZE, retries: int = RETRIES, backoff: float = BACKOFF
+) -> requests.Session:
+    """Sessão com pool de conexões e retry/backoff para 429 e 5xx."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def race(
+    pool: Executor,
+    fetch: Callable[[str, threading.Event], T],
+    urls: list[str],
+) -> T:
+    """
+    Executa ``fetch(url, cancel)`` para todos os *urls* em paralelo e devolve
+    o primeiro resultado sem exceção.  Os perdedores recebem ``cancel.set()``
+    e devem abortar (``Cancelled``) na próxima checagem.
+    """
+    cancel = threading.Event()
+    futures = {pool.submit(fetch, url, cancel): url for url in urls}
+    errors = []
+    try:
+        for fut in as_completed(futures):
+            try:
+                return fut.result()
+            except Exception as exc:
+                errors.append(f"{futures[fut]}: {exc}")
+    finally:
+        cancel.set()
+        for fut in futures:
+            fut.cancel()
+    raise DownloadError("; ".join(errors))
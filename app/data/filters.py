@@ -0,0 +1,165 @@
+# app/data/filters.py
+"""
+Índice de filtros
+-----------------
+As colunas de filtro (MODALIDADE, USO, FASE, UF, NOME) são categóricas no
+snapshot.  Ao carregar um dataset, ``FilterIndex`` guarda, para cada valor
+de cada coluna, as linhas em que ele aparece:
+
+* colunas de baixa cardinalidade → bitmap compactado (``np.packbits``);
+* colunas de alta cardinalidade (NOME) → vetor de row ids, para o índice
+  não crescer com (linhas × valores).
+
+Uma combinação de filtros vira OR dos valores dentro de cada coluna e AND
+entre colunas, tudo sobre bitmaps – nenhuma coluna é varrida no callback.
+Valores fora do dicionário não casam com nada.
+
+Para o top-N, as linhas de cada métrica de ranking ficam pré-ordenadas
+(decrescente, empates na ordem do frame e NaN no fim, como ``nlargest``).  O top-N
+filtrado são os N primeiros ids dessa ordem que passam no filtro: a busca
+percorre a ordem em blocos e para assim que junta N linhas.
+
+Paginação do ranking completo por chave: o snapshot vem ordenado por RANK,
+então a página seguinte são as primeiras linhas filtradas depois do último
+RANK visto (``after``) – uma busca binária e a leitura do bitmap a partir
+dali, sem ``OFFSET``: a página N custa o mesmo que a primeira.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Collection, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ["MODALIDADE", "USO", "FASE", "UF", "NOME"]
+BITMAP_MAX_CARDINALITY = 64
+RANK_METRICS = ["DESMATAM_1"]
+RANK_COLUMN = "RANK"  # ordem do snapshot e chave da paginação
+TOP_N = int(os.environ.get("AP_TOP_N", "10"))  # linhas dos rankings
+
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str] = INDEX_COLUMNS,
+                 metrics: Iterable[str] = RANK_METRICS, rank: str = RANK_COLUMN):
+        self.n = len(df)
+        self._rank = df[rank].to_numpy() if rank in df.columns else np.arange(self.n)
+        self._bitmaps: dict[str, dict] = {}
+        self._row_ids: dict[str, dict] = {}
+        self._order: dict[str, np.ndarray] = {}
+        for metric in metrics:
+            if metric not in df.columns:
+                continue
+            # NaN vai para o fim, como em nlargest
+            values = df[metric].to_numpy(dtype=float)
+            self._order[metric] = np.argsort(-values, kind="stable").astype(np.int32)
+        for col in columns:
+            if col not in df.columns:
+                continue
+            s = df[col]
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                s = s.astype("category")
+            codes = s.cat.codes.to_numpy()
+            # linhas agrupadas por código: cada valor é uma fatia de *order*
+            order = np.argsort(codes, kind="stable").astype(np.int32)
+            bounds = np.searchsorted(codes[order], np.arange(len(s.cat.categories) + 1))
+            ids = {
+                value: order[bounds[k]:bounds[k + 1]]
+                for k, value in enumerate(s.cat.categories)
+            }
+            if len(ids) <= BITMAP_MAX_CARDINALITY:
+                self._bitmaps[col] = {v: self._pack(r) for v, r in ids.items()}
+            else:
+                self._row_ids[col] = ids
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes for per_col in (*self._bitmaps.values(), *self._row_ids.values())
+            for a in per_col.values()
+        ) + sum(o.nbytes for o in self._order.values()) + self._rank.nbytes
+
+    def values(self, col: str) -> Collection:
+        """Valores de *col* no índice (vazio se a coluna não tem índice)."""
+        per_col = self._bitmaps.get(col)
+        if per_col is None:
+            per_col = self._row_ids.get(col, {})
+        return per_col.keys()
+
+    def _pack(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.n, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def any_of(self, col: str, values: Iterable) -> np.ndarray:
+        """Bitmap das linhas em que *col* vale algum dos *values*."""
+        if col in self._bitmaps:
+            bitmaps = self._bitmaps[col]
+            out = np.zeros((self.n + 7) // 8, dtype=np.uint8)
+            for v in values:
+                if v in bitmaps:
+                    out |= bitmaps[v]
+            return out
+        row_ids = self._row_ids.get(col)
+        if row_ids is None:
+            raise KeyError(f"Coluna sem índice: {col}")
+        hits = [row_ids[v] for v in values if v in row_ids]
+        return self._pack(np.concatenate(hits) if hits else np.empty(0, np.int32))
+
+    def bitmap(self, filters: Mapping[str, Optional[Iterable]]) -> np.ndarray:
+        """AND dos ``any_of`` de cada coluna; ``None`` = coluna sem filtro."""
+        out = np.packbits(np.ones(self.n, dtype=bool))
+        for col, values in filters.items():
+            if values is not None:
+                out &= self.any_of(col, values)
+        return out
+
+    def mask(self, filters: Mapping[str, Optional[Iterable]]) -> np.ndarray:
+        return np.unpackbits(self.bitmap(filters), count=self.n).astype(bool)
+
+    def rows(self, filters: Mapping[str, Optional[Iterable]]) -> np.ndarray:
+        """Posições (em ordem) das linhas que passam em *filters*."""
+        return np.flatnonzero(self.mask(filters))
+
+    def count(self, filters: Mapping[str, Optional[Iterable]]) -> int:
+        """Número de linhas que passam em *filters*."""
+        return int(np.unpackbits(self.bitmap(filters), count=self.n).sum())
+
+    def top(self, filters: Mapping[str, Optional[Iterable]], metric: str,
+            n: int = TOP_N) -> np.ndarray:
+        """Posições das *n* maiores linhas de *metric* entre as filtradas."""
+        mask = self.mask(filters)
+        order = self._order[metric]
+        found, total = [], 0
+        step = max(4 * n, 256)
+        for start in range(0, len(order), step):
+            chunk = order[start:start + step]
+            hits = chunk[mask[chunk]]
+            found.append(hits)
+            total += len(hits)
+            if total >= n:
+                break
+        return np.concatenate(found)[:n] if found else np.empty(0, np.int32)
+
+    def key(self, row: int) -> int:
+        """RANK (chave da paginação) da linha na posição *row*."""
+        return int(self._rank[row])
+
+    def after(self, filters: Mapping[str, Optional[Iterable]], last: Optional[int] = None,
+              n: int = TOP_N) -> np.ndarray:
+        """Posições das *n* primeiras linhas filtradas com RANK maior que *last*
+        (``None`` = desde o início)."""
+        start = 0 if last is None else int(np.searchsorted(self._rank, last, side="right"))
+        bitmap = self.bitmap(filters)
+        found, total = [], 0
+        step = -(-max(4 * n, 256) // 8) * 8  # blocos em bytes inteiros do bitmap
+        for lo in range(start - start % 8, self.n, step):
+            bits = np.unpackbits(bitmap[lo // 8:(lo + step) // 8], count=min(step, self.n - lo))
+            hits = np.flatnonzero(bits) + lo
+            hits = hits[hits >= start]
+            found.append(hits)
+            total += len(hits)
+            if total >= n:
+                break
+        return np.concatenate(found)[:n] if found else np.empty(0, np.int64)
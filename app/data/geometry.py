@@ -0,0 +1,262 @@
+# app/data/geometry.py
+"""
+Geometrias do mapa
+------------------
+Níveis de detalhe: na geração do snapshot, as geometrias são simplificadas
+(``simplify(preserve_topology=True)``, feição a feição – as áreas protegidas
+se sobrepõem, então não formam uma cobertura) com tolerância de meio pixel
+no maior zoom de cada nível, e as coordenadas arredondadas na mesma escala.
+O mapa escolhe o nível pelo zoom do ``relayoutData``; acima do último nível
+vale a geometria original.
+
+Ao carregar uma versão, ``FeatureIndex`` serializa cada feição de cada nível
+uma única vez (GeoJSON compacto, só com ``properties.NOME``) e guarda o texto
+por NOME normalizado – nenhuma conversão shapely → GeoJSON por requisição.
+
+As figuras não embutem geometria: o ``geojson`` do traço é a URL versionada
+``/ap/_geometry/<dataset>/<versão>/<nível>.geojson`` (``registry.init_app``),
+que o navegador baixa uma vez (comprimida, cache imutável) e o plotly.js
+guarda em memória.  As atualizações do mapa levam só ``locations`` e valores.
+
+Formato compacto: a mesma coleção em TopoJSON (``<nível>.topojson``) –
+coordenadas inteiras no passo de arredondamento do nível, arcos
+compartilhados entre feições vizinhas e codificados em deltas.  O asset
+``assets/geometria.js`` decodifica o TopoJSON e o entrega ao plotly.js sob a
+URL do GeoJSON, que então não é baixado.
+
+Pontos de rótulo: ``label_points`` dá, para cada linha do ``df``, um ponto
+interno da feição (``point_on_surface``) – o modo de pontos do mapa desenha
+todas as áreas filtradas com eles, sem geometria.
+"""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import math
+from typing import Iterable, Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# zoom em que cada nível simplificado deixa de valer: nível 0 até o zoom 5,
+# 1 até o 7, 2 até o 9; acima, FULL_LEVEL (geometria original)
+LOD_ZOOMS = [5, 7, 9]
+FULL_LEVEL = len(LOD_ZOOMS)
+
+
+# ╭─ níveis de detalhe ──────────────────────────────────────────────────────╮
+def lod_tolerance(level: int) -> float:
+    """Meio pixel, em graus (no equador), no maior zoom do *level*."""
+    return 360 / (256 * 2 ** LOD_ZOOMS[level]) / 2
+
+
+def lod_level(zoom: float) -> int:
+    return bisect.bisect_right(LOD_ZOOMS, zoom)
+
+
+def map_zoom(relayout: Optional[dict]) -> Optional[float]:
+    """Zoom do mapa em ``relayoutData`` (mapbox ou maplibre), se houver."""
+    for key in ("mapbox.zoom", "map.zoom"):
+        if relayout and key in relayout:
+            return float(relayout[key])
+    return None
+
+
+def lod_digits(level: int) -> int:
+    """Casas decimais das coordenadas no *level* (originais: 5, ~1 m)."""
+    if level >= FULL_LEVEL:
+        return 5
+    return math.ceil(-math.log10(lod_tolerance(level))) + 1
+
+
+def simplify(roi: gpd.GeoDataFrame, level: int) -> gpd.GeoDataFrame:
+    """*roi* no *level* (``FULL_LEVEL`` devolve as geometrias originais)."""
+    if level >= FULL_LEVEL:
+        return roi
+    tolerance = lod_tolerance(level)
+    geoms = shapely.simplify(roi.geometry.values, tolerance, preserve_topology=True)
+    geoms = shapely.transform(geoms, lambda xy: np.round(xy, lod_digits(level)))
+    return roi.set_geometry(gpd.GeoSeries(geoms, index=roi.index, crs=roi.crs))
+
+
+# ╭─ feições × linhas ───────────────────────────────────────────────────────╮
+def df_rows(roi: gpd.GeoDataFrame, df: pd.DataFrame, key: str = "NOME") -> np.ndarray:
+    """Linha do *df* de cada feição do *roi* (-1 = sem dados; NOME repetido
+    no *df*: a primeira)."""
+    first = np.flatnonzero(~df[key].duplicated().to_numpy())
+    names = df[key].astype(object).to_numpy()[first]
+    found = pd.Index(names).get_indexer(roi[key].astype(object).to_numpy())
+    return np.where(found >= 0, first[found], -1)
+
+
+def label_points(roi: gpd.GeoDataFrame, df: pd.DataFrame, key: str = "NOME") -> np.ndarray:
+    """``(lon, lat)`` de um ponto interno (``point_on_surface``) da feição de
+    cada linha do *df* – NaN sem geometria; várias feições: a primeira."""
+    rows = df_rows(roi, df, key)
+    points = shapely.point_on_surface(roi.geometry.to_numpy())
+    lonlat = np.c_[shapely.get_x(points), shapely.get_y(points)]
+    out = np.full((len(df), 2), np.nan)
+    has = np.flatnonzero(rows >= 0)
+    unique, first = np.unique(rows[has], return_index=True)
+    out[unique] = lonlat[has[first]]
+    return out
+
+
+# ╭─ TopoJSON ───────────────────────────────────────────────────────────────╮
+def _rings(geom) -> list[list[np.ndarray]]:
+    """Polígonos de *geom* como listas de anéis ``(x, y)``, sem o ponto de
+    fechamento; partes não poligonais não entram no mapa."""
+    polygons = []
+    for part in shapely.get_parts(geom):
+        if part.geom_type != "Polygon" or part.is_empty:
+            continue
+        rings = [shapely.get_coordinates(r)[:-1] for r in (part.exterior, *part.interiors)]
+        polygons.append(rings)
+    return polygons
+
+
+def topology(roi: gpd.GeoDataFrame, key: str = "NOME", digits: int = 5) -> dict:
+    """
+    TopoJSON de *roi*: coordenadas inteiras no passo ``10**-digits`` grau e
+    cada anel cortado nas junções (pontos em que as feições vizinhas passam a
+    divergir), de modo que a fronteira comum a duas feições vira um único arco.
+    Arcos iguais, em qualquer sentido, são gravados uma vez; os pontos de cada
+    arco vão em deltas.
+    """
+    step = 10.0 ** -digits
+    origin = np.floor(roi.total_bounds[:2] / step) * step
+    shapes, rings = [], []  # shapes: (nome, [[índices de anel]])
+    for name, geom in zip(roi[key], roi.geometry):
+        if not isinstance(name, str) or geom is None:
+            continue
+        polygons = []
+        for polygon in _rings(geom):
+            ids = []
+            for ring in polygon:
+                q = np.rint((ring - origin) / step).astype(np.int64)
+                q = q[np.r_[True, np.any(q[1:] != q[:-1], axis=1)]]
+                while len(q) > 1 and (q[-1] == q[0]).all():
+                    q = q[:-1]
+                if len(q) < 3:  # anel degenerado no passo do nível
+                    if not ids:
+                        break
+                    continue
+                ids.append(len(rings))
+                rings.append(q)
+            if ids:
+                polygons.append(ids)
+        if polygons:
+            shapes.append((name, polygons))
+    if not rings:
+        return {"type": "Topology", "objects": {"features": {
+            "type": "GeometryCollection", "geometries": []}}, "arcs": []}
+
+    # junções: pontos vistos com mais de um par de vizinhos (sem orientação)
+    points = np.concatenate(rings)
+    width = int(points[:, 1].max()) + 1
+    keys = points[:, 0] * width + points[:, 1]
+    sizes = np.array([len(r) for r in rings])
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    base, length = np.repeat(starts, sizes), np.repeat(sizes, sizes)
+    pos = np.arange(len(points)) - base
+    prev = keys[base + (pos - 1) % length]
+    nxt = keys[base + (pos + 1) % length]
+    pairs = np.unique(np.c_[keys, np.minimum(prev, nxt), np.maximum(prev, nxt)], axis=0)
+    values, counts = np.unique(pairs[:, 0], return_counts=True)
+    is_junction = np.isin(keys, values[counts > 1])
+
+    arcs: list[np.ndarray] = []
+    seen: dict[bytes, int] = {}
+
+    def arc_id(arc: np.ndarray) -> int:
+        forward = arc.tobytes()
+        if forward in seen:
+            return seen[forward]
+        backward = arc[::-1].tobytes()
+        if backward in seen:
+            return ~seen[backward]
+        seen[forward] = len(arcs)
+        arcs.append(arc)
+        return seen[forward]
+
+    ring_arcs = []
+    for r, ring in enumerate(rings):
+        span = slice(starts[r], starts[r] + sizes[r])
+        cuts = np.flatnonzero(is_junction[span])
+        # sem junção o anel é um arco só, a partir do menor ponto (anéis
+        # repetidos viram o mesmo arco)
+        first = cuts[0] if len(cuts) else int(np.argmin(keys[span]))
+        closed = np.roll(ring, -first, axis=0)
+        closed = np.vstack([closed, closed[:1]])
+        bounds = [*(cuts - first), len(ring)] if len(cuts) else [0, len(ring)]
+        ring_arcs.append([arc_id(closed[a:b + 1]) for a, b in zip(bounds[:-1], bounds[1:])])
+
+    geometries = []
+    for name, polygons in shapes:
+        coords = [[ring_arcs[r] for r in polygon] for polygon in polygons]
+        geometries.append({
+            "type": "Polygon" if len(coords) == 1 else "MultiPolygon",
+            "arcs": coords[0] if len(coords) == 1 else coords,
+            "properties": {key: name},
+        })
+    return {
+        "type": "Topology",
+        "transform": {"scale": [step, step], "translate": origin.tolist()},
+        "objects": {"features": {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [np.diff(a, axis=0, prepend=[[0, 0]]).tolist() for a in arcs],
+    }
+
+
+# ╭─ feições serializadas ───────────────────────────────────────────────────╮
+class FeatureIndex:
+    def __init__(self, roi: gpd.GeoDataFrame, key: str = "NOME",
+                 level: int = FULL_LEVEL):
+        self.key = key
+        self._features: dict[str, list[str]] = {}
+        for feature in roi.iterfeatures(na="null", drop_id=True):
+            name = feature["properties"].get(key)
+            if name is None or feature["geometry"] is None:
+                continue
+            text = json.dumps(feature, separators=(",", ":"), ensure_ascii=False)
+            self._features.setdefault(name, []).append(text)
+        self._topology = json.dumps(
+            topology(roi, key, lod_digits(level)), separators=(",", ":"), ensure_ascii=False
+        )
+        self._gzip = {
+            "geojson": gzip.compress(self.collection().encode(), compresslevel=6),
+            "topojson": gzip.compress(self._topology.encode(), compresslevel=6),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        texts = sum(len(t) for texts in self._features.values() for t in texts)
+        return texts + len(self._topology) + sum(len(g) for g in self._gzip.values())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._features
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _texts(self, names: Iterable[str]) -> list[str]:
+        # cada nome uma vez, na ordem pedida; nomes sem geometria são ignorados
+        return [t for name in dict.fromkeys(names) for t in self._features.get(name, ())]
+
+    def collection(self, names: Optional[Iterable[str]] = None) -> str:
+        """FeatureCollection (texto JSON) com as feições de *names* (``None`` = todas)."""
+        if names is None:
+            names = self._features
+        return '{"type":"FeatureCollection","features":[%s]}' % ",".join(self._texts(names))
+
+    def topology(self) -> str:
+        """Coleção completa em TopoJSON (texto JSON, pronto na carga da versão)."""
+        return self._topology
+
+    def gzipped(self, encoding: str = "geojson") -> bytes:
+        """Coleção completa (``"geojson"`` ou ``"topojson"``) comprimida com
+        gzip (pronta na carga da versão)."""
+        return self._gzip[encoding]
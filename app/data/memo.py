@@ -0,0 +1,117 @@
+# app/data/memo.py
+"""
+Cache de resultados dos callbacks
+---------------------------------
+LRU com limite de tamanho e TTL, protegido por trava (os callbacks rodam em
+threads).  Cada dataset tem o seu (``Dataset.results``); a chave começa pela
+versão do snapshot e o cache é esvaziado quando a versão é trocada, então
+um resultado nunca sobrevive aos dados que o geraram.  Cada saída dos
+dashboards (barras, mapa, pizzas, tabela) é guardada separadamente, com o
+nome da saída na chave.
+
+Falhas simultâneas na mesma chave (logo depois da troca de versão, por
+exemplo) calculam o resultado uma vez só: a primeira deixa um ``Future`` em
+andamento e as outras esperam por ele, como em ``DataCache.download``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Mapping, Optional
+
+RESULT_CACHE_SIZE = int(os.environ.get("AP_RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.environ.get("AP_RESULT_CACHE_TTL", "600"))
+
+
+def filter_key(filters: Mapping[str, Optional[list]]) -> tuple:
+    """Forma canônica de um filtro: colunas e valores em ordem fixa."""
+    return tuple(
+        (col, None if values is None else tuple(sorted(map(str, values))))
+        for col, values in sorted(filters.items())
+    )
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE,
+                 ttl: float = RESULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Hashable) -> Any:
+        # chamada com a trava
+        item = self._items.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        # chamada com a trava
+        if self.maxsize <= 0:
+            return
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def get(self, key: Hashable) -> Any:
+        """Valor guardado em *key*, ou ``None``."""
+        with self._lock:
+            return self._lookup(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Valor guardado em *key*; na falta, ``compute()`` é chamado e guardado.
+        Quem chega durante o cálculo espera o mesmo resultado (ou exceção)."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            return fut.result()
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            fut.set_exception(exc)
+            raise
+        with self._lock:
+            self._store(key, value)
+            del self._inflight[key]
+        fut.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,190 @@
+# app/data/mvt.py
+"""
+Mapbox Vector Tiles
+-------------------
+Codificador só com o necessário para camadas de polígonos (especificação
+MVT 2.1), com o protobuf escrito à mão – varints, campos delimitados e
+``double`` – para não depender de ``protobuf``/``mapbox-vector-tile``.
+
+``TileIndex`` é montado com cada versão carregada: uma ``STRtree`` sobre as
+geometrias do ``roi`` e, para cada feição, a linha correspondente do ``df``.
+Um tile consulta a árvore pelo retângulo do tile (mais uma borda), recorta
+só as feições que passam no filtro, projeta em Web Mercator, simplifica em
+meio pixel e arredonda para a grade inteira do tile (``0..extent``, y para
+baixo).  O trabalho por tile é limitado às feições que o tocam; o cache em
+disco fica em ``app.data.tiles``.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from typing import Iterable, Mapping
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from app.data.geometry import df_rows
+
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+POLYGON = 3  # Tile.GeomType
+TILE_EXTENT = 4096
+TILE_BUFFER = 64  # borda, em unidades do tile, para os traços não cortarem
+TILE_METRICS = ["DESMATAM_1"]  # além de NOME, vão nas propriedades
+MAX_LATITUDE = 85.0511287798  # limite do Web Mercator
+
+
+# ╭─ protobuf ───────────────────────────────────────────────────────────────╮
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _uint(field: int, n: int) -> bytes:
+    return _varint(field << 3) + _varint(n)
+
+
+def _bytes(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _bytes(field, b"".join(_varint(int(v)) for v in values))
+
+
+def _value(v) -> bytes:
+    """``Tile.Value``: texto ou ``double``."""
+    if isinstance(v, str):
+        return _bytes(1, v.encode())
+    return _varint(3 << 3 | 1) + struct.pack("<d", float(v))
+
+
+# ╭─ geometria ──────────────────────────────────────────────────────────────╮
+def _command(command: int, count: int) -> int:
+    return command | count << 3
+
+
+def polygon_commands(geom) -> list[int]:
+    """Comandos (MoveTo/LineTo/ClosePath, deltas em zigzag) dos polígonos de
+    *geom*; anel externo com área positiva e furos com área negativa."""
+    out: list[int] = []
+    cursor = np.zeros(2, dtype=np.int64)
+    geom = shapely.orient_polygons(geom, exterior_cw=False)
+    for part in shapely.get_parts(geom):
+        if part.geom_type != "Polygon" or part.is_empty:
+            continue
+        for k, ring in enumerate((part.exterior, *part.interiors)):
+            points = shapely.get_coordinates(ring)[:-1].astype(np.int64)
+            if len(points) < 3:
+                if k == 0:
+                    break  # sem anel externo, os furos não entram
+                continue
+            deltas = np.diff(np.vstack([cursor, points]), axis=0)
+            zigzag = ((deltas << 1) ^ (deltas >> 63)).ravel()
+            out += [_command(MOVE_TO, 1), *zigzag[:2].tolist(),
+                    _command(LINE_TO, len(points) - 1), *zigzag[2:].tolist(),
+                    _command(CLOSE_PATH, 1)]
+            cursor = points[-1]
+    return out
+
+
+# ╭─ camadas ────────────────────────────────────────────────────────────────╮
+def encode_layer(name: str, features: Iterable[tuple[int, object, Mapping]],
+                 extent: int = TILE_EXTENT) -> bytes:
+    """``Tile.Layer`` com as feições ``(id, geometria, propriedades)``;
+    propriedades ``None``/NaN ficam de fora."""
+    keys: dict[str, int] = {}
+    values: dict[object, int] = {}
+    encoded = []
+    for fid, geom, properties in features:
+        commands = polygon_commands(geom)
+        if not commands:
+            continue
+        tags = []
+        for key, value in properties.items():
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            tags += [keys.setdefault(key, len(keys)),
+                     values.setdefault((type(value) is str, value), len(values))]
+        feature = _uint(1, fid) + _packed(2, tags) + _uint(3, POLYGON) + _packed(4, commands)
+        encoded.append(_bytes(2, feature))
+    return (
+        _uint(15, 2) + _bytes(1, name.encode()) + b"".join(encoded)
+        + b"".join(_bytes(3, k.encode()) for k in keys)
+        + b"".join(_bytes(4, _value(v)) for _, v in values)
+        + _uint(5, extent)
+    )
+
+
+def encode_tile(layers: Iterable[bytes]) -> bytes:
+    """``Tile`` com as camadas já codificadas."""
+    return b"".join(_bytes(3, layer) for layer in layers)
+
+
+# ╭─ índice espacial ────────────────────────────────────────────────────────╮
+def _lonlat(tx: float, ty: float, n: int) -> tuple[float, float]:
+    """Canto (*tx*, *ty*) em coordenadas de tile no zoom com *n* tiles."""
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+    return tx / n * 360 - 180, lat
+
+
+class TileIndex:
+    def __init__(self, name: str, roi: gpd.GeoDataFrame, df: pd.DataFrame,
+                 extent: int = TILE_EXTENT, buffer: int = TILE_BUFFER):
+        self.name = name
+        self.extent = extent
+        self.buffer = buffer
+        self.bounds = [float(b) for b in roi.total_bounds]
+        self._geoms = roi.geometry.to_numpy()
+        self._tree = shapely.STRtree(self._geoms)
+        self._names = roi["NOME"].astype(object).to_numpy()
+        self._rows = df_rows(roi, df)
+        self._metrics = {m: df[m].to_numpy(dtype=float) for m in TILE_METRICS if m in df.columns}
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows.nbytes + sum(v.nbytes for v in self._metrics.values())
+
+    @property
+    def fields(self) -> dict[str, str]:
+        """Propriedades das feições (``vector_layers`` do TileJSON)."""
+        return {"NOME": "String", **{m: "Number" for m in self._metrics}}
+
+    def keep(self, mask: np.ndarray) -> np.ndarray:
+        """Feições cuja linha passa em *mask* (máscara booleana sobre o df)."""
+        return (self._rows >= 0) & mask[np.maximum(self._rows, 0)]
+
+    def _properties(self, i: int) -> dict:
+        row = self._rows[i]
+        return {"NOME": self._names[i], **{m: v[row] for m, v in self._metrics.items()}}
+
+    def render(self, z: int, x: int, y: int, keep: np.ndarray) -> bytes:
+        """Tile ``z/x/y`` com as feições marcadas em *keep*."""
+        n, extent = 2 ** z, self.extent
+        b = self.buffer / extent
+        west, south = _lonlat(x - b, y + 1 + b, n)
+        east, north = _lonlat(x + 1 + b, y - b, n)
+        ids = self._tree.query(shapely.box(west, south, east, north))
+        ids = np.sort(ids[keep[ids]])
+        clipped = shapely.clip_by_rect(self._geoms[ids], west, south, east, north)
+
+        def project(lonlat: np.ndarray) -> np.ndarray:
+            lat = np.radians(np.clip(lonlat[:, 1], -MAX_LATITUDE, MAX_LATITUDE))
+            px = ((lonlat[:, 0] + 180) / 360 * n - x) * extent
+            py = ((1 - np.arcsinh(np.tan(lat)) / np.pi) / 2 * n - y) * extent
+            return np.c_[px, py]
+
+        # meio pixel de um tile de 256 px
+        geoms = shapely.simplify(shapely.transform(clipped, project), extent / 512)
+        geoms = shapely.set_precision(geoms, 1.0)
+        features = (
+            (int(i) + 1, g, self._properties(i))
+            for i, g in zip(ids, geoms) if not shapely.is_empty(g)
+        )
+        return encode_tile([encode_layer(self.name, features, extent)])
@@ -0,0 +1,465 @@
+# app/data/registry.py
+"""
+Registro de datasets do processo
+--------------------------------
+Todos os dashboards obtêm seus dados daqui.  Cada dataset é declarado uma
+única vez (nome + URLs do GeoJSON e do parquet) e carregado sob demanda a
+partir do snapshot Arrow da versão atual (``app.data.snapshots``): na
+primeira requisição ao ``url_base_pathname`` do dashboard ou no aquecimento
+opcional do ``create_app``.
+
+O registro sabe o que está carregado, em qual versão e quanto ocupa
+(``report``); ``refresh`` e ``evict`` valem para um dataset ou para todos.
+Com ``AP_MAX_DATASET_MB`` definido, carregar um dataset descarta os menos
+usados recentemente até o total caber no limite.
+
+Atualização a quente: na subida e depois a cada ``AP_REFRESH_SECONDS`` uma
+thread revalida as fontes com GET condicional (ETag / If-Modified-Since).  Se alguma mudou, o
+novo snapshot é gerado e lido fora do caminho das requisições e trocado de
+uma só vez (atribuição de referência).  Os callbacks pegam o ``Snapshot``
+uma única vez no início, então os que já estão rodando terminam na versão
+antiga.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Mapping, Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from flask import Response, abort, jsonify, request, url_for
+
+from app.data.cube import CUBE_DIMENSIONS, AggregateCube
+from app.data.filters import FilterIndex
+from app.data.geometry import FULL_LEVEL, FeatureIndex, label_points
+from app.data.memo import ResultCache
+from app.data.mvt import TileIndex
+from app.data.snapshots import (
+    KEEP_VERSIONS, TABLE_COLUMNS, build_snapshot, read_geometry, read_snapshot,
+)
+from app.data.sources import cache
+
+MAX_DATASET_MB = float(os.environ.get("AP_MAX_DATASET_MB", "0"))  # 0 = sem limite
+REFRESH_SECONDS = float(os.environ.get("AP_REFRESH_SECONDS", "900"))  # 0 = só na subida
+COORD_BYTES = 16  # x, y em float64
+# FeatureIndex das versões antigas ainda em disco, por (versão, nível): cabem
+# todas, então percorrer as URLs antigas não remonta nada
+OLD_FEATURES_CACHE_SIZE = (KEEP_VERSIONS - 1) * (FULL_LEVEL + 1)
+GEOMETRY_MAX_AGE = 365 * 24 * 3600  # URL versionada: conteúdo nunca muda
+# "topojson": o navegador baixa as geometrias do mapa no formato compacto
+GEOMETRY_ENCODING = os.environ.get("AP_GEOMETRY_ENCODING", "topojson")
+GEOMETRY_MIMETYPES = {"geojson": "application/geo+json", "topojson": "application/json"}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Uma versão carregada de um dataset (imutável)."""
+
+    name: str
+    version: str
+    roi: gpd.GeoDataFrame
+    df: pd.DataFrame
+    index: FilterIndex
+    cube: AggregateCube
+    features: tuple[FeatureIndex, ...]  # um por nível de detalhe
+    tiles: TileIndex
+    points: np.ndarray  # (lon, lat) de rótulo de cada linha do df
+    nbytes: int
+    loaded_at: float
+
+
+def _nbytes(roi: gpd.GeoDataFrame, df: pd.DataFrame) -> int:
+    # geometrias shapely não entram no memory_usage: estima pelas coordenadas
+    geom = int(roi.geometry.count_coordinates().sum()) * COORD_BYTES
+    attrs = roi.drop(columns=roi.geometry.name).memory_usage(deep=True).sum()
+    return int(df.memory_usage(deep=True).sum() + attrs + geom)
+
+
+# ╭───────────────────────────────────────────────────────────────╮
+# │ Dataset                                                       │
+# ╰───────────────────────────────────────────────────────────────╯
+class Dataset:
+    """Entrada do registro: carga única, sob demanda e com trava."""
+
+    def __init__(self, registry: "DatasetRegistry", name: str,
+                 geojson_urls: list[str], parquet_urls: list[str],
+                 columns: Optional[list[str]] = None,
+                 filter: Optional[ds.Expression] = None):
+        self.registry = registry
+        self.name = name
+        self.geojson_urls = list(geojson_urls)
+        self.parquet_urls = list(parquet_urls)
+        self.columns = list(columns) if columns is not None else TABLE_COLUMNS
+        self.filter = filter
+        self.last_used = 0.0
+        self.results = ResultCache()  # saídas dos callbacks, por versão
+        # feições de versões ainda em disco mas não carregadas
+        self.old_features = ResultCache(OLD_FEATURES_CACHE_SIZE)
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def sources(self) -> list[list[str]]:
+        return [self.geojson_urls, self.parquet_urls]
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def peek(self) -> Optional[tuple[gpd.GeoDataFrame, pd.DataFrame]]:
+        """``(roi, df)`` já carregados, ou ``None`` – nunca dispara a carga."""
+        snap = self._snapshot
+        return (snap.roi, snap.df) if snap is not None else None
+
+    def snapshot(self) -> Snapshot:
+        snap = self._snapshot
+        if snap is None:
+            with self._lock:
+                snap = self._snapshot
+                if snap is None:
+                    snap = self._load()
+            self.registry._enforce_limit(keep=self)
+        self.last_used = time.monotonic()
+        return snap
+
+    def get(self) -> tuple[gpd.GeoDataFrame, pd.DataFrame]:
+        """``(roi, df)`` da versão atual – chame uma vez por callback (ou
+        ``snapshot()``, que traz também os índices de filtros e de feições e o
+        cubo)."""
+        snap = self.snapshot()
+        return snap.roi, snap.df
+
+    def export_url(self, ufs: Optional[Iterable[str]] = None, decimal: str = ".",
+                   ascii: bool = False, fmt: str = "csv") -> str:
+        """URL da tabela completa em streaming (``app.data.export``) no formato
+        *fmt*, só com as *ufs* (nenhuma = todas); *decimal* e *ascii* valem
+        para o CSV."""
+        if fmt != "csv":
+            return url_for(f"export.{fmt}", name=self.name, UF=sorted(ufs or []))
+        return url_for("export.csv", name=self.name, UF=sorted(ufs or []),
+                       decimal=decimal, ascii=int(bool(ascii)))
+
+    def features(self, version: str, level: int = FULL_LEVEL) -> Optional[FeatureIndex]:
+        """Feições da *version* no *level* – a carregada ou, se ainda existir,
+        do disco (remontadas uma vez e guardadas num LRU pequeno)."""
+        if not 0 <= level <= FULL_LEVEL:
+            return None
+        snap = self.snapshot()
+        if snap.version == version:
+            return snap.features[level]
+        if not version.isalnum():  # vem da URL
+            return None
+
+        def _build() -> Optional[FeatureIndex]:
+            roi = read_geometry(self.name, version, level)
+            return FeatureIndex(roi, level=level) if roi is not None else None
+
+        return self.old_features.get_or_compute((version, level), _build)
+
+    def geometry_url(self, version: str, level: int = FULL_LEVEL,
+                     encoding: str = "geojson") -> str:
+        """URL versionada da FeatureCollection completa no *level*
+        (``geojson=`` do mapa)."""
+        return url_for("_dataset_geometry", name=self.name, version=version,
+                       level=level, encoding=encoding)
+
+    def topology_url(self, version: str, level: int = FULL_LEVEL) -> Optional[str]:
+        """URL do TopoJSON do *level*, se o formato compacto estiver ligado
+        (``AP_GEOMETRY_ENCODING``); vai no ``meta`` do traço do mapa."""
+        if GEOMETRY_ENCODING != "topojson":
+            return None
+        return self.geometry_url(version, level, "topojson")
+
+    def tiles_url(self, version: str, filters: Mapping[str, Optional[Iterable]]) -> str:
+        """URL do TileJSON com todas as áreas que passam em *filters*
+        (``source`` da camada vetorial do mapa); NOME não filtra os tiles."""
+        args = {
+            col: sorted(map(str, values)) for col, values in filters.items()
+            if col in CUBE_DIMENSIONS and values is not None
+        }
+        return url_for("tiles.tilejson", name=self.name, version=version, **args)
+
+    def _read(self, version: str) -> Snapshot:
+        t0 = time.perf_counter()
+        roi, df = read_snapshot(self.name, version, self.columns, self.filter)
+        index = FilterIndex(df)
+        cube = AggregateCube(df)
+        features = tuple(
+            FeatureIndex(read_geometry(self.name, version, level), level=level)
+            for level in range(FULL_LEVEL)
+        ) + (FeatureIndex(roi),)
+        tiles = TileIndex(self.name, roi, df)
+        points = label_points(roi, df)
+        snap = Snapshot(
+            self.name, version, roi, df, index, cube, features, tiles, points,
+            _nbytes(roi, df) + index.nbytes + cube.nbytes
+            + sum(f.nbytes for f in features) + tiles.nbytes + points.nbytes,
+            time.time(),
+        )
+        print(
+            f"{self.name} {version} carregado em {time.perf_counter() - t0:.2f}s "
+            f"({snap.nbytes / 2**20:.1f} MB)"
+        )
+        return snap
+
+    def _load(self) -> Snapshot:
+        version = build_snapshot(self.name, *self.sources)
+        if version is None:
+            raise RuntimeError(f"Sem fontes nem snapshot para {self.name}")
+        self._snapshot = self._read(version)
+        return self._snapshot
+
+    def refresh(self, revalidate: bool = True) -> Optional[str]:
+        """
+        Revalida as fontes e, se a versão mudou, troca o snapshot carregado.
+        A leitura da nova versão acontece sem trava; quem já pegou o snapshot
+        antigo continua com ele.
+        """
+        if revalidate:
+            for fut in [cache.download(urls) for urls in self.sources]:
+                fut.result()
+        version = build_snapshot(self.name, *self.sources)
+        snap = self._snapshot
+        if snap is None or version is None or snap.version == version:
+            return version
+        new = self._read(version)
+        with self._lock:
+            # descartado durante a leitura: não ressuscita
+            if self._snapshot is not None:
+                self._snapshot = new
+                self.results.clear()
+        print(f"{self.name}: {snap.version} → {version}")
+        return version
+
+    def evict(self) -> bool:
+        with self._lock:
+            was_loaded, self._snapshot = self._snapshot is not None, None
+            self.results.clear()
+            self.old_features.clear()
+        return was_loaded
+
+    def load_on_request(self, server, prefix: str) -> None:
+        """Carrega os dados na primeira requisição que começa com *prefix*."""
+
+        @server.before_request
+        def _load_dataset():
+            if not self.loaded and request.path.startswith(prefix):
+                self.get()
+
+    def info(self) -> dict:
+        snap = self._snapshot
+        return {
+            "name": self.name,
+            "loaded": snap is not None,
+            "version": snap.version if snap else None,
+            "rows": len(snap.df) if snap else 0,
+            "features": len(snap.roi) if snap else 0,
+            "bytes": snap.nbytes if snap else 0,
+            "loaded_at": snap.loaded_at if snap else None,
+            "results": self.results.stats(),
+        }
+
+
+# ╭───────────────────────────────────────────────────────────────╮
+# │ Registro                                                      │
+# ╰───────────────────────────────────────────────────────────────╯
+class DatasetRegistry:
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self._datasets: dict[str, Dataset] = {}
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(self, name: str, geojson_urls: list[str], parquet_urls: list[str],
+                 columns: Optional[list[str]] = None,
+                 filter: Optional[ds.Expression] = None) -> Dataset:
+        """
+        Declara um dataset.  *columns* e *filter* (expressão ``pyarrow.dataset``)
+        limitam o que é carregado em memória; a exportação lê a tabela toda.
+        """
+        if name in self._datasets:
+            return self._datasets[name]
+        dataset = Dataset(self, name, geojson_urls, parquet_urls, columns, filter)
+        self._datasets[name] = dataset
+        return dataset
+
+    def __getitem__(self, name: str) -> Dataset:
+        return self._datasets[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._datasets
+
+    def __iter__(self) -> Iterator[Dataset]:
+        return iter(list(self._datasets.values()))
+
+    def _select(self, names: Optional[Iterable[str]]) -> list[Dataset]:
+        if names is None or "*" in names:
+            return list(self)
+        selected = []
+        for name in names:
+            if name not in self._datasets:
+                print(f"Dataset desconhecido: {name}")
+                continue
+            selected.append(self._datasets[name])
+        return selected
+
+    # ---------- carga ----------
+    def prefetch(self) -> list[Future]:
+        """Baixa em paralelo todos os artefatos declarados que faltam no cache."""
+        return cache.prefetch(urls for d in self for urls in d.sources)
+
+    def warm_up(self, names: Iterable[str], background: bool = True) -> None:
+        """Carrega antecipadamente os datasets *names* (``"*"`` = todos)."""
+        threads = []
+        for d in self._select(list(names)):
+            t = threading.Thread(target=d.get, name=f"warm-{d.name}", daemon=True)
+            t.start()
+            threads.append(t)
+        if not background:
+            for t in threads:
+                t.join()
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> dict[str, Optional[str]]:
+        """Revalida todas as fontes em paralelo e troca o que mudou."""
+        selected = self._select(names)
+        futures = [(d, cache.download(urls)) for d in selected for urls in d.sources]
+        versions = {}
+        for d, fut in futures:
+            try:
+                fut.result()
+            except Exception as exc:
+                # fica com as fontes já em cache até a próxima rodada
+                print(f"Erro ao revalidar {d.name}: {exc}")
+                versions[d.name] = None
+        for d in selected:
+            if d.name in versions:
+                continue
+            try:
+                versions[d.name] = d.refresh(revalidate=False)
+            except Exception as exc:
+                print(f"Erro ao atualizar {d.name}: {exc}")
+                versions[d.name] = None
+        return versions
+
+    def start_refresher(self, interval: float = REFRESH_SECONDS) -> bool:
+        """Thread que chama ``refresh`` já na subida – o cache pode estar
+        quente e desatualizado – e depois a cada *interval* segundos
+        (``0`` = só a primeira)."""
+        if self._refresher is not None and self._refresher.is_alive():
+            return False
+        self._stop.clear()
+
+        def _refresh():
+            # um erro não pode encerrar a thread: tenta de novo na próxima
+            try:
+                self.refresh()
+            except Exception as exc:
+                print(f"Erro na atualização dos datasets: {exc}")
+
+        def _loop():
+            _refresh()
+            while interval > 0 and not self._stop.wait(interval):
+                _refresh()
+
+        self._refresher = threading.Thread(
+            target=_loop, name="dataset-refresher", daemon=True
+        )
+        self._refresher.start()
+        return True
+
+    def stop_refresher(self) -> None:
+        self._stop.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
+
+    def evict(self, names: Optional[Iterable[str]] = None) -> list[str]:
+        return [d.name for d in self._select(names) if d.evict()]
+
+    # ---------- memória ----------
+    def total_bytes(self) -> int:
+        return sum(d.info()["bytes"] for d in self)
+
+    def report(self) -> list[dict]:
+        return [d.info() for d in self]
+
+    def _enforce_limit(self, keep: Dataset) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            candidates = sorted(
+                (d for d in self if d.loaded and d is not keep),
+                key=lambda d: d.last_used,
+            )
+            while self.total_bytes() > self.max_bytes and candidates:
+                victim = candidates.pop(0)
+                victim.evict()
+                print(f"{victim.name} descartado (limite de {self.max_bytes / 2**20:.0f} MB)")
+
+    def init_app(self, server) -> None:
+        """
+        Expõe o relatório de memória do worker em ``/ap/_datasets``, o resumo
+        por UF de cada dataset em ``/ap/_summary/<nome>`` (filtros na query
+        string, ex.: ``?MODALIDADE=UC Federal&UF=PA&UF=AM``) e as geometrias
+        de cada versão, por nível de detalhe, em
+        ``/ap/_geometry/<nome>/<versão>/<nível>.geojson`` (ou ``.topojson``).
+        """
+
+        @server.get("/ap/_datasets")
+        def _datasets_report():
+            return jsonify(total_bytes=self.total_bytes(), datasets=self.report())
+
+        @server.get("/ap/_summary/<name>")
+        def _dataset_summary(name: str):
+            if name not in self:
+                return jsonify(error=f"Dataset desconhecido: {name}"), 404
+            snap = self[name].snapshot()
+            cube = snap.cube
+            filters = {
+                dim: request.args.getlist(dim)
+                for dim in CUBE_DIMENSIONS if dim in cube.dims and dim in request.args
+            }
+            by_uf = cube.by("UF", filters).reset_index()
+            metric = cube.metrics[0]
+            top = snap.df.iloc[cube.top(filters, metric)][["RANK", "NOME", "UF", metric]]
+            return jsonify(
+                name=name,
+                version=snap.version,
+                filters=filters,
+                totals=cube.totals(filters),
+                by_uf=by_uf.astype(object).where(by_uf.notna(), None).to_dict("records"),
+                top=top.astype(object).where(top.notna(), None).to_dict("records"),
+            )
+
+        @server.get("/ap/_geometry/<name>/<version>/<int:level>.<any(geojson, topojson):encoding>")
+        def _dataset_geometry(name: str, version: str, level: int, encoding: str):
+            features = self[name].features(version, level) if name in self else None
+            if features is None:
+                abort(404)
+            mimetype = GEOMETRY_MIMETYPES[encoding]
+            if request.accept_encodings["gzip"]:
+                response = Response(features.gzipped(encoding), mimetype=mimetype)
+                response.content_encoding = "gzip"
+            elif encoding == "topojson":
+                response = Response(features.topology(), mimetype=mimetype)
+            else:
+                response = Response(features.collection(), mimetype=mimetype)
+            response.vary.add("Accept-Encoding")
+            response.set_etag(
+                f"{version}-{level}-{encoding}-{response.content_encoding or 'identity'}"
+            )
+            response.cache_control.public = True
+            response.cache_control.max_age = GEOMETRY_MAX_AGE
+            response.cache_control.immutable = True
+            return response.make_conditional(request)
+
+
+registry = DatasetRegistry(max_bytes=int(MAX_DATASET_MB * 2**20))
@@ -0,0 +1,260 @@
+# app/data/snapshots.py
+"""
+Snapshots colunares pré-processados
+-----------------------------------
+O pré-processamento que cada processo repetia na importação (NOME em
+maiúsculas e sem acentos, ordenação por RANK, colunas de filtro como
+categóricas/dicionário) roda uma única vez e é gravado em Arrow IPC
+(Feather v2, sem compressão):
+
+    <snapshots>/<dataset>/<versão>/table.arrow      tabela (df)
+    <snapshots>/<dataset>/<versão>/table/UF=../     idem, particionada por UF
+    <snapshots>/<dataset>/<versão>/geometry.arrow   geometrias (roi)
+    <snapshots>/<dataset>/<versão>/geometry-<n>.arrow   idem, simplificadas
+                                                    (nível de detalhe n)
+    <snapshots>/<dataset>/CURRENT                   versão mais recente
+
+A versão é derivada do sha256 dos arquivos-fonte (e de ``SNAPSHOT_FORMAT``).
+Os workers leem a tabela mapeada em memória pela API de datasets do pyarrow,
+só com as colunas e o filtro que cada dashboard declara
+(``registry.register(..., columns=, filter=)``); com
+``AP_SNAPSHOT_PARTITION=UF`` a tabela é gravada particionada e filtros por UF
+nem abrem as outras partições.  A tabela completa (exportação CSV) é lida
+sob demanda.
+
+Geração offline:  ``flask --app run build-snapshots``
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+import click
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+from app.data.geometry import FULL_LEVEL, simplify
+from app.data.text import normalize_name
+from app.data.sources import (
+    CACHE_DIR, LOCAL_FS, cache, load_geojson, load_parquet, read_dataset,
+)
+
+SNAPSHOT_DIR = Path(os.environ.get("AP_SNAPSHOT_DIR", CACHE_DIR / "snapshots"))
+PARTITION_BY = [c for c in os.environ.get("AP_SNAPSHOT_PARTITION", "").split(",") if c]
+KEEP_VERSIONS = 3
+SNAPSHOT_FORMAT = 3  # muda quando o pré-processamento muda
+
+CATEGORICAL_COLUMNS = [
+    "UF", "MODALIDADE", "JURISDICAO", "USO", "CATEGORIA", "FASE", "NOME",
+]
+# padrão das colunas carregadas: filtros + métricas exibidas
+TABLE_COLUMNS = [
+    "RANK", "NOME", "UF", "MODALIDADE", "USO", "FASE", "CATEGORIA",
+    "DESMATAM_1", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N",
+]
+GEOMETRY_COLUMNS = ["NOME", "geometry"]
+
+
+# ╭─ pré-processamento ──────────────────────────────────────────────────────╮
+def prepare_table(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["NOME"] = normalize_name(df["NOME"])
+    df = df.sort_values("RANK", kind="stable").reset_index(drop=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def prepare_geometry(roi: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    roi = roi.copy()
+    roi["NOME"] = normalize_name(roi["NOME"])
+    roi = roi.sort_values("RANK", kind="stable").reset_index(drop=True)
+    return roi[GEOMETRY_COLUMNS]
+
+
+# ╭─ versões ────────────────────────────────────────────────────────────────╮
+def _file_sha256(path: Path) -> str:
+    # objetos do cache já trazem o hash no nome
+    if path.parent == cache.objects:
+        return path.name.split(".", 1)[0]
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_version(*paths: Path) -> str:
+    digest = hashlib.sha256(f"format={SNAPSHOT_FORMAT}".encode())
+    for path in paths:
+        digest.update(_file_sha256(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def current_version(name: str) -> Optional[str]:
+    try:
+        version = (SNAPSHOT_DIR / name / "CURRENT").read_text().strip()
+    except OSError:
+        return None
+    return version if (SNAPSHOT_DIR / name / version).is_dir() else None
+
+
+# ╭─ escrita ────────────────────────────────────────────────────────────────╮
+def write_snapshot(name: str, version: str, roi: gpd.GeoDataFrame,
+                   df: pd.DataFrame) -> Path:
+    """Grava a versão em diretório temporário e publica com ``rename``."""
+    base = SNAPSHOT_DIR / name
+    base.mkdir(parents=True, exist_ok=True)
+    target = base / version
+    tmp = Path(tempfile.mkdtemp(dir=base, prefix=".tmp-"))
+    table = prepare_table(df)
+    if PARTITION_BY:
+        ds.write_dataset(
+            pa.Table.from_pandas(table, preserve_index=False), tmp / "table",
+            format="ipc", partitioning=PARTITION_BY, partitioning_flavor="hive",
+        )
+    else:
+        feather.write_feather(table, tmp / "table.arrow", compression="uncompressed")
+    geometry = prepare_geometry(roi)
+    for level in range(FULL_LEVEL + 1):
+        simplify(geometry, level).to_feather(tmp / _geometry_file(level))
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # outro processo publicou a mesma versão primeiro
+        shutil.rmtree(tmp, ignore_errors=True)
+    set_current(name, version)
+    return target
+
+
+def set_current(name: str, version: str) -> None:
+    base = SNAPSHOT_DIR / name
+    fd, tmp = tempfile.mkstemp(dir=base, prefix=".tmp-")
+    with os.fdopen(fd, "w") as fh:
+        fh.write(version)
+    os.replace(tmp, base / "CURRENT")
+    _prune(base, keep=version)
+
+
+def _prune(base: Path, keep: str) -> None:
+    versions = sorted(
+        (p for p in base.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for old in versions[KEEP_VERSIONS:]:
+        if old.name != keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+# ╭─ leitura ────────────────────────────────────────────────────────────────╮
+def _geometry_file(level: int) -> str:
+    return "geometry.arrow" if level >= FULL_LEVEL else f"geometry-{level}.arrow"
+
+
+def read_table(name: str, version: str, columns: Optional[list[str]] = None,
+               filter: Optional[ds.Expression] = None) -> pd.DataFrame:
+    """Tabela do snapshot, só com *columns* e as linhas que passam em *filter*."""
+    path = SNAPSHOT_DIR / name / version
+    partitioned = (path / "table").is_dir()
+    df = read_dataset(path / "table" if partitioned else path / "table.arrow",
+                      columns, filter, format="ipc")
+    if partitioned and "RANK" in df.columns:
+        # partições saem na ordem de UF
+        df = df.sort_values("RANK", kind="stable").reset_index(drop=True)
+    return df
+
+
+def scan_table(name: str, version: str,
+               filters: Optional[Mapping[str, Optional[Iterable]]] = None,
+               batch_size: int = 4096) -> ds.Scanner:
+    """
+    Todas as colunas da tabela do snapshot em lotes de até *batch_size*
+    linhas, só as que passam em *filters* (``{coluna: valores}``; colunas
+    ausentes são ignoradas) – para exportar sem montar a tabela.  Particionada,
+    a tabela sai na ordem das partições (RANK dentro de cada uma).
+    """
+    path = SNAPSHOT_DIR / name / version
+    partitioned = (path / "table").is_dir()
+    dataset = ds.dataset(
+        str(path / "table" if partitioned else path / "table.arrow"), format="ipc",
+        filesystem=LOCAL_FS, partitioning=ds.HivePartitioning.discover(infer_dictionary=True),
+    )
+    expression = None
+    for col, values in (filters or {}).items():
+        if values is None or col not in dataset.schema.names:
+            continue
+        condition = ds.field(col).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    return dataset.scanner(filter=expression, batch_size=batch_size)
+
+
+def geometry_table(name: str, version: str) -> Optional[pa.Table]:
+    """Geometrias originais da versão como tabela Arrow (NOME + WKB, metadados
+    ``geo``), mapeadas do disco – ou ``None`` se a versão já foi removida."""
+    path = SNAPSHOT_DIR / name / version / _geometry_file(FULL_LEVEL)
+    return feather.read_table(path, memory_map=True) if path.is_file() else None
+
+
+def read_geometry(name: str, version: str,
+                  level: int = FULL_LEVEL) -> Optional[gpd.GeoDataFrame]:
+    """Geometrias da versão no *level*, ou ``None`` se ela já foi removida."""
+    path = SNAPSHOT_DIR / name / version / _geometry_file(level)
+    return gpd.read_feather(path) if path.is_file() else None
+
+
+def read_snapshot(name: str, version: str,
+                  columns: Optional[list[str]] = TABLE_COLUMNS,
+                  filter: Optional[ds.Expression] = None
+                  ) -> tuple[gpd.GeoDataFrame, pd.DataFrame]:
+    roi = gpd.read_feather(SNAPSHOT_DIR / name / version / "geometry.arrow")
+    return roi, read_table(name, version, columns, filter)
+
+
+def build_snapshot(name: str, geojson_urls: list[str], parquet_urls: list[str],
+                   force: bool = False) -> Optional[str]:
+    """Gera (se preciso) o snapshot das fontes atuais; devolve a versão."""
+    geo_path = cache.resolve(geojson_urls, revalidate=False)
+    pq_path = cache.resolve(parquet_urls, revalidate=False)
+    if geo_path is None or pq_path is None:
+        return current_version(name)
+
+    version = source_version(geo_path, pq_path)
+    exists = (SNAPSHOT_DIR / name / version).is_dir()
+    if force or not exists:
+        roi = load_geojson(geojson_urls, revalidate=False)
+        df = load_parquet(parquet_urls, revalidate=False)
+        if roi is None or df is None:
+            return current_version(name)
+        if exists:
+            shutil.rmtree(SNAPSHOT_DIR / name / version, ignore_errors=True)
+        write_snapshot(name, version, roi, df)
+    elif current_version(name) != version:
+        set_current(name, version)
+    return version
+
+
+# ╭─ comando ────────────────────────────────────────────────────────────────╮
+@click.command("build-snapshots")
+@click.option("--force", is_flag=True, help="Regera mesmo se a versão já existe.")
+def build_snapshots_command(force: bool) -> None:
+    """Gera os snapshots Arrow de todos os dashboards."""
+    from app.data.registry import registry
+
+    for d in registry:
+        version = build_snapshot(d.name, *d.sources, force=force)
+        click.echo(f"{d.name}: {version or 'sem fontes'}")
+
+
+if __name__ == "__main__":
+    # o pacote ``app`` já importou os dashboards, que registram os datasets
+    build_snapshots_command()
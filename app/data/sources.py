@@ -0,0 +1,294 @@
+# app/data/sources.py
+"""
+Fontes de dados – cache local endereçado por conteúdo
+------------------------------------------------------
+Cada artefato (GeoJSON / parquet) é identificado pelo nome do arquivo na URL
+e resolvido para ``<cache>/objects/<sha256><sufixo>``.  A referência
+``<cache>/refs/<arquivo>.json`` guarda o hash atual, ETag e Last-Modified.
+
+Ordem de resolução:
+1. cópia em cache  → devolvida na hora, revalidada em segundo plano;
+2. arquivo empacotado em ``dataset/`` → devolvido na hora, cache populado
+   em segundo plano;
+3. download dos espelhos, em corrida (``app.data.fetch.race``).
+
+Os downloads rodam em um pool de threads e são deduplicados por arquivo:
+``prefetch`` dispara todos os artefatos de uma vez na subida e uma carga
+que precise do mesmo arquivo apenas aguarda o download em andamento.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from app.data.fetch import (
+    POOL_SIZE,
+    TIMEOUT,
+    Cancelled,
+    DownloadError,
+    make_session,
+    race,
+)
+
+# ───────────────────── configuração ─────────────────────────────
+CHUNK = 1 << 13  # pequeno: o perdedor da corrida aborta a cada bloco
+CACHE_DIR = Path(
+    os.environ.get("AP_CACHE_DIR", Path.home() / ".cache" / "imazon_ap")
+)
+BUNDLED_DIR = Path(__file__).resolve().parents[2] / "dataset"
+BUNDLED_SUBDIRS = {".parquet": "csv", ".geojson": "geojson"}
+LOCAL_FS = fs.LocalFileSystem(use_mmap=True)
+
+
+def _filename(url: str) -> str:
+    return url.rsplit("/", 1)[-1].split("?", 1)[0]
+
+
+def _bundled_path(filename: str) -> Optional[Path]:
+    sub = BUNDLED_SUBDIRS.get(Path(filename).suffix)
+    if sub is None:
+        return None
+    path = BUNDLED_DIR / sub / filename
+    return path if path.exists() else None
+
+
+def _looks_valid(path: str, suffix: str) -> bool:
+    """Checagem barata do conteúdo (páginas de erro HTML chegam com 200)."""
+    with open(path, "rb") as fh:
+        head = fh.read(64)
+        if suffix == ".parquet":
+            fh.seek(-4, os.SEEK_END)
+            return head[:4] == b"PAR1" and fh.read(4) == b"PAR1"
+    if suffix == ".geojson":
+        return head.lstrip()[:1] == b"{"
+    return bool(head)
+
+
+# ╭───────────────────────────────────────────────────────────────╮
+# │ Cache em disco                                                │
+# ╰───────────────────────────────────────────────────────────────╯
+class DataCache:
+    """Cache de artefatos remotos endereçado pelo sha256 do conteúdo."""
+
+    def __init__(self, root: Path | str = CACHE_DIR, session=None,
+                 workers: int = POOL_SIZE):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.refs = self.root / "refs"
+        self.session = session or make_session()
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._artifact_pool: Optional[ThreadPoolExecutor] = None
+        self._mirror_pool: Optional[ThreadPoolExecutor] = None
+
+    def _pools(self) -> tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        # criados sob demanda: um pool por artefato e outro para os espelhos
+        # (a corrida espera pelos espelhos, então não podem dividir o pool)
+        if self._artifact_pool is None:
+            self._artifact_pool = ThreadPoolExecutor(
+                self.workers, thread_name_prefix="artifact"
+            )
+            self._mirror_pool = ThreadPoolExecutor(
+                2 * self.workers, thread_name_prefix="mirror"
+            )
+        return self._artifact_pool, self._mirror_pool
+
+    # ---------- referências ----------
+    def _ref_path(self, filename: str) -> Path:
+        return self.refs / f"{filename}.json"
+
+    def read_ref(self, filename: str) -> Optional[dict]:
+        try:
+            with open(self._ref_path(filename), encoding="utf-8") as fh:
+                ref = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if not (self.objects / ref.get("object", "")).is_file():
+            return None
+        return ref
+
+    def _write_atomic(self, target: Path, data: bytes) -> None:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, target)
+
+    def _write_ref(self, filename: str, ref: dict) -> None:
+        self._write_atomic(
+            self._ref_path(filename), json.dumps(ref, indent=1).encode("utf-8")
+        )
+
+    # ---------- download ----------
+    def _fetch_mirror(self, url: str, cancel: threading.Event,
+                      ref: Optional[dict] = None) -> dict:
+        """
+        Baixa um espelho em streaming para ``objects/``.  Com *ref*, faz GET
+        condicional e devolve a própria *ref* em caso de 304.  Não grava a
+        referência: quem vence a corrida é que decide.
+        """
+        suffix = Path(_filename(url)).suffix
+        headers = {}
+        if ref:
+            if ref.get("etag"):
+                headers["If-None-Match"] = ref["etag"]
+            if ref.get("last_modified"):
+                headers["If-Modified-Since"] = ref["last_modified"]
+
+        with self.session.get(url, headers=headers, timeout=TIMEOUT,
+                              stream=True) as r:
+            if r.status_code == 304 and ref:
+                return dict(ref, checked_at=time.time())
+            r.raise_for_status()
+
+            self.objects.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.objects, prefix=".tmp-")
+            digest = hashlib.sha256()
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    for chunk in r.iter_content(CHUNK):
+                        if cancel.is_set():
+                            raise Cancelled(url)
+                        digest.update(chunk)
+                        fh.write(chunk)
+                if not _looks_valid(tmp, suffix):
+                    raise ValueError("conteúdo inválido")
+                obj = f"{digest.hexdigest()}{suffix}"
+                os.replace(tmp, self.objects / obj)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+            etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+        return {
+            "object": obj,
+            "sha256": digest.hexdigest(),
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "checked_at": time.time(),
+        }
+
+    def _download(self, urls: list[str], ref: Optional[dict]) -> Optional[dict]:
+        filename = _filename(urls[0])
+        _, mirror_pool = self._pools()
+        try:
+            new_ref = race(
+                mirror_pool,
+                lambda url, cancel: self._fetch_mirror(url, cancel, ref),
+                urls,
+            )
+        except DownloadError as exc:
+            print(f"Erro ao baixar {filename}: {exc}")
+            return None
+        self._write_ref(filename, new_ref)
+        return new_ref
+
+    def download(self, urls: list[str]) -> Future:
+        """
+        Agenda o download de um artefato (todos os espelhos em corrida).
+        Chamadas repetidas para o mesmo arquivo reutilizam o mesmo Future.
+        """
+        filename = _filename(urls[0])
+        artifact_pool, _ = self._pools()
+        with self._lock:
+            fut = self._inflight.get(filename)
+            if fut is None or fut.done():
+                fut = artifact_pool.submit(
+                    self._download, list(urls), self.read_ref(filename)
+                )
+                self._inflight[filename] = fut
+        return fut
+
+    def prefetch(self, url_lists: Iterable[list[str]]) -> list[Future]:
+        """Dispara de uma vez todos os artefatos que ainda não estão no cache."""
+        return [
+            self.download(urls)
+            for urls in url_lists
+            if self.read_ref(_filename(urls[0])) is None
+        ]
+
+    # ---------- resolução ----------
+    def resolve(self, urls: list[str], *, revalidate: bool = True) -> Optional[Path]:
+        """Caminho local do artefato (cache → empacotado → download)."""
+        filename = _filename(urls[0])
+
+        ref = self.read_ref(filename)
+        if ref is not None:
+            if revalidate:
+                self.download(urls)
+            return self.objects / ref["object"]
+
+        bundled = _bundled_path(filename)
+        if bundled is not None:
+            if revalidate:
+                self.download(urls)
+            return bundled
+
+        ref = self.download(urls).result()
+        return self.objects / ref["object"] if ref else None
+
+
+cache = DataCache()
+
+
+# ╭───────────────────────────────────────────────────────────────╮
+# │ Loaders usados pelos dashboards                               │
+# ╰───────────────────────────────────────────────────────────────╯
+def load_geojson(urls: list[str], *, revalidate: bool = True) -> gpd.GeoDataFrame | None:
+    path = cache.resolve(urls, revalidate=revalidate)
+    if path is None:
+        return None
+    try:
+        return gpd.read_file(path)
+    except Exception as exc:
+        print(f"Erro ao ler {path}: {exc}")
+        return None
+
+
+def read_dataset(path: Path | str, columns: Optional[list[str]] = None,
+                 filter: Optional[ds.Expression] = None,
+                 format: str = "parquet") -> pd.DataFrame:
+    """
+    Lê *path* – arquivo único ou diretório particionado (``UF=PA/...``) – pela
+    API de datasets do pyarrow.  Só as *columns* pedidas são decodificadas e
+    *filter* descarta partições e row groups pelas estatísticas antes de ler.
+    """
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=True)
+    dataset = ds.dataset(str(path), format=format, filesystem=LOCAL_FS,
+                         partitioning=partitioning)
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    table = dataset.to_table(columns=columns, filter=filter)
+    return table.to_pandas(split_blocks=True)
+
+
+def load_parquet(urls: list[str], *, columns: Optional[list[str]] = None,
+                 filter: Optional[ds.Expression] = None,
+                 revalidate: bool = True) -> pd.DataFrame | None:
+    path = cache.resolve(urls, revalidate=revalidate)
+    if path is None:
+        return None
+    try:
+        return read_dataset(path, columns, filter)
+    except Exception as exc:
+        print(f"Erro ao ler {path}: {exc}")
+        return None
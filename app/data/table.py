@@ -0,0 +1,73 @@
+# app/data/table.py
+"""
+Tabela das áreas
+----------------
+As colunas da tabela dos dashboards são formatadas de uma vez, sobre os
+arrays do frame – nenhum ``iterrows`` nem f-string por célula.
+
+Além do top-N, os dashboards mostram o ranking completo numa ``DataTable``
+paginada no servidor (``page_action="custom"``), por chave: o navegador
+guarda, para cada página já vista, o RANK da sua última linha (cursor), e a
+página seguinte são as linhas filtradas depois dele (``FilterIndex.after``).
+Só a página vai para o navegador; o frame filtrado nunca é montado.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from typing import Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.data.filters import FilterIndex
+
+TABLE_COLUMNS = ["NOME", "FOCOS DE C", "N DE CAR", "CAR", "ESTRADAS N"]
+TABLE_UNITS = {"CAR": "km²", "ESTRADAS N": "km"}  # duas casas + unidade
+TABLE_PAGE_SIZE = int(os.environ.get("AP_TABLE_PAGE_SIZE", "50"))
+
+
+def format_columns(df: pd.DataFrame) -> dict[str, list]:
+    """Valores exibidos de cada coluna de ``TABLE_COLUMNS``, coluna a coluna."""
+    out = {}
+    for col in TABLE_COLUMNS:
+        values = df[col].to_numpy()
+        if col in TABLE_UNITS:
+            values = np.char.add(np.char.mod("%.2f", values.astype(float)), " " + TABLE_UNITS[col])
+        out[col] = values.tolist()
+    return out
+
+
+def table_rows(df: pd.DataFrame) -> list[tuple]:
+    """Linhas da tabela (valores já formatados, na ordem de ``TABLE_COLUMNS``)."""
+    return list(zip(*format_columns(df).values()))
+
+
+def table_records(df: pd.DataFrame) -> list[dict]:
+    """Linhas da tabela como registros (``data`` da ``DataTable``)."""
+    return [dict(zip(TABLE_COLUMNS, row)) for row in table_rows(df)]
+
+
+def ranking_page(df: pd.DataFrame, index: FilterIndex,
+                 filters: Mapping[str, Optional[Iterable]], page: int,
+                 cursors: Sequence[int] = (), size: int = TABLE_PAGE_SIZE
+                 ) -> tuple[list[dict], int, int, list[int]]:
+    """
+    Página *page* (0, 1, …) do ranking filtrado, na ordem de RANK.
+
+    ``cursors[k]`` é o RANK da última linha da página *k*.  Uma página sem
+    cursor anterior conhecido (salto pela caixa de página) é alcançada andando
+    de página em página a partir do último cursor.  Devolve os registros, a
+    página efetiva (limitada à última), o número de páginas e os cursores.
+    """
+    pages = max(math.ceil(index.count(filters) / size), 1)
+    page = min(max(page, 0), pages - 1)
+    cursors = list(cursors)
+    while True:
+        k = min(page, len(cursors))
+        rows = index.after(filters, cursors[k - 1] if k else None, size)
+        if k == page or not len(rows):
+            break
+        cursors.append(index.key(rows[-1]))
+    return table_records(df.iloc[rows]), page, pages, cursors
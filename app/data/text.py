@@ -0,0 +1,61 @@
+# app/data/text.py
+"""
+Normalização de textos
+----------------------
+``unidecode`` (e ``upper``) roda uma vez por valor distinto: a coluna é
+fatorada – categorias de uma categórica, ``pd.factorize`` nas demais –, só
+os valores únicos são normalizados e o resultado volta às linhas pelos
+códigos.  O custo cresce com o número de textos distintos, não de células.
+
+Valores que não são texto (NaN, None, números) passam sem mudança.
+"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import unidecode
+
+
+def _is_text(s: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)
+
+
+def map_distinct(s: pd.Series, func: Callable[[str], str]) -> pd.Series:
+    """*func* aplicada a cada texto distinto de *s*; categórica continua
+    categórica (categorias que coincidem depois de *func* são unidas)."""
+    def apply(values) -> np.ndarray:
+        return np.array([func(v) if isinstance(v, str) else v for v in values], dtype=object)
+
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        remap, categories = pd.factorize(apply(s.cat.categories))
+        codes = np.where(codes >= 0, remap[np.maximum(codes, 0)], -1) if len(remap) else codes
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=s.index, name=s.name)
+    if not _is_text(s):
+        return s
+    codes, uniques = pd.factorize(s)
+    if not len(uniques):
+        return s
+    out = np.where(codes >= 0, apply(uniques)[np.maximum(codes, 0)], s.to_numpy(dtype=object))
+    return pd.Series(out, index=s.index, name=s.name)
+
+
+def strip_accents(s: pd.Series) -> pd.Series:
+    """Textos de *s* sem acentos."""
+    return map_distinct(s, unidecode.unidecode)
+
+
+def normalize_name(s: pd.Series) -> pd.Series:
+    """NOME como as fontes são casadas: maiúsculas e sem acentos."""
+    return map_distinct(s, lambda x: unidecode.unidecode(x.upper()))
+
+
+def strip_accents_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas de texto (e categóricas) de *df* sem acentos, no lugar."""
+    for col in df.columns:
+        if _is_text(df[col]) or isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = strip_accents(df[col])
+    return df
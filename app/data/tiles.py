@@ -0,0 +1,141 @@
+# app/data/tiles.py
+"""
+Tiles vetoriais das camadas
+---------------------------
+Blueprint com as áreas de cada dataset em Mapbox Vector Tiles:
+
+    /ap/_tiles/<dataset>/<versão>.json              TileJSON (URLs dos tiles)
+    /ap/_tiles/<dataset>/<versão>/<z>/<x>/<y>.mvt   tile
+
+Os filtros vão na query string, como em ``/ap/_summary``
+(``?MODALIDADE=UC Federal&UF=PA&UF=AM``), e valem para todas as áreas – não
+só o top-N.  Cada tile é gerado uma vez a partir do ``TileIndex`` da versão
+carregada (``app.data.mvt``) e gravado, com gzip, em
+
+    <snapshots>/<dataset>/<versão>/tiles/<filtro>/<z>/<x>/<y>.mvt.gz
+
+– a poda das versões antigas leva os tiles junto.  Valores de filtro fora do
+índice da versão não casam com nada e saem da chave do cache (``?UF=xyz`` é
+o mesmo tile que qualquer outro valor inexistente), e só os tiles sem filtro
+e os de até ``MAX_TILE_FILTERS`` combinações por versão vão para o disco; os
+demais são gerados a cada requisição.  Acima de ``MAX_TILE_ZOOM``
+o mapa amplia os tiles desse zoom (``maxzoom`` do TileJSON), então o trabalho
+de cada requisição é limitado.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from flask import Blueprint, Response, abort, jsonify, request, url_for
+
+from app.data.cube import CUBE_DIMENSIONS
+from app.data.filters import FilterIndex
+from app.data.memo import filter_key
+from app.data.registry import GEOMETRY_MAX_AGE, registry
+from app.data.snapshots import SNAPSHOT_DIR
+
+MAX_TILE_ZOOM = 12
+TILE_MIMETYPE = "application/vnd.mapbox-vector-tile"
+# combinações de filtros com tiles gravados, por versão
+MAX_TILE_FILTERS = int(os.environ.get("AP_MAX_TILE_FILTERS", "32"))
+
+tiles = Blueprint("tiles", __name__, url_prefix="/ap/_tiles")
+
+
+def _filters(columns) -> dict[str, list[str]]:
+    return {
+        dim: request.args.getlist(dim)
+        for dim in CUBE_DIMENSIONS if dim in columns and dim in request.args
+    }
+
+
+def _known(filters: dict, index: FilterIndex) -> dict[str, list[str]]:
+    """*filters* só com os valores do índice – os outros não casam com nada,
+    e deixá-los na chave abriria um diretório de tiles por valor inventado."""
+    return {dim: [v for v in values if v in index.values(dim)]
+            for dim, values in filters.items()}
+
+
+def _tile_path(name: str, version: str, filters: dict, z: int, x: int, y: int) -> Path:
+    key = hashlib.sha256(repr(filter_key(filters)).encode()).hexdigest()[:16]
+    return (SNAPSHOT_DIR / name / version / "tiles" / (key if filters else "all")
+            / str(z) / str(x) / f"{y}.mvt.gz")
+
+
+def _store(path: Path, data: bytes) -> None:
+    """Grava o tile sem deixar arquivo pela metade – se a versão ainda existe
+    e o filtro já tem diretório ou cabe em ``MAX_TILE_FILTERS``."""
+    if not path.parents[4].is_dir():
+        return
+    folder = path.parents[2]
+    if folder.name != "all" and not folder.is_dir():
+        stored = [p for p in path.parents[3].glob("*") if p.name != "all"]
+        if len(stored) >= MAX_TILE_FILTERS:
+            return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _immutable(response: Response) -> Response:
+    # versão (e filtro) na URL: o conteúdo nunca muda
+    response.cache_control.public = True
+    response.cache_control.max_age = GEOMETRY_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+@tiles.get("/<name>/<version>.json")
+def tilejson(name: str, version: str):
+    if name not in registry:
+        abort(404)
+    snap = registry[name].snapshot()
+    if snap.version != version:
+        abort(404)
+    filters = _filters(snap.df.columns)
+    # o mapa baixa os tiles num worker: URLs absolutas
+    url = url_for("tiles.tile", name=name, version=version, z=0, x=0, y=0,
+                  _external=True, **filters)
+    return _immutable(jsonify(
+        tilejson="3.0.0",
+        name=name,
+        version=version,
+        tiles=[url.replace("/0/0/0.mvt", "/{z}/{x}/{y}.mvt", 1)],
+        minzoom=0,
+        maxzoom=MAX_TILE_ZOOM,
+        bounds=snap.tiles.bounds,
+        vector_layers=[{"id": name, "fields": snap.tiles.fields}],
+    ))
+
+
+@tiles.get("/<name>/<version>/<int:z>/<int:x>/<int:y>.mvt")
+def tile(name: str, version: str, z: int, x: int, y: int):
+    if name not in registry or not version.isalnum() or z > MAX_TILE_ZOOM:
+        abort(404)
+    if x >= 2 ** z or y >= 2 ** z:
+        abort(404)
+    snap = registry[name].snapshot()
+    filters = _known(_filters(snap.df.columns), snap.index)
+    path = _tile_path(name, version, filters, z, x, y)
+    if path.is_file():
+        data = path.read_bytes()
+    elif snap.version == version:
+        keep = snap.tiles.keep(snap.index.mask(filters))
+        data = gzip.compress(snap.tiles.render(z, x, y, keep), compresslevel=6)
+        _store(path, data)
+    else:
+        abort(404)
+    if request.accept_encodings["gzip"]:
+        response = Response(data, mimetype=TILE_MIMETYPE)
+        response.content_encoding = "gzip"
+    else:
+        response = Response(gzip.decompress(data), mimetype=TILE_MIMETYPE)
+    response.vary.add("Accept-Encoding")
+    return _immutable(response)
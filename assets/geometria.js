@@ -0,0 +1,87 @@
+/* ------------------------------------------
+   GEOMETRIAS COMPACTAS DO MAPA (TopoJSON)
+   O servidor manda as geometrias com coordenadas inteiras, em deltas
+   e com os arcos compartilhados entre vizinhos (meta.topojson do
+   traço).  Aqui elas viram GeoJSON e entram no cache do plotly.js
+   (PlotlyGeoAssets) sob a URL do geojson do traço, que então não é
+   baixada.  Sem TopoJSON, ou se ele falhar, o plotly.js baixa o GeoJSON.
+------------------------------------------- */
+(function () {
+    /* arcos absolutos, em graus */
+    function decodificarArcos(topo) {
+        const escala = topo.transform.scale;
+        const origem = topo.transform.translate;
+        return topo.arcs.map(function (arco) {
+            let x = 0;
+            let y = 0;
+            return arco.map(function (delta) {
+                x += delta[0];
+                y += delta[1];
+                return [x * escala[0] + origem[0], y * escala[1] + origem[1]];
+            });
+        });
+    }
+
+    /* anel = arcos em sequência (índice negativo: arco ~i invertido) */
+    function montarAnel(indices, arcos) {
+        const pontos = [];
+        indices.forEach(function (i, n) {
+            const arco = i < 0 ? arcos[~i].slice().reverse() : arcos[i];
+            for (let k = n ? 1 : 0; k < arco.length; k++) {
+                pontos.push(arco[k]);
+            }
+        });
+        return pontos;
+    }
+
+    function paraGeojson(topo) {
+        const arcos = topo.arcs.length ? decodificarArcos(topo) : [];
+        const poligono = function (aneis) {
+            return aneis.map(function (anel) { return montarAnel(anel, arcos); });
+        };
+        return {
+            type: "FeatureCollection",
+            features: topo.objects.features.geometries.map(function (g) {
+                return {
+                    type: "Feature",
+                    properties: g.properties,
+                    geometry: {
+                        type: g.type,
+                        coordinates: g.type === "Polygon" ? poligono(g.arcs) : g.arcs.map(poligono),
+                    },
+                };
+            }),
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside);
+    window.dash_clientside.ap = Object.assign({}, window.dash_clientside.ap, {
+        /* figura do servidor → mapa, com as geometrias já no cache */
+        carregarGeometria: function (figura) {
+            if (!figura || !figura.data || !figura.data.length) {
+                return window.dash_clientside.no_update;
+            }
+            const traco = figura.data[0];
+            const url = traco.geojson;
+            const topojson = traco.meta && traco.meta.topojson;
+            const cache = window.PlotlyGeoAssets = window.PlotlyGeoAssets || {topojson: {}};
+            if (!topojson || typeof url !== "string" || cache[url]) {
+                return figura;
+            }
+            return fetch(topojson)
+                .then(function (resposta) {
+                    if (!resposta.ok) {
+                        throw new Error(resposta.status);
+                    }
+                    return resposta.json();
+                })
+                .then(function (topo) {
+                    if (!cache[url]) {
+                        cache[url] = paraGeojson(topo);
+                    }
+                    return figura;
+                })
+                .catch(function () { return figura; });
+        },
+    });
+})();
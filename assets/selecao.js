@@ -0,0 +1,54 @@
+/* ------------------------------------------
+   SELEÇÃO NOS GRÁFICOS (callbacks clientside)
+   Alternar um nome e recolorir as barras é estado de interface:
+   roda no navegador, sem ida ao servidor.
+------------------------------------------- */
+window.dash_clientside = Object.assign({}, window.dash_clientside);
+window.dash_clientside.ap = Object.assign({}, window.dash_clientside.ap, {
+    /* clique na barra/mapa alterna o nome; o botão de reset limpa */
+    alternarSelecao: function (reset, barClick, mapClick, selecionados) {
+        const nada = window.dash_clientside.no_update;
+        const gatilho = window.dash_clientside.callback_context.triggered[0];
+        const atual = selecionados || [];
+        if (!gatilho) {
+            return nada;
+        }
+        if (gatilho.prop_id.endsWith(".n_clicks")) {
+            return atual.length ? [] : nada;
+        }
+        const ponto = gatilho.value && gatilho.value.points && gatilho.value.points[0];
+        const nome = ponto && (ponto.y || ponto.location || ponto.customdata);
+        if (!nome) {
+            return nada;
+        }
+        return atual.includes(nome)
+            ? atual.filter(function (n) { return n !== nome; })
+            : atual.concat([nome]);
+    },
+
+    /* barras selecionadas em verde, demais em DarkSeaGreen */
+    destacarBarras: function (selecionados, figura) {
+        if (!figura || !figura.data || !figura.data.length) {
+            return window.dash_clientside.no_update;
+        }
+        const sel = selecionados || [];
+        const barras = figura.data[0];
+        const cores = (barras.y || []).map(function (n) {
+            return sel.includes(n) ? "green" : "DarkSeaGreen";
+        });
+        const marker = Object.assign({}, barras.marker, {color: cores});
+        return Object.assign({}, figura, {
+            data: [Object.assign({}, barras, {marker: marker})].concat(figura.data.slice(1)),
+        });
+    },
+
+    /* parte da seleção que filtra os dados (só com UF escolhida);
+       sem mudança, o servidor não é chamado */
+    filtroSelecao: function (selecionados, ufs, filtro) {
+        const novo = ufs && ufs.length ? (selecionados || []) : [];
+        if (JSON.stringify(novo) === JSON.stringify(filtro || [])) {
+            return window.dash_clientside.no_update;
+        }
+        return novo;
+    },
+});
@@ -0,0 +1,179 @@
+# tests/conftest.py
+"""
+Dados de teste compartilhados:
+
+* ``frame``: frame pequeno com as colunas de filtro categóricas e métricas
+  com empates e NaN (índices, cubo, tabela);
+* ``Mirrors``: servidor HTTP local no lugar dos espelhos – cada rota tem
+  status, corpo, cabeçalhos, ETag e atraso por bloco configuráveis;
+* ``shared_cache`` / ``served``: cache e snapshots do processo num diretório
+  temporário e um dataset de três áreas servido pelos espelhos locais,
+  registrado no registro global (rotas de tiles e exportação).
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+from shapely.geometry import box
+
+from app.data import registry as registry_module
+from app.data import snapshots, sources, tiles
+from app.data.export import export
+from app.data.filters import BITMAP_MAX_CARDINALITY
+from app.data.fetch import make_session
+from app.data.registry import registry
+from app.data.sources import CHUNK, DataCache
+
+N_ROWS = 300
+N_NAMES = BITMAP_MAX_CARDINALITY + 36  # NOME vai para vetores de row ids
+SERVED = "TESTE_AREAS"
+
+
+# ╭─ frame ──────────────────────────────────────────────────────────────────╮
+@pytest.fixture(scope="session")
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    desmat = rng.integers(0, 20, N_ROWS).astype(float)  # muitos empates
+    desmat[rng.choice(N_ROWS, 30, replace=False)] = np.nan
+    cars = rng.random(N_ROWS) * 10
+    cars[rng.choice(N_ROWS, 20, replace=False)] = np.nan
+    df = pd.DataFrame({
+        "RANK": np.arange(1, N_ROWS + 1),
+        "NOME": [f"AREA {i % N_NAMES:03d}" for i in range(N_ROWS)],
+        "UF": rng.choice(["PA", "AM", "MT", "RO", "AC"], N_ROWS),
+        "MODALIDADE": rng.choice(["UC Federal", "UC Estadual"], N_ROWS),
+        "USO": rng.choice(["Proteção Integral", "Uso Sustentável"], N_ROWS),
+        "FASE": rng.choice(["Homologada", "Declarada", "Em estudo"], N_ROWS),
+        "DESMATAM_1": desmat,
+        "FOCOS DE C": rng.integers(0, 50, N_ROWS),
+        "N DE CAR": rng.integers(0, 9, N_ROWS),
+        "CAR": cars,
+        "ESTRADAS N": rng.random(N_ROWS) * 100,
+    })
+    for col in ["NOME", "UF", "MODALIDADE", "USO", "FASE"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def pandas_mask(df: pd.DataFrame, filters: dict) -> np.ndarray:
+    """Referência: ``isin`` em cada coluna, AND entre colunas."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filters.items():
+        if values is not None:
+            mask &= df[col].isin(list(values)).to_numpy()
+    return mask
+
+
+# ╭─ espelhos ───────────────────────────────────────────────────────────────╮
+class Mirrors:
+    """Servidor local; ``routes[path]`` define a resposta de cada espelho."""
+
+    def __init__(self):
+        self.routes: dict[str, dict] = {}
+        self.requests: list[tuple[str, dict]] = []
+        mirrors = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                mirrors.requests.append((self.path, dict(self.headers)))
+                route = mirrors.routes.get(self.path, {"status": 404})
+                body = route.get("body", b"")
+                etag = route.get("etag")
+                if etag and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(route["status"])
+                if etag:
+                    self.send_header("ETag", etag)
+                for key, value in route.get("headers", {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    for start in range(0, len(body), CHUNK):
+                        time.sleep(route.get("delay", 0))
+                        self.wfile.write(body[start:start + CHUNK])
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # o cliente desistiu (perdeu a corrida)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def mirrors():
+    server = Mirrors()
+    yield server
+    server.close()
+
+
+def source_files(desmatamento: list[float]) -> tuple[bytes, bytes]:
+    """GeoJSON e parquet mínimos de três áreas vizinhas."""
+    names = ["ÁREA A", "ÁREA B", "ÁREA C"]
+    roi = gpd.GeoDataFrame(
+        {"NOME": names, "RANK": [1, 2, 3]},
+        geometry=[box(-60 + i, -5, -59.5 + i, -4.5) for i in range(3)], crs="EPSG:4326",
+    )
+    df = pd.DataFrame({
+        "RANK": [1, 2, 3], "NOME": names, "UF": ["PA", "AM", "PA"],
+        "MODALIDADE": ["UC Federal"] * 3, "USO": ["Uso Sustentável"] * 3,
+        "FASE": ["Homologada"] * 3, "CATEGORIA": ["APA"] * 3,
+        "DESMATAM_1": desmatamento, "FOCOS DE C": [1, 2, 3],
+        "N DE CAR": [4, 5, 6], "CAR": [1.5, 2.5, 3.5], "ESTRADAS N": [0.1, 0.2, 0.3],
+    })
+    parquet = io.BytesIO()
+    df.to_parquet(parquet)
+    return roi.to_json().encode(), parquet.getvalue()
+
+
+@pytest.fixture
+def shared_cache(tmp_path, monkeypatch):
+    """Cache e snapshots do processo num diretório temporário."""
+    data_cache = DataCache(tmp_path / "cache", session=make_session(retries=0), workers=4)
+    for module in (sources, snapshots, registry_module):
+        monkeypatch.setattr(module, "cache", data_cache)
+    for module in (snapshots, tiles):
+        monkeypatch.setattr(module, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    return data_cache
+
+
+# ╭─ dataset servido ────────────────────────────────────────────────────────╮
+@pytest.fixture
+def served(mirrors, shared_cache):
+    """Dataset ``SERVED`` carregado no registro global."""
+    geojson, parquet = source_files([30.0, 20.0, 10.0])
+    mirrors.routes["/T.geojson"] = {"status": 200, "body": geojson}
+    mirrors.routes["/T.parquet"] = {"status": 200, "body": parquet}
+    dataset = registry.register(SERVED, [mirrors.url("/T.geojson")], [mirrors.url("/T.parquet")])
+    dataset.snapshot()
+    yield dataset
+    registry._datasets.pop(SERVED, None)
+
+
+@pytest.fixture
+def client(served):
+    server = Flask(__name__)
+    server.register_blueprint(tiles.tiles)
+    server.register_blueprint(export)
+    return server.test_client()
@@ -0,0 +1,76 @@
+# tests/test_cube.py
+"""``AggregateCube`` contra ``groupby`` e ``nlargest`` no frame filtrado."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.data.cube import CUBE_METRICS, AggregateCube
+from conftest import pandas_mask
+
+TOP_N = 10
+FILTERS = [
+    {},
+    {"UF": ["PA"]},
+    {"UF": ["PA", "AM"], "MODALIDADE": ["UC Federal"]},
+    {"USO": ["Uso Sustentável"], "FASE": ["Homologada", "Declarada"]},
+    {"MODALIDADE": ["UC Estadual"], "USO": ["Proteção Integral"], "FASE": ["Em estudo"],
+     "UF": ["AC"]},
+    {"UF": ["XX"]},
+]
+
+
+@pytest.fixture(scope="module")
+def cube(frame):
+    return AggregateCube(frame, top_n=TOP_N)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_totals_match_filtered_frame(frame, cube, filters):
+    filtered = frame[pandas_mask(frame, filters)]
+    totals = cube.totals(filters)
+
+    assert totals["linhas"] == len(filtered)
+    for m in CUBE_METRICS:
+        assert totals[m]["sum"] == pytest.approx(filtered[m].sum())  # NaN fora
+        assert totals[m]["count"] == filtered[m].count()
+
+
+@pytest.mark.parametrize("dim", ["UF", "FASE"])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_by_matches_groupby(frame, cube, filters, dim):
+    filtered = frame[pandas_mask(frame, filters)]
+    expected = filtered.groupby(dim, observed=True)[CUBE_METRICS].sum()
+    expected["linhas"] = filtered.groupby(dim, observed=True).size()
+
+    got = cube.by(dim, filters)
+
+    assert (np.diff(got[CUBE_METRICS[0]].to_numpy()) <= 0).all()
+    pd.testing.assert_frame_equal(
+        got.sort_index().astype(float), expected.sort_index().astype(float),
+        check_index_type=False, check_categorical=False, check_names=False,
+    )
+
+
+@pytest.mark.parametrize("metric", ["DESMATAM_1", "CAR"])  # com NaN
+@pytest.mark.parametrize("filters", FILTERS)
+def test_top_matches_nlargest(frame, cube, filters, metric):
+    filtered = frame[pandas_mask(frame, filters)]
+    largest = filtered.nlargest(TOP_N, metric, keep="first")
+    stable = filtered.sort_values(metric, ascending=False, kind="stable",
+                                  na_position="last").head(TOP_N)
+
+    top = cube.top(filters, metric, TOP_N)
+
+    assert set(top) == set(frame.index.get_indexer(largest.index))
+    np.testing.assert_array_equal(frame[metric].to_numpy()[top], largest[metric].to_numpy())
+    np.testing.assert_array_equal(top, frame.index.get_indexer(stable.index))
+
+
+def test_top_beyond_stored_n_and_unknown_dimension(cube):
+    with pytest.raises(ValueError):
+        cube.top({}, "DESMATAM_1", TOP_N + 1)
+    with pytest.raises(KeyError):
+        cube.totals({"NOME": ["AREA 001"]})
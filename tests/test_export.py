@@ -0,0 +1,130 @@
+# tests/test_export.py
+"""
+Rotas de exportação: cada resposta é lida de volta e comparada com a tabela
+do snapshot carregado.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+
+import geopandas as gpd
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.data.export import GEOPARQUET_VERSION
+from app.data.snapshots import scan_table
+from conftest import SERVED
+
+
+def _expected(served, ufs=None) -> pd.DataFrame:
+    df = served.snapshot().df
+    if ufs:
+        df = df[df["UF"].isin(ufs)]
+    return df.reset_index(drop=True)
+
+
+# ╭─ csv ────────────────────────────────────────────────────────────────────╮
+def _read_csv(response, **kwargs) -> pd.DataFrame:
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    return pd.read_csv(io.BytesIO(response.data), **kwargs)
+
+
+@pytest.mark.parametrize("ufs", [None, ["PA"], ["AM"], ["PA", "AM"], ["XX"]])
+def test_csv_filters_by_uf(client, served, ufs):
+    query = "&".join(f"UF={uf}" for uf in ufs or [])
+    df = _read_csv(client.get(f"/ap/_export/{SERVED}.csv?{query}"))
+    expected = _expected(served, ufs)
+
+    assert list(df.columns) == list(expected.columns)
+    assert df["NOME"].tolist() == expected["NOME"].astype(str).tolist()
+    assert df["DESMATAM_1"].tolist() == expected["DESMATAM_1"].tolist()
+
+
+def test_csv_decimal_comma_uses_semicolon(client, served):
+    response = client.get(f"/ap/_export/{SERVED}.csv?decimal=,")
+    header = response.data.decode().splitlines()[0]
+    df = _read_csv(response, sep=";", decimal=",")
+    expected = _expected(served)
+
+    assert header.split(";") == list(expected.columns)
+    assert df["CAR"].tolist() == expected["CAR"].tolist()
+    assert "1,5" in response.data.decode()
+
+
+def test_csv_ascii_strips_accents(client, served):
+    plain = client.get(f"/ap/_export/{SERVED}.csv").data.decode()
+    ascii_only = client.get(f"/ap/_export/{SERVED}.csv?ascii=1").data.decode()
+
+    assert "Uso Sustentável" in plain
+    assert ascii_only.isascii()
+    assert ascii_only == plain.replace("á", "a")
+
+
+def test_csv_attachment_name(client, served):
+    response = client.get(f"/ap/_export/{SERVED}.csv")
+
+    assert response.headers["Content-Disposition"] == f'attachment; filename="{SERVED}.csv"'
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "geoparquet", "geojson"])
+def test_unknown_dataset_is_404(client, fmt):
+    assert client.get(f"/ap/_export/XYZ.{fmt}").status_code == 404
+
+
+# ╭─ parquet e formatos geográficos ─────────────────────────────────────────╮
+def _read_parquet(response) -> pa.Table:
+    assert response.status_code == 200
+    return pq.read_table(io.BytesIO(response.data))
+
+
+@pytest.mark.parametrize("ufs", [None, ["PA"], ["XX"]])
+def test_parquet_keeps_types(client, served, ufs):
+    query = "&".join(f"UF={uf}" for uf in ufs or [])
+    table = _read_parquet(client.get(f"/ap/_export/{SERVED}.parquet?{query}"))
+    snapshot = scan_table(SERVED, served.snapshot().version, {"UF": None}).projected_schema
+    expected = _expected(served, ufs)
+
+    assert table.schema.remove_metadata() == snapshot.remove_metadata()
+    for col in ["NOME", "UF", "MODALIDADE", "USO", "FASE"]:
+        assert pa.types.is_dictionary(table.schema.field(col).type)
+    pd.testing.assert_frame_equal(
+        table.to_pandas().reset_index(drop=True), expected,
+        check_categorical=False, check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("ufs", [None, ["PA"]])
+def test_geoparquet_has_crs_and_geometries(client, served, ufs):
+    query = "&".join(f"UF={uf}" for uf in ufs or [])
+    response = client.get(f"/ap/_export/{SERVED}.geoparquet?{query}")
+    geo = json.loads(_read_parquet(response).schema.metadata[b"geo"])
+    gdf = gpd.read_parquet(io.BytesIO(response.data))
+    expected = _expected(served, ufs)
+    roi = served.snapshot().roi.set_index("NOME").geometry
+
+    assert geo["version"] == GEOPARQUET_VERSION
+    assert geo["primary_column"] == "geometry"
+    assert "bbox" not in geo["columns"]["geometry"]
+    assert gdf.crs == "EPSG:4326"
+    assert gdf["NOME"].astype(str).tolist() == expected["NOME"].astype(str).tolist()
+    assert not gdf.geometry.isna().any()
+    assert all(g.equals(roi[n]) for n, g in zip(gdf["NOME"], gdf.geometry))
+
+
+@pytest.mark.parametrize("ufs", [None, ["PA"], ["AM"], ["XX"]])
+def test_geojson_feature_per_row(client, served, ufs):
+    query = "&".join(f"UF={uf}" for uf in ufs or [])
+    response = client.get(f"/ap/_export/{SERVED}.geojson?{query}")
+    data = json.loads(response.data)
+    expected = _expected(served, ufs)
+
+    assert response.mimetype == "application/geo+json"
+    assert data["type"] == "FeatureCollection"
+    assert len(data["features"]) == len(expected)
+    assert [f["properties"]["NOME"] for f in data["features"]] == expected["NOME"].astype(str).tolist()
+    assert all(f["geometry"]["type"] == "Polygon" for f in data["features"])
@@ -0,0 +1,179 @@
+# tests/test_fetch.py
+"""
+Corrida entre espelhos e revalidação contra um servidor HTTP local
+(``http.server``, em ``conftest.Mirrors``).
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from app.data.fetch import Cancelled, DownloadError, make_session, race
+from app.data.registry import DatasetRegistry
+from app.data.sources import CHUNK, DataCache
+from conftest import source_files
+
+PARQUET = b"PAR1" + bytes(range(256)) * 512 + b"PAR1"  # passa em _looks_valid
+
+
+@pytest.fixture
+def data_cache(tmp_path):
+    return DataCache(tmp_path, session=make_session(retries=0), workers=4)
+
+
+def _objects(data_cache: DataCache) -> list[str]:
+    return sorted(p.name for p in data_cache.objects.iterdir())
+
+
+def test_fastest_mirror_wins(mirrors, data_cache):
+    mirrors.routes["/slow/T.parquet"] = {"status": 200, "body": PARQUET, "delay": 0.2}
+    mirrors.routes["/fast/T.parquet"] = {"status": 200, "body": PARQUET}
+    urls = [mirrors.url("/slow/T.parquet"), mirrors.url("/fast/T.parquet")]
+
+    ref = data_cache.download(urls).result(timeout=10)
+
+    assert ref["url"] == urls[1]
+    assert (data_cache.objects / ref["object"]).read_bytes() == PARQUET
+    assert data_cache.read_ref("T.parquet") == ref
+
+
+def test_loser_is_cancelled(mirrors, data_cache):
+    mirrors.routes["/slow/T.parquet"] = {"status": 200, "body": PARQUET, "delay": 0.1}
+    mirrors.routes["/fast/T.parquet"] = {"status": 200, "body": PARQUET}
+    slow, fast = mirrors.url("/slow/T.parquet"), mirrors.url("/fast/T.parquet")
+    outcomes = {}
+
+    def fetch(url, cancel):
+        try:
+            outcomes[url] = data_cache._fetch_mirror(url, cancel)
+        except BaseException as exc:
+            outcomes[url] = exc
+            raise
+        return outcomes[url]
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(2) as pool:
+        ref = race(pool, fetch, [slow, fast])
+    # o lento levaria 0.1 s × blocos; cancelado, para no bloco seguinte
+    assert time.monotonic() - started < 0.1 * len(PARQUET) / CHUNK
+    assert ref["url"] == fast
+    assert isinstance(outcomes[slow], Cancelled)
+    assert _objects(data_cache) == [ref["object"]]  # nada pela metade
+
+
+def test_invalid_payload_is_rejected(mirrors, data_cache):
+    html = b"<html><body>Erro</body></html>"
+    mirrors.routes["/html/T.parquet"] = {"status": 200, "body": html}
+    mirrors.routes["/ok/T.parquet"] = {"status": 200, "body": PARQUET, "delay": 0.05}
+    urls = [mirrors.url("/html/T.parquet"), mirrors.url("/ok/T.parquet")]
+
+    ref = data_cache.download(urls).result(timeout=10)
+
+    assert ref["url"] == urls[1]
+    assert _objects(data_cache) == [ref["object"]]
+
+
+def test_no_valid_mirror_returns_none(mirrors, data_cache):
+    mirrors.routes["/html/T.parquet"] = {"status": 200, "body": b"<html></html>"}
+    urls = [mirrors.url("/missing/T.parquet"), mirrors.url("/html/T.parquet")]
+
+    assert data_cache.download(urls).result(timeout=10) is None
+    assert data_cache.read_ref("T.parquet") is None
+    assert _objects(data_cache) == []
+
+
+def test_download_error_lists_every_mirror(mirrors, data_cache):
+    mirrors.routes["/html/T.parquet"] = {"status": 200, "body": b"<html></html>"}
+    urls = [mirrors.url("/missing/T.parquet"), mirrors.url("/html/T.parquet")]
+
+    with ThreadPoolExecutor(2) as pool, pytest.raises(DownloadError) as info:
+        race(pool, lambda url, cancel: data_cache._fetch_mirror(url, cancel), urls)
+
+    message = str(info.value)
+    assert f"{urls[0]}: 404" in message
+    assert f"{urls[1]}: conteúdo inválido" in message
+
+
+# ╭─ revalidação ────────────────────────────────────────────────────────────╮
+def test_not_modified_keeps_ref(mirrors, data_cache):
+    mirrors.routes["/a/T.parquet"] = {"status": 200, "body": PARQUET, "etag": '"v1"'}
+    urls = [mirrors.url("/a/T.parquet")]
+    first = data_cache.download(urls).result(timeout=10)
+
+    second = data_cache.download(urls).result(timeout=10)
+
+    assert mirrors.requests[-1][1].get("If-None-Match") == '"v1"'
+    assert second["object"] == first["object"]
+    assert second["fetched_at"] == first["fetched_at"]
+    assert second["checked_at"] >= first["checked_at"]
+    assert data_cache.read_ref("T.parquet") == second
+    assert _objects(data_cache) == [first["object"]]
+
+
+def test_changed_body_creates_new_object(mirrors, data_cache):
+    mirrors.routes["/a/T.parquet"] = {"status": 200, "body": PARQUET, "etag": '"v1"'}
+    urls = [mirrors.url("/a/T.parquet")]
+    first = data_cache.download(urls).result(timeout=10)
+    changed = PARQUET[:-4] + b"novo" + b"PAR1"
+    mirrors.routes["/a/T.parquet"] = {"status": 200, "body": changed, "etag": '"v2"'}
+
+    second = data_cache.download(urls).result(timeout=10)
+
+    assert second["object"] != first["object"]
+    assert second["etag"] == '"v2"'
+    assert (data_cache.objects / second["object"]).read_bytes() == changed
+    assert data_cache.read_ref("T.parquet")["object"] == second["object"]
+
+
+def test_refresh_swaps_snapshot(mirrors, shared_cache):
+    geojson, parquet = source_files([30.0, 20.0, 10.0])
+    mirrors.routes["/T.geojson"] = {"status": 200, "body": geojson, "etag": '"g1"'}
+    mirrors.routes["/T.parquet"] = {"status": 200, "body": parquet, "etag": '"p1"'}
+    datasets = DatasetRegistry()
+    dataset = datasets.register("T", [mirrors.url("/T.geojson")], [mirrors.url("/T.parquet")])
+
+    old = dataset.snapshot()
+    old_df = old.df.copy()
+    assert old.df["NOME"].tolist() == ["AREA A", "AREA B", "AREA C"]
+
+    # nada mudou: 304 e o mesmo snapshot
+    assert datasets.refresh() == {"T": old.version}
+    assert dataset.snapshot() is old
+    assert {h.get("If-None-Match") for _, h in mirrors.requests[-2:]} == {'"g1"', '"p1"'}
+
+    _, parquet = source_files([5.0, 6.0, 7.0])
+    mirrors.routes["/T.parquet"] = {"status": 200, "body": parquet, "etag": '"p2"'}
+    versions = datasets.refresh()
+
+    new = dataset.snapshot()
+    assert versions == {"T": new.version} and new.version != old.version
+    assert new.df["DESMATAM_1"].tolist() == [5.0, 6.0, 7.0]
+    # quem pegou o snapshot antigo continua com os dados dele
+    pd.testing.assert_frame_equal(old.df, old_df)
+    assert old.index.count({"UF": ["PA"]}) == 2
+
+
+@pytest.mark.parametrize("interval", [0, 3600])
+def test_startup_picks_up_changed_mirror(mirrors, shared_cache, interval):
+    geojson, parquet = source_files([30.0, 20.0, 10.0])
+    mirrors.routes["/T.geojson"] = {"status": 200, "body": geojson, "etag": '"g1"'}
+    mirrors.routes["/T.parquet"] = {"status": 200, "body": parquet, "etag": '"p1"'}
+    urls = [mirrors.url("/T.geojson")], [mirrors.url("/T.parquet")]
+    DatasetRegistry().register("T", *urls).snapshot()  # processo anterior
+
+    # nova subida com o cache quente e o espelho alterado
+    _, parquet = source_files([5.0, 6.0, 7.0])
+    mirrors.routes["/T.parquet"] = {"status": 200, "body": parquet, "etag": '"p2"'}
+    datasets = DatasetRegistry()
+    dataset = datasets.register("T", *urls)
+    assert datasets.start_refresher(interval)
+    deadline = time.monotonic() + 10
+    while shared_cache.read_ref("T.parquet")["etag"] != '"p2"' and time.monotonic() < deadline:
+        time.sleep(0.05)
+    datasets.stop_refresher()
+
+    assert dataset.snapshot().df["DESMATAM_1"].tolist() == [5.0, 6.0, 7.0]
@@ -0,0 +1,130 @@
+# tests/test_filters.py
+"""``FilterIndex`` contra as máscaras booleanas do pandas no mesmo frame."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.data.filters import FilterIndex
+from conftest import pandas_mask
+
+FILTERS = [
+    {},
+    {"UF": ["PA"]},
+    {"UF": ["PA", "AM", "MT"]},
+    {"UF": None, "FASE": ["Homologada"]},
+    {"UF": ["XX"]},
+    {"UF": ["PA", "XX"]},
+    {"UF": []},
+    {"NOME": ["AREA 001"]},
+    {"NOME": ["AREA 001", "AREA 099", "NÃO EXISTE"]},
+    {"MODALIDADE": ["UC Federal"], "USO": ["Uso Sustentável"], "UF": ["PA", "AM"]},
+    {"MODALIDADE": ["UC Estadual"], "FASE": ["Declarada", "Em estudo"],
+     "NOME": [f"AREA {i:03d}" for i in range(0, 100, 3)]},
+]
+
+
+@pytest.fixture(scope="module")
+def index(frame):
+    return FilterIndex(frame)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_rows_and_count_match_pandas(frame, index, filters):
+    expected = np.flatnonzero(pandas_mask(frame, filters))
+
+    np.testing.assert_array_equal(index.rows(filters), expected)
+    np.testing.assert_array_equal(index.mask(filters), pandas_mask(frame, filters))
+    assert index.count(filters) == len(expected)
+
+
+def test_nome_uses_row_ids_and_low_cardinality_uses_bitmaps(index):
+    assert "NOME" in index._row_ids
+    assert {"UF", "MODALIDADE", "USO", "FASE"} <= set(index._bitmaps)
+
+
+def test_values_lists_categories(frame, index):
+    assert set(index.values("UF")) == set(frame["UF"].cat.categories)
+    assert len(index.values("NOME")) == frame["NOME"].nunique()
+    assert not index.values("CATEGORIA")
+
+
+def test_unindexed_column_raises(index):
+    with pytest.raises(KeyError):
+        index.any_of("CATEGORIA", ["x"])
+
+
+# ╭─ top-N ──────────────────────────────────────────────────────────────────╮
+TOP_FILTERS = FILTERS + [
+    {"NOME": ["AREA 005"]},  # menos linhas que N
+    {"NOME": ["AREA 007"], "UF": ["AC"]},
+]
+
+
+@pytest.mark.parametrize("n", [1, 10, 40])
+@pytest.mark.parametrize("filters", TOP_FILTERS)
+def test_top_matches_nlargest(frame, index, filters, n):
+    filtered = frame[pandas_mask(frame, filters)]
+    largest = filtered.nlargest(n, "DESMATAM_1", keep="first")
+    # nlargest escolhe as linhas, mas com n ≥ linhas ordena os empates de
+    # forma instável; a ordem de referência é a decrescente estável
+    stable = filtered.sort_values("DESMATAM_1", ascending=False, kind="stable",
+                                  na_position="last").head(n)
+
+    top = index.top(filters, "DESMATAM_1", n)
+
+    assert set(top) == set(frame.index.get_indexer(largest.index))
+    np.testing.assert_array_equal(frame["DESMATAM_1"].to_numpy()[top],
+                                  largest["DESMATAM_1"].to_numpy())
+    np.testing.assert_array_equal(top, frame.index.get_indexer(stable.index))
+
+
+def test_top_ties_keep_frame_order_and_nan_last(frame, index):
+    top = index.top({}, "DESMATAM_1", len(frame))
+    values = frame["DESMATAM_1"].to_numpy()[top]
+    finite = values[~np.isnan(values)]
+
+    assert np.isnan(values[len(finite):]).all()
+    assert (np.diff(finite) <= 0).all()
+    for v in np.unique(finite):  # empates na ordem do frame
+        rows = top[values == v]
+        assert (np.diff(rows) > 0).all()
+
+
+def test_top_of_empty_filter_is_empty(index):
+    assert len(index.top({"UF": ["XX"]}, "DESMATAM_1")) == 0
+
+
+# ╭─ paginação por chave ────────────────────────────────────────────────────╮
+@pytest.fixture(scope="module")
+def gapped(frame):
+    """RANK crescente com buracos, como num snapshot filtrado."""
+    df = frame.copy()
+    df["RANK"] = 5 + 3 * np.arange(len(df))
+    return df, FilterIndex(df)
+
+
+@pytest.mark.parametrize("size", [1, 7, 50, 1000])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_after_pages_concatenate_to_filtered_rows(gapped, filters, size):
+    df, index = gapped
+    pages, last = [], None
+    while True:
+        page = index.after(filters, last, size)
+        assert len(page) <= size
+        if not len(page):
+            break
+        pages.append(page)
+        last = index.key(page[-1])
+
+    got = np.concatenate(pages) if pages else np.empty(0, int)
+    np.testing.assert_array_equal(got, np.flatnonzero(pandas_mask(df, filters)))
+    assert all(len(p) == size for p in pages[:-1])
+
+
+def test_after_cursor_between_ranks(gapped):
+    df, index = gapped
+    # RANK 9 não existe (5, 8, 11, …): a página começa em 11
+    np.testing.assert_array_equal(index.after({}, 9, 3), [2, 3, 4])
+    assert index.key(2) == 11
@@ -0,0 +1,98 @@
+# tests/test_geometry.py
+"""TopoJSON quantizado: os arcos decodificados devolvem a geometria no passo."""
+
+from __future__ import annotations
+
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon, box
+
+from app.data.geometry import topology
+
+DIGITS = 3
+STEP = 10.0 ** -DIGITS
+
+
+def _decode_arcs(topo: dict) -> list[np.ndarray]:
+    """Arcos em inteiros da grade (soma acumulada dos deltas)."""
+    return [np.cumsum(np.array(arc, dtype=np.int64), axis=0) for arc in topo["arcs"]]
+
+
+def _ring(arcs: list[np.ndarray], ids: list[int]) -> np.ndarray:
+    points = []
+    for k, i in enumerate(ids):
+        arc = arcs[i] if i >= 0 else arcs[~i][::-1]
+        points.append(arc if k == 0 else arc[1:])  # sem repetir a emenda
+    return np.concatenate(points)
+
+
+def _decoded(topo: dict) -> dict:
+    arcs = _decode_arcs(topo)
+    out = {}
+    for g in topo["objects"]["features"]["geometries"]:
+        polygons = [g["arcs"]] if g["type"] == "Polygon" else g["arcs"]
+        out[g["properties"]["NOME"]] = shapely.multipolygons([
+            Polygon(_ring(arcs, rings[0]), [_ring(arcs, r) for r in rings[1:]])
+            for rings in polygons
+        ])
+    return out
+
+
+def _expected(geom, origin: np.ndarray):
+    """``set_precision`` no passo, levado à mesma grade inteira."""
+    snapped = shapely.set_precision(geom, STEP)
+    return shapely.transform(snapped, lambda xy: np.rint((xy - origin) / STEP))
+
+
+@pytest.fixture
+def roi():
+    square = [box(-60.0001, -5.0004, -59.5, -4.5), box(-59.5, -5.0004, -59.0002, -4.5)]
+    holed = Polygon(
+        [(-58.0, -5.0), (-57.0, -5.0), (-57.0, -4.0), (-58.0, -4.0)],
+        [[(-57.75, -4.75), (-57.25, -4.75), (-57.25, -4.25), (-57.75, -4.25)]],
+    )
+    multi = MultiPolygon([box(-56.1234, -5.0, -55.6, -4.6), box(-55.4, -4.4, -55.0, -4.0)])
+    return gpd.GeoDataFrame(
+        {"NOME": ["A", "B", "FURO", "MULTI"]},
+        geometry=[*square, holed, multi], crs="EPSG:4326",
+    )
+
+
+def test_round_trip_matches_set_precision(roi):
+    topo = topology(roi, digits=DIGITS)
+    origin = np.array(topo["transform"]["translate"])
+    assert topo["transform"]["scale"] == [STEP, STEP]
+
+    decoded = _decoded(topo)
+
+    assert set(decoded) == set(roi["NOME"])
+    for name, geom in zip(roi["NOME"], roi.geometry):
+        assert shapely.equals(decoded[name], _expected(geom, origin)), name
+
+
+def test_shared_edge_is_one_arc(roi):
+    topo = topology(roi, digits=DIGITS)
+    geoms = {g["properties"]["NOME"]: g for g in topo["objects"]["features"]["geometries"]}
+    a = {i if i >= 0 else ~i for i in geoms["A"]["arcs"][0]}
+    b = {i if i >= 0 else ~i for i in geoms["B"]["arcs"][0]}
+
+    shared = a & b
+    assert len(shared) == 1
+    edge = _decode_arcs(topo)[shared.pop()]
+    assert set(edge[:, 0].tolist()) == {
+        int(np.rint((-59.5 - topo["transform"]["translate"][0]) / STEP))
+    }
+
+
+def test_hole_and_multipolygon_types(roi):
+    geoms = {g["properties"]["NOME"]: g
+             for g in topology(roi, digits=DIGITS)["objects"]["features"]["geometries"]}
+    assert geoms["FURO"]["type"] == "Polygon" and len(geoms["FURO"]["arcs"]) == 2
+    assert geoms["MULTI"]["type"] == "MultiPolygon" and len(geoms["MULTI"]["arcs"]) == 2
+
+
+def test_empty_roi():
+    roi = gpd.GeoDataFrame({"NOME": []}, geometry=[], crs="EPSG:4326")
+    assert topology(roi)["arcs"] == []
@@ -0,0 +1,73 @@
+# tests/test_memo.py
+"""Cache de resultados: LRU, TTL e cálculo único por chave em falhas simultâneas."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.data.memo import ResultCache, filter_key
+
+
+def test_lru_and_ttl():
+    cache = ResultCache(maxsize=2, ttl=0.2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" é o menos usado
+    assert cache.get("b") is None and cache.get("c") == 3
+    time.sleep(0.25)
+    assert cache.get("a") is None
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "figura"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.get_or_compute, "k", compute) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result(timeout=5) for f in futures]
+
+    assert results == ["figura"] * 8
+    assert len(calls) == 1
+    assert cache.get("k") == "figura"
+
+
+def test_failure_reaches_waiters_and_is_not_cached():
+    cache = ResultCache()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError("falhou")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_compute, "k", compute) for _ in range(4)]
+        time.sleep(0.1)
+        release.set()
+        for f in futures:
+            with pytest.raises(ValueError):
+                f.result(timeout=5)
+
+    assert cache.get_or_compute("k", lambda: 42) == 42
+
+
+def test_disabled_cache_still_computes():
+    cache = ResultCache(maxsize=0)
+    assert cache.get_or_compute("k", lambda: 1) == 1
+    assert cache.get("k") is None
+
+
+def test_filter_key_is_canonical():
+    assert filter_key({"UF": ["PA", "AM"], "FASE": None}) == filter_key({"FASE": None, "UF": ["AM", "PA"]})
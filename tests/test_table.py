@@ -0,0 +1,64 @@
+# tests/test_table.py
+"""Formatação da tabela e ranking paginado por chave contra fatias por offset."""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from app.data.filters import FilterIndex
+from app.data.table import TABLE_COLUMNS, format_columns, ranking_page, table_records
+from conftest import pandas_mask
+
+FILTERS = [{}, {"UF": ["PA", "AM"]}, {"FASE": ["Declarada"], "MODALIDADE": ["UC Federal"]},
+           {"UF": ["XX"]}]
+
+
+@pytest.fixture(scope="module")
+def index(frame):
+    return FilterIndex(frame)
+
+
+def _offset_page(frame, filters, page, size):
+    rows = np.flatnonzero(pandas_mask(frame, filters))
+    return table_records(frame.iloc[rows[page * size:(page + 1) * size]])
+
+
+@pytest.mark.parametrize("size", [7, 50])
+@pytest.mark.parametrize("filters", FILTERS)
+def test_jump_to_unvisited_page_matches_offset(frame, index, filters, size):
+    pages = max(math.ceil(pandas_mask(frame, filters).sum() / size), 1)
+    for page in range(pages):
+        records, got, count, cursors = ranking_page(frame, index, filters, page, (), size)
+        assert (got, count) == (page, pages)
+        assert records == _offset_page(frame, filters, page, size)
+        assert len(cursors) == page  # andou de página em página até lá
+
+
+def test_known_cursors_are_reused(frame, index):
+    filters, size = {"UF": ["PA", "AM"]}, 7
+    records, _, _, cursors = ranking_page(frame, index, filters, 3, (), size)
+
+    again, _, _, same = ranking_page(frame, index, filters, 3, cursors, size)
+    back = ranking_page(frame, index, filters, 1, cursors, size)[0]
+
+    assert again == records and same == cursors
+    assert back == _offset_page(frame, filters, 1, size)
+
+
+def test_page_is_clamped(frame, index):
+    filters, size = {"UF": ["PA"]}, 50
+    last = max(math.ceil(pandas_mask(frame, filters).sum() / size), 1) - 1
+    records, page, _, _ = ranking_page(frame, index, filters, 99, (), size)
+    assert page == last and records == _offset_page(frame, filters, last, size)
+    assert ranking_page(frame, index, filters, -3, (), size)[1] == 0
+
+
+def test_format_columns_adds_units(frame):
+    cols = format_columns(frame.head(3))
+    assert list(cols) == TABLE_COLUMNS
+    assert cols["CAR"][0] == f"{frame['CAR'].iloc[0]:.2f} km²"
+    assert cols["ESTRADAS N"][1] == f"{frame['ESTRADAS N'].iloc[1]:.2f} km"
+    assert cols["NOME"] == frame["NOME"].head(3).tolist()
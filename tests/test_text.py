@@ -0,0 +1,82 @@
+# tests/test_text.py
+"""
+Normalização por valor distinto contra a versão antiga, célula a célula.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+import unidecode
+
+from app.data.text import normalize_name, strip_accents, strip_accents_frame
+
+NAMES = [
+    "Reserva Extrativista Chico Mendes", "ÁREA DE PROTEÇÃO AMBIENTAL", "área de proteção ambiental",
+    "Terra Indígena Yanomâmi", "São Félix do Xingu", "Straße", "já", "JÁ", "Jã", "", "  ",
+]
+
+
+def _column(kind: str) -> pd.Series:
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.choice(np.array(NAMES, dtype=object), 400), name="NOME")
+    values[rng.choice(400, 40, replace=False)] = np.nan
+    return values.astype("category") if kind == "category" else values
+
+
+def _old(s: pd.Series) -> list:
+    """Como o snapshot normalizava antes: ``unidecode(...).upper()`` em cada
+    célula de texto; NaN continua NaN."""
+    return [unidecode.unidecode(str(x)).upper() if isinstance(x, str) else x for x in s]
+
+
+@pytest.mark.parametrize("kind", ["category", "object"])
+def test_normalize_name_matches_per_cell(kind):
+    s = _column(kind)
+    out = normalize_name(s)
+
+    assert out.index.equals(s.index) and out.name == s.name
+    assert out.isna().tolist() == s.isna().tolist()
+    assert out.astype(object).where(out.notna(), None).tolist() == \
+        pd.Series(_old(s), dtype=object).where(s.notna(), None).tolist()
+
+
+def test_normalize_name_keeps_categorical():
+    out = normalize_name(_column("category"))
+
+    assert isinstance(out.dtype, pd.CategoricalDtype)
+    # "já", "JÁ" e "Jã" viram uma categoria só
+    assert out.cat.categories.is_unique
+    assert (out == "JA").sum() == _column("category").isin(["já", "JÁ", "Jã"]).sum()
+
+
+def test_strip_accents_keeps_case():
+    s = _column("object")
+    expected = [unidecode.unidecode(x) if isinstance(x, str) else x for x in s]
+
+    assert strip_accents(s).where(s.notna(), None).tolist() == \
+        pd.Series(expected, dtype=object).where(s.notna(), None).tolist()
+
+
+def test_non_text_passes_through():
+    numbers = pd.Series([1.5, np.nan, 3.0])
+    mixed = pd.Series(["ção", 7, None], dtype=object)
+
+    assert normalize_name(numbers) is numbers
+    assert normalize_name(mixed).tolist() == ["CAO", 7, None]
+    assert normalize_name(pd.Series([], dtype=object)).empty
+
+
+def test_strip_accents_frame_touches_only_text():
+    df = pd.DataFrame({
+        "NOME": pd.Categorical(["Área", "Área", None]),
+        "USO": ["Proteção", None, "Uso Sustentável"],
+        "CAR": [1.5, np.nan, 2.0],
+    })
+
+    out = strip_accents_frame(df.copy())
+
+    assert out["NOME"].astype(object).where(out["NOME"].notna(), None).tolist() == ["Area", "Area", None]
+    assert out["USO"].tolist() == ["Protecao", None, "Uso Sustentavel"]
+    pd.testing.assert_series_equal(out["CAR"], df["CAR"])
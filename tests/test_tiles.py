@@ -0,0 +1,203 @@
+# tests/test_tiles.py
+"""
+Rota de tiles vetoriais: cada tile é lido de volta por um decodificador
+mínimo de protobuf (independente de ``app.data.mvt``) e conferido contra a
+especificação MVT 2 – versão, extent, anéis externos com área positiva e
+tags em pares de índices válidos.
+"""
+
+from __future__ import annotations
+
+import gzip
+import math
+import struct
+
+import pytest
+
+from app.data.mvt import CLOSE_PATH, LINE_TO, MOVE_TO, POLYGON, TILE_EXTENT
+from app.data.tiles import MAX_TILE_ZOOM
+from conftest import SERVED
+
+# as três áreas de ``conftest.source_files`` ficam todas neste tile
+Z = 5
+X = int((-60 + 180) / 360 * 2 ** Z)
+Y = int((1 - math.asinh(math.tan(math.radians(-4.75))) / math.pi) / 2 * 2 ** Z)
+
+
+# ╭─ decodificador ──────────────────────────────────────────────────────────╮
+def _varint(data: bytes, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return n, pos
+
+
+def _fields(data: bytes) -> list[tuple[int, object]]:
+    """``(campo, valor)`` de uma mensagem: int, bytes ou ``double``."""
+    out, pos = [], 0
+    while pos < len(data):
+        key, pos = _varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(data, pos)
+        elif wire == 1:
+            value, pos = struct.unpack("<d", data[pos:pos + 8])[0], pos + 8
+        elif wire == 2:
+            size, pos = _varint(data, pos)
+            value, pos = data[pos:pos + size], pos + size
+        else:
+            raise AssertionError(f"wire type {wire} inesperado")
+        out.append((field, value))
+    return out
+
+
+def _packed(data: bytes) -> list[int]:
+    out, pos = [], 0
+    while pos < len(data):
+        value, pos = _varint(data, pos)
+        out.append(value)
+    return out
+
+
+def _rings(commands: list[int]) -> list[list[tuple[int, int]]]:
+    """Anéis (coordenadas absolutas) dos comandos de um polígono."""
+    rings, ring, x, y, i = [], [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == CLOSE_PATH:
+            assert count == 1 and len(ring) >= 3
+            rings.append(ring)
+            ring = []
+            continue
+        assert command in (MOVE_TO, LINE_TO)
+        assert (command == MOVE_TO) == (not ring) and (command != MOVE_TO or count == 1)
+        for _ in range(count):
+            dx, dy = commands[i], commands[i + 1]
+            x += (dx >> 1) ^ -(dx & 1)
+            y += (dy >> 1) ^ -(dy & 1)
+            ring.append((x, y))
+            i += 2
+    assert not ring, "anel sem ClosePath"
+    return rings
+
+
+def _area(ring: list[tuple[int, int]]) -> float:
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+def decode(tile: bytes) -> dict[str, list[dict]]:
+    """Camadas do tile → feições ``{"id", "properties", "rings"}``, conferindo
+    a estrutura pelo caminho."""
+    layers = {}
+    for field, payload in _fields(tile):
+        assert field == 3
+        layer = _fields(payload)
+        assert dict(layer)[15] == 2, "versão da camada"
+        assert dict(layer)[5] == TILE_EXTENT
+        keys = [v.decode() for f, v in layer if f == 3]
+        values = []
+        for f, v in layer:
+            if f == 4:
+                ((kind, value),) = _fields(v)
+                assert kind in (1, 3)
+                values.append(value.decode() if kind == 1 else value)
+        features = []
+        for f, v in layer:
+            if f != 2:
+                continue
+            feature = dict(_fields(v))
+            assert feature[3] == POLYGON
+            tags = _packed(feature[2])
+            assert len(tags) % 2 == 0
+            assert all(k < len(keys) for k in tags[::2])
+            assert all(v < len(values) for v in tags[1::2])
+            rings = _rings(_packed(feature[4]))
+            assert _area(rings[0]) > 0, "primeiro anel deve ser externo"
+            features.append({
+                "id": feature[1],
+                "properties": {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])},
+                "rings": rings,
+            })
+        layers[dict(layer)[1].decode()] = features
+    return layers
+
+
+# ╭─ rota ───────────────────────────────────────────────────────────────────╮
+def _get(client, served, z=Z, x=X, y=Y, query=""):
+    return client.get(f"/ap/_tiles/{SERVED}/{served.snapshot().version}/{z}/{x}/{y}.mvt{query}",
+                      headers={"Accept-Encoding": "gzip"})
+
+
+def test_tile_decodes_to_mvt_2(client, served):
+    response = _get(client, served)
+
+    assert response.status_code == 200
+    assert response.content_encoding == "gzip"
+    assert "Accept-Encoding" in response.vary
+    features = decode(gzip.decompress(response.data))[SERVED]
+    props = sorted((f["properties"]["NOME"], f["properties"]["DESMATAM_1"]) for f in features)
+    assert props == [("AREA A", 30.0), ("AREA B", 20.0), ("AREA C", 10.0)]
+    for feature in features:
+        assert len(feature["rings"]) == 1
+        xs, ys = zip(*feature["rings"][0])
+        assert min(xs) >= 0 and max(xs) <= TILE_EXTENT
+        assert min(ys) >= 0 and max(ys) <= TILE_EXTENT
+
+
+def test_tile_without_gzip(client, served):
+    response = client.get(
+        f"/ap/_tiles/{SERVED}/{served.snapshot().version}/{Z}/{X}/{Y}.mvt",
+        headers={"Accept-Encoding": "identity"},
+    )
+
+    assert response.content_encoding is None
+    assert len(decode(response.data)[SERVED]) == 3
+
+
+def test_filter_applies_to_every_area(client, served):
+    features = decode(gzip.decompress(_get(client, served, query="?UF=PA").data))[SERVED]
+
+    assert sorted(f["properties"]["NOME"] for f in features) == ["AREA A", "AREA C"]
+
+
+@pytest.mark.parametrize("z, x, y", [
+    (MAX_TILE_ZOOM + 1, 0, 0),
+    (2, 4, 0),
+    (2, 0, 4),
+])
+def test_out_of_range_tile_is_404(client, served, z, x, y):
+    assert _get(client, served, z, x, y).status_code == 404
+
+
+def test_unknown_dataset_or_version_is_404(client, served):
+    assert client.get(f"/ap/_tiles/XYZ/{served.snapshot().version}/0/0/0.mvt").status_code == 404
+    assert client.get(f"/ap/_tiles/{SERVED}/abc123/0/0/0.mvt").status_code == 404
+
+
+def test_tilejson(client, served):
+    version = served.snapshot().version
+    data = client.get(f"/ap/_tiles/{SERVED}/{version}.json?UF=PA").get_json()
+
+    assert data["maxzoom"] == MAX_TILE_ZOOM
+    assert data["tiles"][0].endswith(f"/{SERVED}/{version}/{{z}}/{{x}}/{{y}}.mvt?UF=PA")
+    assert data["vector_layers"][0]["id"] == SERVED
+
+
+def test_unknown_filter_values_share_one_cache_key(client, served, tmp_path):
+    folder = tmp_path / "snapshots" / SERVED / served.snapshot().version / "tiles"
+    responses = [_get(client, served, query=q) for q in ("?UF=XX", "?UF=YY", "?UF=XX&UF=ZZ")]
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all(decode(gzip.decompress(r.data))[SERVED] == [] for r in responses)
+    assert [p.name for p in folder.iterdir()] != ["all"]
+    assert len(list(folder.iterdir())) == 1
+
+    # um valor válido junto com inventados cai na mesma chave que sozinho
+    _get(client, served, query="?UF=PA&UF=XX")
+    _get(client, served, query="?UF=PA")
+    assert len(list(folder.iterdir())) == 2